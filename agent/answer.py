@@ -1,48 +1,230 @@
 from __future__ import annotations
-import os, json, requests
-
-def answer_text(intent, payload, question, style="concise"):
-    api_url = os.getenv("HF_API_URL", "https://router.huggingface.co/v1/chat/completions")
-    api_token = os.getenv("HF_TOKEN")
-    model = os.getenv("HF_MODEL", "meta-llama/Llama-3.1-8B-Instruct")
-    # print(api_url)
-    # print(api_token)
-    # print(model)
-    if not api_token:
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from agent import llm, trace
+from agent.interpreter import normalize_question
+from agent.narrate import narrate
+from agent.prompt_payload import COMPACTION_VERSION, PROMPT_TOKEN_BUDGET, SERIES_POINTS, compact_payload, to_json
+from agent.sqlcache import SQLiteCache
+
+# how answers are written: "llm" asks the model, "template" uses the local narrator only,
+# "template_first" shows the narrator's answer at once and swaps in an LLM polish of it
+ANSWER_POLICY = os.getenv("ANSWER_POLICY", "llm")
+POLICIES = ("template", "llm", "template_first")
+
+_polisher = ThreadPoolExecutor(max_workers=int(os.getenv("POLISH_WORKERS", "4")), thread_name_prefix="polish")
+# answer cache key -> Future of the polish being written for it
+_polishing = {}
+_polishing_lock = threading.Lock()
+
+SYSTEM_PROMPT = (
+    "You are a finance assistant. Reply with one short plain-text sentence."
+    "using ONLY the provided JSON payload. Do not invent numbers or months. If evident, provide exact timeline in the answer."
+    "No markdown, no code fences. Avoid exaggerated words."
+)
+STYLE_INSTRUCTIONS = {
+    "concise": "write one concise answer to the user's question.",
+    "detail": "write up to TWO sentences: one key takeaway, then a brief qualifier if helpful.",
+}
+POLISH_INSTRUCTION = "Rewrite the draft to read naturally. Keep every number, month and entity exactly as in the draft."
+# part of every answer cache key: editing any prompt text or payload compaction setting
+# retires the answers written under it
+PROMPT_VERSION = hashlib.sha256(json.dumps(
+    [SYSTEM_PROMPT, STYLE_INSTRUCTIONS, POLISH_INSTRUCTION, PROMPT_TOKEN_BUDGET, SERIES_POINTS, COMPACTION_VERSION],
+    sort_keys=True,
+).encode("utf-8")).hexdigest()[:12]
+
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", ".cache/answers.sqlite")
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "2000"))
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_policy(policy=None):
+    policy = policy or ANSWER_POLICY
+    if policy not in POLICIES:
+        raise ValueError(f"unknown answer policy {policy!r}; expected one of {', '.join(POLICIES)}")
+    return policy
+
+
+def answer_cache():
+    # None when ANSWER_CACHE_PATH is set empty. The DataStore version is part of every key,
+    # so a new version never sees older answers; those age out by TTL and LRU size rather
+    # than being wiped, since other workers may still be serving the older version.
+    global _answer_cache
+    with _answer_cache_lock:
+        if _answer_cache is None and ANSWER_CACHE_PATH:
+            _answer_cache = SQLiteCache(ANSWER_CACHE_PATH, "answers", ttl=ANSWER_CACHE_TTL, maxsize=ANSWER_CACHE_SIZE)
+        return _answer_cache
+
+
+def answer_cache_key(intent, payload, question, style, model, policy="llm", version=None):
+    return SQLiteCache.make_key(intent, payload, normalize_question(question), style, model, PROMPT_VERSION, policy, version)
+
+
+def answer_cache_stats():
+    cache = answer_cache()
+    return cache.stats() if cache is not None else None
+
+
+def cached(intent, payload, question, style, policy, version):
+    # (cache, key, hit) for one answer; cache and key are None when caching is off
+    cache = answer_cache()
+    if cache is None:
+        return None, None, None
+    key = answer_cache_key(intent, payload, question, style, llm.get_client().model, policy, version)
+    hit = cache.get(key)
+    trace.annotate(answer_cache="hit" if hit is not None else "miss")
+    return cache, key, hit
+
+
+@trace.traced("answer_text")
+def answer_text(intent, payload, question, style="concise", policy=None, version=None):
+    # version is the DataStore version the payload came from; it scopes the answer cache
+    policy = get_policy(policy)
+    trace.annotate(policy=policy)
+    if policy == "template":
+        return narrate(intent, payload, style)
+    if policy == "template_first":
+        # never waits on the LLM: a polish already in the cache is returned, otherwise the
+        # draft, with the polish written in the background for the next ask
+        cache, key, hit = cached(intent, payload, question, style, policy, version)
+        if hit is not None:
+            return hit
+        draft = narrate(intent, payload, style)
+        with _polishing_lock:
+            if key is None or key not in _polishing:
+                future = polish_async(intent, payload, question, style, draft, version)
+                if key is not None:
+                    _polishing[key] = future
+                    future.add_done_callback(lambda _: _polishing.pop(key, None))
+        return draft
+
+    client = llm.get_client()
+    if not client.token:
         raise RuntimeError("HF_TOKEN not set")
-    
-    style_instruct = "write one concise answer to the user's question."
-    if style != "concise":
-        style_instruct = "write up to TWO sentences: one key takeaway, then a brief qualifier if helpful."
-    system = (
-        "You are a finance assistant. Reply with one short plain-text sentence."
-        "using ONLY the provided JSON payload. Do not invent numbers or months. If evident, provide exact timeline in the answer."
-        "No markdown, no code fences. Avoid exaggerated words."
-    )
-    print(payload)
+
+    cache, key, hit = cached(intent, payload, question, style, policy, version)
+    if hit is not None:
+        return hit
+    try:
+        text = client.chat(build_messages(intent, payload, question, style), temperature=0, max_tokens=518)
+    except llm.LLMError as e:
+        # LLM down, timing out or circuit open: answer from the payload alone (not cached,
+        # so the next ask goes back to the LLM)
+        trace.annotate(llm_error=type(e).__name__, fallback=True)
+        return narrate(intent, payload, style)
+    with trace.span("llm.parse"):
+        text = text.strip()
+        if text.startswith("```") and text.endswith("```"):
+            text = text.strip("`").strip()
+    if cache is not None:
+        cache.put(key, text)
+    return text
+
+
+def stream_answer(intent, payload, question, style="concise", policy=None, version=None):
+    # answer_text as a generator of text chunks, for rendering while the LLM is still writing;
+    # "".join() of the chunks is the final answer. The template policies yield the narrator's
+    # answer as one chunk (template_first callers polish it with polish_async).
+    policy = get_policy(policy)
+    if policy != "llm":
+        yield narrate(intent, payload, style)
+        return
+    client = llm.get_client()
+    if not client.token:
+        raise RuntimeError("HF_TOKEN not set")
+
+    with trace.span("answer_text", stream=True) as s:
+        cache, key, hit = cached(intent, payload, question, style, policy, version)
+        if hit is not None:
+            yield hit
+            return
+        chunks = []
+        try:
+            for chunk in strip_fences(client.stream_chat(build_messages(intent, payload, question, style),
+                                                         temperature=0, max_tokens=518)):
+                chunks.append(chunk)
+                yield chunk
+        except llm.LLMError as e:
+            s.set(llm_error=type(e).__name__)
+            if chunks:
+                raise
+            # nothing shown yet, so the deterministic answer can still stand in
+            s.set(fallback=True)
+            yield narrate(intent, payload, style)
+            return
+        if cache is not None and chunks:
+            cache.put(key, "".join(chunks))
+
+
+def polish(intent, payload, question, style, draft, version=None):
+    # LLM rewrite of the narrator's draft; any LLM failure (or no token) keeps the draft
+    with trace.span("polish") as s:
+        if not llm.get_client().token:
+            return draft
+        cache, key, hit = cached(intent, payload, question, style, "template_first", version)
+        if hit is not None:
+            return hit
+        try:
+            text = llm.get_client().chat(build_messages(intent, payload, question, style, draft=draft),
+                                         temperature=0, max_tokens=518)
+        except llm.LLMError as e:
+            s.set(llm_error=type(e).__name__, fallback=True)
+            return draft
+        text = text.strip()
+        if text.startswith("```") and text.endswith("```"):
+            text = text.strip("`").strip()
+        if not text:
+            return draft
+        if cache is not None:
+            cache.put(key, text)
+        return text
+
+
+def polish_async(intent, payload, question, style, draft, version=None):
+    # polish() on a worker thread; the Future resolves to the final answer text
+    return _polisher.submit(polish, intent, payload, question, style, draft, version)
+
+
+def build_messages(intent, payload, question, style="concise", draft=None, budget=None):
+    # the payload goes out compacted to display precision and PROMPT_TOKEN_BUDGET
+    style_instruct = STYLE_INSTRUCTIONS["concise" if style == "concise" else "detail"]
     user = (
         f"Using this information, {style_instruct}\n"
         f"question: {question}\n"
         f"intent: {json.dumps(intent)}\n"
-        f"payload: {json.dumps(payload, ensure_ascii=False)}\n"
+        f"payload: {to_json(compact_payload(intent, payload, budget))}\n"
     )
+    if draft is not None:
+        user += (
+            f"draft: {draft}\n"
+            f"{POLISH_INSTRUCTION}\n"
+        )
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user},
+    ]
 
-    r = requests.post(
-        api_url,
-        headers={"Authorization": f"Bearer {api_token}", "Content-Type": "application/json"},
-        json={
-            "model": model,
-            "messages": [
-                {"role": "system", "content": system},
-                {"role": "user", "content": user},
-            ],
-            "temperature": 0,
-            "max_tokens": 518,
-        },
-        # timeout=60,
-    )
-    r.raise_for_status()
-    text = r.json()["choices"][0]["message"]["content"].strip()
-    if text.startswith("```") and text.endswith("```"):
-        text = text.strip("`").strip()
-    return text
+
+def strip_fences(chunks):
+    # streamed counterpart of the fence stripping in answer_text: leading whitespace/backticks
+    # are dropped, and trailing backticks/whitespace are held back until more text follows
+    started = False
+    held = ""
+    for chunk in chunks:
+        if not started:
+            chunk = chunk.lstrip("` \n")
+            if not chunk:
+                continue
+            started = True
+        text = held + chunk
+        body = text.rstrip("` \n")
+        held = text[len(body):]
+        if body:
+            yield body
@@ -0,0 +1,178 @@
+# Headless question runner: replays a JSONL file of questions against one DataStore.
+# usage: python -m agent.batch questions.jsonl --out results.jsonl [--data fixtures] [--workers 8]
+#        [--llm-concurrency 4] [--style concise] [--policy template]
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from agent.answer import answer_text, get_policy, polish
+from agent.data import load_data
+from agent.interpreter import interpret
+from agent.narrate import narrate
+from agent.router import route
+
+LLM_CONCURRENCY = 4
+
+
+def read_questions(path):
+    # one question per line: {"question": ..., optional "id", "style"} or a bare JSON string
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"question": item}
+            if not item.get("question"):
+                raise ValueError(f"{path}:{n}: no question")
+            item.setdefault("id", n)
+            yield item
+
+
+def polished_answer(intent, payload, question, style, policy, version):
+    # template_first for a batch: the polish runs here, inside the caller's LLM slot, instead of
+    # on answer_text's background pool, which llm_concurrency cannot bound
+    return polish(intent, payload, question, style, narrate(intent, payload, style), version)
+
+
+class RouteOnce:
+    # identical interpretations are routed once; concurrent askers wait for the first
+    def __init__(self, ds):
+        self.ds = ds
+        self.lock = threading.Lock()
+        self.futures = {}
+
+    def __call__(self, interp):
+        key = (interp.get("intent"), tuple(interp.get("months") or []), (interp.get("filters") or {}).get("entity"))
+        with self.lock:
+            future = self.futures.get(key)
+            first = future is None
+            if first:
+                future = self.futures[key] = Future()
+        if first:
+            try:
+                future.set_result(route(interp, self.ds))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result(), not first
+
+    def __len__(self):
+        return len(self.futures)
+
+
+class BatchRunner:
+    # workers bounds the questions in flight; llm_concurrency bounds the stages that may call
+    # the LLM (interpret with USE_LLM on, answer_text unless the policy is "template"), so a
+    # big batch cannot flood the endpoint while purely local stages never queue for a slot
+
+    def __init__(self, ds, workers=8, llm_concurrency=LLM_CONCURRENCY, style="concise", policy=None):
+        self.ds = ds
+        self.workers = workers
+        self.network = threading.BoundedSemaphore(llm_concurrency)
+        self.style = style
+        self.policy = policy
+        self.route_once = RouteOnce(ds)
+        self.latest = ds.latest_month()
+
+    def run(self, items):
+        # one result per item, in input order, each yielded once it and those before it are done
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as pool:
+            futures = [pool.submit(self.one, item) for item in items]
+            for future in futures:
+                yield future.result()
+
+    def one(self, item):
+        t0 = time.perf_counter()
+        timings = {}
+        result = {"id": item["id"], "question": item["question"]}
+        try:
+            interp = self.stage(timings, "interpret", interpret, item["question"], self.latest,
+                                limited=os.getenv("USE_LLM") == "true")
+            result["interp"] = interp
+            routed, shared = self.stage(timings, "route", self.route_once, interp)
+            result.update(intent=routed.get("intent"), entity=routed.get("entity"),
+                          used_months=routed.get("used_months"), route_shared=shared)
+            if "error" in routed:
+                result["error"] = routed["error"]
+            else:
+                policy = get_policy(self.policy)
+                answer = polished_answer if policy == "template_first" else answer_text
+                result["answer"] = self.stage(
+                    timings, "answer_text", answer, routed["intent"], routed["payload"], item["question"],
+                    item.get("style", self.style), self.policy, self.ds.version,
+                    limited=policy != "template",
+                )
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        timings["total"] = round((time.perf_counter() - t0) * 1000, 3)
+        result["timings_ms"] = timings
+        return result
+
+    def stage(self, timings, name, fn, *args, limited=False):
+        # limited stages wait for an LLM slot first; that wait is reported as <name>_queued
+        t0 = time.perf_counter()
+        if limited:
+            with self.network:
+                t1 = time.perf_counter()
+                timings[f"{name}_queued"] = round((t1 - t0) * 1000, 3)
+                out = fn(*args)
+        else:
+            t1 = t0
+            out = fn(*args)
+        timings[name] = round((time.perf_counter() - t1) * 1000, 3)
+        return out
+
+
+def summarize(results, wall_s, routes):
+    stages = {}
+    for r in results:
+        for name, ms in r["timings_ms"].items():
+            stages.setdefault(name, []).append(ms)
+    return {
+        "questions": len(results),
+        "errors": sum(1 for r in results if "error" in r),
+        "distinct_routes": routes,
+        "wall_s": round(wall_s, 3),
+        "stages_ms": {name: {"p50": round(statistics.median(v), 3), "max": max(v)} for name, v in stages.items()},
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run questions from a JSONL file through interpret → route → answer.")
+    ap.add_argument("questions")
+    ap.add_argument("--out", default="-", help="results JSONL (default stdout)")
+    ap.add_argument("--data", default="fixtures")
+    ap.add_argument("--snapshot-dir", default=None)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--llm-concurrency", type=int, default=LLM_CONCURRENCY)
+    ap.add_argument("--style", default="concise", choices=["concise", "detail"])
+    ap.add_argument("--policy", default=None, choices=["llm", "template", "template_first"])
+    args = ap.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv(override=False)
+    ds = load_data(args.data, snapshot_dir=args.snapshot_dir)
+    items = list(read_questions(args.questions))
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    t0 = time.perf_counter()
+    runner = BatchRunner(ds, args.workers, args.llm_concurrency, args.style, args.policy)
+    results = []
+    try:
+        for r in runner.run(items):
+            out.write(json.dumps(r, ensure_ascii=False, default=str) + "\n")
+            out.flush()
+            results.append(r)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(json.dumps(summarize(results, time.perf_counter() - t0, len(runner.route_once)), indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
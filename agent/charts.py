@@ -2,6 +2,8 @@ import matplotlib.pyplot as plt
 from matplotlib.ticker import FuncFormatter
 import numpy as np
 
+from agent import trace
+
 usd_fmt = FuncFormatter(lambda x, pos: f"${x/1_000:,.0f}k")
 pct_fmt = FuncFormatter(lambda x, pos: f"{x*100:.3f}%")
 
@@ -77,7 +79,156 @@ def chart_ebitda(payload):
     fig.tight_layout()
     return fig
 
+def chart_cash_runway(payload):
+    labels = ["Cash", "Avg monthly burn"]
+    vals = [payload.get("cash_usd", 0.0), payload.get("avg_burn_usd", 0.0)]
+    runway = payload.get("runway_months")
+    fig, ax = plt.subplots(figsize=(6, 3))
+
+    ax.bar(labels, vals)
+    ax.set_ylabel("USD"); ax.yaxis.set_major_formatter(usd_fmt)
+    months = "no net burn" if runway is None else f"{runway:,.1f} months"
+    ax.set_title(f"Cash runway at {payload.get('month','')}: {months}")
+
+    fig.tight_layout()
+    return fig
+
+def chart_runway_series(payload):
+    months = payload.get("months", [])
+    runway = [np.nan if v is None else v for v in payload.get("runway_months", [])]
+    fig, ax = plt.subplots(figsize=(6, 3))
+
+    ax.bar(months, payload.get("cash_usd", []), alpha=0.4, label="Cash")
+    ax.set_ylabel("USD"); ax.yaxis.set_major_formatter(usd_fmt)
+    ax.set_xlabel("Month")
+    ax.tick_params(axis="x", labelrotation=45)
+
+    ax2 = ax.twinx()
+    ax2.plot(months, runway, marker="o", color="black", label="Runway")
+    ax2.set_ylabel("Months")
+
+    ax.set_title(f"Cash & runway ({payload.get('window', '')}-month avg burn)")
+    ax.legend(loc="upper left"); ax2.legend(loc="upper right")
+
+    fig.tight_layout()
+    return fig
+
+def chart_variance(payload):
+    rows = payload.get("rows", [])
+    months = list(dict.fromkeys(r["month"] for r in rows))
+    labels = list(dict.fromkeys(
+        f"{r['entity']} {r['account_category']}" if "entity" in r else r["account_category"] for r in rows
+    ))
+    grid = np.full((len(labels), len(months)), np.nan)
+    for r in rows:
+        label = f"{r['entity']} {r['account_category']}" if "entity" in r else r["account_category"]
+        if r["pct_to_budget"] is not None:
+            grid[labels.index(label), months.index(r["month"])] = r["pct_to_budget"] - 1
+    h = max(2.5, 0.35 * len(labels) + 1)
+    fig, ax = plt.subplots(figsize=(6, h))
+
+    lim = np.nanmax(np.abs(grid)) if np.isfinite(grid).any() else 0.1
+    im = ax.imshow(grid, cmap="RdYlGn", vmin=-lim, vmax=lim, aspect="auto")
+    ax.set_xticks(np.arange(len(months))); ax.set_xticklabels(months, rotation=45)
+    ax.set_yticks(np.arange(len(labels))); ax.set_yticklabels(labels)
+    fig.colorbar(im, ax=ax, format=FuncFormatter(lambda x, pos: f"{x*100:+.1f}%"))
+    ax.set_title("Actual vs budget")
+
+    fig.tight_layout()
+    return fig
+
+def chart_revenue_breakdown(payload):
+    names = payload.get("entities", [])
+    rows = [payload["breakdown"][e] for e in names]
+    x = np.arange(len(names))
+    w = 0.4
+    fig, ax = plt.subplots(figsize=(6, 3))
+
+    ax.bar(x - w / 2, [r.get("actual_usd", 0.0) for r in rows], w, label="Actual")
+    ax.bar(x + w / 2, [r.get("budget_usd", 0.0) for r in rows], w, label="Budget")
+    ax.set_xticks(x); ax.set_xticklabels(names)
+    ax.set_ylabel("USD"); ax.yaxis.set_major_formatter(usd_fmt)
+    ax.set_title(f"Revenue by entity, {payload.get('month','')} (total ${payload.get('actual_usd', 0.0)/1_000:,.0f}k)")
+    ax.legend()
+
+    fig.tight_layout()
+    return fig
+
+def chart_series_breakdown(payload, key, title):
+    months = payload.get("months", [])
+    fig, ax = plt.subplots(figsize=(6, 3))
+
+    for e in payload.get("entities", []):
+        ax.plot(months, payload["breakdown"][e].get(key, []), marker="o", label=e)
+    ax.plot(months, payload.get(key, []), marker="o", linewidth=2.5, color="black", label="Total")
+    ax.set_ylabel("USD"); ax.yaxis.set_major_formatter(usd_fmt)
+    ax.set_xlabel("Month")
+    ax.set_title(title)
+    ax.legend(loc="best", fontsize=8)
+
+    fig.tight_layout()
+    return fig
+
+def chart_runway_breakdown(payload, key, title):
+    names = payload.get("entities", [])
+    fig, ax = plt.subplots(figsize=(6, 3))
+
+    if key == "runway_months":
+        for e in names:
+            vals = payload["breakdown"][e].get(key, [])
+            ax.plot(payload.get("months", []), [np.nan if v is None else v for v in vals], marker="o", label=e)
+        ax.set_ylabel("Months"); ax.set_xlabel("Month")
+        ax.legend(loc="best", fontsize=8)
+    else:
+        ax.bar(names, [payload["breakdown"][e].get(key, 0.0) for e in names])
+        ax.set_ylabel("USD"); ax.yaxis.set_major_formatter(usd_fmt)
+    ax.set_title(title)
+
+    fig.tight_layout()
+    return fig
+
+def chart_opex_breakdown(payload):
+    names = payload.get("entities", [])
+    cats = payload.get("categories", [])
+    h = max(2.5, 0.35 * len(names) + 1)
+    fig, ax = plt.subplots(figsize=(6, h))
+
+    y = np.arange(len(names))
+    left = np.zeros(len(names))
+    for c in cats:
+        vals = []
+        for e in names:
+            row = payload["breakdown"][e]
+            vals.append(dict(zip(row.get("categories", []), row.get("values_usd", []))).get(c, 0.0))
+        ax.barh(y, vals, left=left, label=c)
+        left += np.array(vals)
+    ax.set_yticks(y); ax.set_yticklabels(names)
+    ax.set_xlabel("USD"); ax.xaxis.set_major_formatter(usd_fmt)
+    ax.set_title(f"Opex by entity and category in {payload.get('month','')}")
+    ax.legend(loc="best", fontsize=8)
+
+    fig.tight_layout()
+    return fig
+
+def render_breakdown(intent, payload):
+    if intent == "revenue":
+        return [chart_revenue_breakdown(payload)]
+    if intent == "gross_margin":
+        return [chart_series_breakdown(payload, "gm_usd", "Gross Margin by entity in USD")]
+    if intent == "opex_total":
+        return [chart_opex_breakdown(payload)]
+    if intent == "ebitda":
+        return [chart_series_breakdown(payload, "ebitda_usd", "EBITDA by entity in USD")]
+    if intent == "cash_runway":
+        return [chart_runway_breakdown(payload, "cash_usd", f"Cash by entity at {payload.get('month','')}")]
+    if intent == "cash_runway_trend":
+        return [chart_runway_breakdown(payload, "runway_months", "Runway by entity in months")]
+    return []
+
+@trace.traced("render_charts")
 def render_charts(intent: str, payload: dict):
+    if payload.get("breakdown") is not None:
+        return render_breakdown(intent, payload)
     if intent == "revenue":
         return [chart_revenue(payload)]
     if intent == "gross_margin":
@@ -86,4 +237,10 @@ def render_charts(intent: str, payload: dict):
         return [chart_opex_total(payload)]
     if intent == "ebitda":
         return [chart_ebitda(payload)]
+    if intent == "cash_runway":
+        return [chart_cash_runway(payload)]
+    if intent == "cash_runway_trend":
+        return [chart_runway_series(payload)]
+    if intent == "variance":
+        return [chart_variance(payload)]
     return []
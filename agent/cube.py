@@ -0,0 +1,109 @@
+from dataclasses import dataclass, field
+from typing import Dict
+
+# entity slot used for the consolidated (all entities) cells
+ALL = None
+
+
+@dataclass
+class Cube:
+    # {(month, entity, account_category): sum}; entity ALL holds the consolidated total
+    actual_usd: Dict = field(default_factory=dict)
+    actual_amount: Dict = field(default_factory=dict)
+    budget_usd: Dict = field(default_factory=dict)
+    budget_amount: Dict = field(default_factory=dict)
+    # {(month, entity): sorted Opex:* categories present in actuals}
+    opex_categories: Dict = field(default_factory=dict)
+    # {(month, entity): native-currency Opex sum, as cash_runway adds it up}
+    opex_amount: Dict = field(default_factory=dict)
+    # {(month, entity): cash_usd sum}
+    cash: Dict = field(default_factory=dict)
+    # {month: set of entities with actuals/budget rows}, and the same for cash rows
+    entities: Dict = field(default_factory=dict)
+    cash_entities: Dict = field(default_factory=dict)
+
+
+def build_cube(actuals, budget, cash):
+    cube = Cube()
+    cube.actual_usd = cells(actuals, "amount_usd")
+    cube.actual_amount = cells(actuals, "amount")
+    cube.budget_usd = cells(budget, "amount_usd")
+    cube.budget_amount = cells(budget, "amount")
+    cube.opex_amount = opex_totals(actuals)
+
+    by_ent = cash.groupby(["month", "entity"], observed=True)["cash_usd"].sum()
+    total = cash.groupby("month", observed=True)["cash_usd"].sum()
+    cube.cash = {(m, str(e)): float(v) for (m, e), v in by_ent.items()}
+    cube.cash.update({(m, ALL): float(v) for m, v in total.items()})
+    return index_cube(cube)
+
+
+def breakdown_cube(actuals, budget, cash):
+    # one (month, entity, category) groupby per frame; consolidated cells are re-summed
+    # from the per-entity groups instead of grouping the rows a second time
+    cube = Cube()
+    keys = ["month", "entity", "account_category"]
+    a = actuals.groupby(keys, observed=True)[["amount", "amount_usd"]].sum()
+    b = budget.groupby(keys, observed=True)[["amount", "amount_usd"]].sum()
+    cube.actual_usd = rollup(a["amount_usd"])
+    cube.actual_amount = rollup(a["amount"])
+    cube.budget_usd = rollup(b["amount_usd"])
+    cube.budget_amount = rollup(b["amount"])
+
+    is_opex = a.index.get_level_values("account_category").astype(str).str.startswith("Opex")
+    opex = a["amount"][is_opex]
+    for k, v in opex.groupby(level=["month", "entity"], observed=True).sum().items():
+        cube.opex_amount[(k[0], str(k[1]))] = float(v)
+    for k, v in opex.groupby(level="month", observed=True).sum().items():
+        cube.opex_amount[(k, ALL)] = float(v)
+
+    by_ent = cash.groupby(["month", "entity"], observed=True)["cash_usd"].sum()
+    total = by_ent.groupby(level="month", observed=True).sum()
+    cube.cash = {(m, str(e)): float(v) for (m, e), v in by_ent.items()}
+    cube.cash.update({(m, ALL): float(v) for m, v in total.items()})
+    return index_cube(cube)
+
+
+def index_cube(cube):
+    for (m, e, c) in cube.actual_usd:
+        if c.startswith("Opex"):
+            cube.opex_categories.setdefault((m, e), []).append(c)
+    for cats in cube.opex_categories.values():
+        cats.sort()
+
+    for src, out in ((cube.actual_usd, cube.entities), (cube.budget_usd, cube.entities), (cube.cash, cube.cash_entities)):
+        for k in src:
+            if k[1] is not ALL:
+                out.setdefault(k[0], set()).add(k[1])
+    return cube
+
+
+def cells(df, value):
+    # consolidated cells are grouped straight from the rows so they equal what the
+    # frame path computes, rather than a re-sum of the per-entity cells
+    by_ent = df.groupby(["month", "entity", "account_category"], observed=True)[value].sum()
+    total = df.groupby(["month", "account_category"], observed=True)[value].sum()
+    out = {(m, str(e), str(c)): float(v) for (m, e, c), v in by_ent.items()}
+    out.update({(m, ALL, str(c)): float(v) for (m, c), v in total.items()})
+    return out
+
+
+def rollup(by_ent):
+    out = {(m, str(e), str(c)): float(v) for (m, e, c), v in by_ent.items()}
+    total = by_ent.groupby(level=["month", "account_category"], observed=True).sum()
+    out.update({(m, ALL, str(c)): float(v) for (m, c), v in total.items()})
+    return out
+
+
+def opex_totals(actuals):
+    # mirrors cash_runway: sum per (month, category) first, then over the Opex categories
+    out = {}
+    for keys in (["month", "entity"], ["month"]):
+        grouped = actuals.groupby(keys + ["account_category"], as_index=False, observed=True)["amount"].sum()
+        rows = grouped[grouped["account_category"].astype(str).str.startswith("Opex")]
+        for k, v in rows.groupby(keys, observed=True)["amount"].sum().items():
+            if len(keys) == 2:
+                out[(k[0], str(k[1]))] = float(v)
+            else:
+                out[(k, ALL)] = float(v)
+    return out
@@ -1,10 +1,18 @@
 from dataclasses import dataclass
 from typing import Optional, Tuple
 import os
+import time
+import uuid
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 from pandas.api.types import is_numeric_dtype
 from dateutil import parser
 
+from agent import ingest, snapshot, trace
+from agent.cube import Cube, build_cube
+
 
 @dataclass
 class DataStore:
@@ -12,19 +20,389 @@ class DataStore:
     budget: pd.DataFrame
     cash: pd.DataFrame
     fx: pd.DataFrame
+    missing_fx: Optional[pd.DataFrame] = None
+    compact: bool = False
+    cube: Optional[Cube] = None
+    # changes whenever the underlying data does; result caches key on it
+    version: str = ""
+    # {"actuals"|"budget"|"cash": SortedIndex} over frames sorted by (month, entity)
+    index: Optional[dict] = None
+    # seconds spent per sheet / stage by load_data
+    load_timings: Optional[dict] = None
+    # {sheet: {"rows": n, "rejected": n}} for streamed CSV/Parquet sources
+    ingest_report: Optional[dict] = None
+    # where load_data read from, so refresh() can re-read it
+    source: Optional[dict] = None
+    # {frame: {month: row hash}} of the normalized source rows
+    fingerprints: Optional[dict] = None
+
+    def refresh(self):
+        # new DataStore with only the changed months re-derived; self is left untouched
+        from agent.refresh import refresh_datastore
+        return refresh_datastore(self)[0]
+
+    def rows(self, name, months, entity=None):
+        # rows of one frame for the given months (and entity), as contiguous slices when indexed
+        df = getattr(self, name)
+        keys = [self.month_key(m) for m in months]
+        idx = (self.index or {}).get(name)
+        if idx is None or idx.frame is not df:
+            trace.count("rows_scanned", len(df))
+            out = df[df["month"].isin(keys)]
+            return out[out["entity"] == entity] if entity else out
+        out = idx.take(keys, entity)
+        trace.count("rows_scanned", len(out))
+        return out
+
+    def latest_month(self):
+        # newest month with actuals, as a label; the anchor for relative dates
+        idx = (self.index or {}).get("actuals")
+        if idx is not None and idx.frame is self.actuals and len(idx.months):
+            return self.month_label(idx.months[-1])
+        months = self.actuals["month"].dropna()
+        return self.month_label(months.max()) if len(months) else None
+
+    def month_key(self, month):
+        # value to compare against the month columns (int32 ordinal in compact mode)
+        return month_ordinal(month) if self.compact else month
+
+    def month_label(self, key):
+        return ordinal_month(key) if self.compact else key
+
+    def memory_report(self):
+        rows = []
+        for name in ["actuals", "budget", "cash", "fx"]:
+            df = getattr(self, name)
+            usage = df.memory_usage(index=True, deep=True)
+            for col, nbytes in usage.items():
+                dtype = str(df[col].dtype) if col in df.columns else "index"
+                rows.append({"frame": name, "column": col, "dtype": dtype, "bytes": int(nbytes)})
+        return pd.DataFrame(rows, columns=["frame", "column", "dtype", "bytes"])
     
 
-def load_data(pth):
+def load_data(pth, snapshot_dir=None, compact=False, parallel=False, chunksize=None):
+    timings = {}
+    t0 = time.perf_counter()
+    frames, version, report = read_sources(pth, snapshot_dir, parallel, chunksize, timings)
+    t1 = time.perf_counter()
+    ds = build_datastore(**frames, compact=compact, version=version)
+    timings["build"] = time.perf_counter() - t1
+    timings["total"] = time.perf_counter() - t0
+    ds.load_timings = timings
+    ds.ingest_report = report
+    ds.source = {"pth": pth, "snapshot_dir": snapshot_dir, "parallel": parallel, "chunksize": chunksize}
+    return ds
+
+
+def read_sources(pth, snapshot_dir=None, parallel=False, chunksize=None, timings=None):
+    # normalized frames plus a version string for whatever source pth holds
     xlsx_path = os.path.join(pth, "data.xlsx")
+    sources = None if os.path.exists(xlsx_path) else ingest.find_sources(pth)
+    if sources:
+        # actuals/budget/cash/fx.csv|.parquet exports are streamed and aggregated in chunks
+        frames, report = ingest.stream_sources(sources, chunksize or ingest.CHUNKSIZE, timings)
+        return frames, ingest.sources_version(sources), report
+    if snapshot_dir:
+        frames, info = load_with_snapshot(xlsx_path, snapshot_dir, parallel=parallel, timings=timings)
+    else:
+        info = snapshot.source_info(xlsx_path)
+        frames = parse_workbook(xlsx_path, parallel=parallel, timings=timings)
+    return frames, info["sha256"][:16], None
+
+
+def source_signature(pth):
+    # cheap stat-only fingerprint of the source files, for polling for changes
+    xlsx_path = os.path.join(pth, "data.xlsx")
+    paths = [xlsx_path] if os.path.exists(xlsx_path) else sorted((ingest.find_sources(pth) or {}).values())
+    sig = []
+    for path in paths:
+        st = os.stat(path)
+        sig.append((path, st.st_size, st.st_mtime_ns))
+    return tuple(sig)
+
+
+def month_fingerprints(df):
+    # {month: order-independent hash of that month's rows}; used to find changed months on refresh
+    if df.empty:
+        return {}
+    h = pd.Series(pd.util.hash_pandas_object(df, index=False).to_numpy(), index=df.index)
+    return {str(m): int(v) for m, v in h.groupby(df["month"]).sum().items()}
+
+
+def build_datastore(actuals, budget, cash, fx, compact=False, version=None):
+    fingerprints = {name: month_fingerprints(df) for name, df in
+                    (("actuals", actuals), ("budget", budget), ("cash", cash), ("fx", fx))}
+    # convert to USD once here so metrics never have to merge fx per query
+    months, currencies, table = rate_table(fx)
+    missing_a = attach_usd(actuals, months, currencies, table)
+    missing_b = attach_usd(budget, months, currencies, table)
+
+    missing = pd.concat(
+        [actuals.loc[missing_a].assign(source="actuals"), budget.loc[missing_b].assign(source="budget")],
+        ignore_index=True,
+    )
+    if not missing.empty:
+        warnings.warn(f"{len(missing)} actuals/budget rows have no fx rate; their amount_usd is NaN")
+    if compact:
+        actuals, budget, cash, fx = compact_frames(actuals, budget, cash, fx)
+    cube = build_cube(actuals, budget, cash)
+    index = {}
+    actuals, index["actuals"] = SortedIndex.build(actuals)
+    budget, index["budget"] = SortedIndex.build(budget)
+    cash, index["cash"] = SortedIndex.build(cash)
+    return DataStore(
+        actuals=actuals, budget=budget, cash=cash, fx=fx, missing_fx=missing,
+        compact=compact, cube=cube, version=version or uuid.uuid4().hex[:16], index=index,
+        fingerprints=fingerprints,
+    )
+
+
+class SortedIndex:
+    # month/entity codes of a frame sorted by (month, entity); lookups are binary searches
+
+    def __init__(self, frame, months, entities, month_codes, entity_codes):
+        self.frame = frame
+        self.months = months
+        self.entities = entities
+        self.month_codes = month_codes
+        self.entity_codes = entity_codes
+
+    @classmethod
+    def build(cls, df):
+        mc, months = pd.factorize(df["month"], sort=True)
+        ec, entities = pd.factorize(df["entity"], sort=True)
+        order = np.lexsort((ec, mc))
+        frame = df.iloc[order].reset_index(drop=True)
+        return frame, cls(frame, pd.Index(months), pd.Index(entities), mc[order], ec[order])
+
+    def splice(self, keys, rows):
+        # replace whole months `keys` with `rows`; kept rows are already in order, so the new
+        # blocks are slotted in by binary search instead of re-sorting the full frame
+        part, other = SortedIndex.build(rows)
+        keep = ~self.months.isin(keys)
+        keep_rows = keep[self.month_codes]
+        months = pd.Index(sorted(set(self.months[keep]) | set(other.months)))
+        entities = pd.Index(sorted(set(self.entities) | set(other.entities)))
+
+        old_mc = months.get_indexer(self.months)[self.month_codes[keep_rows]]
+        old_ec = entities.get_indexer(self.entities)[self.entity_codes[keep_rows]]
+        new_mc = months.get_indexer(other.months)[other.month_codes]
+        new_ec = entities.get_indexer(other.entities)[other.entity_codes]
+
+        # months are disjoint between the two sides, so each new row lands before the first kept
+        # row of a later month
+        at = np.searchsorted(old_mc, new_mc, side="left") + np.arange(len(new_mc))
+        is_new = np.zeros(len(old_mc) + len(new_mc), dtype=bool)
+        is_new[at] = True
+        order = np.empty(len(is_new), dtype=np.int64)
+        order[~is_new] = np.arange(len(old_mc))
+        order[is_new] = len(old_mc) + np.arange(len(new_mc))
+
+        kept = self.frame[keep_rows] if not keep_rows.all() else self.frame
+        frame = pd.concat([kept, part], ignore_index=True).iloc[order].reset_index(drop=True)
+        mc = np.concatenate([old_mc, new_mc])[order]
+        ec = np.concatenate([old_ec, new_ec])[order]
+        return frame, SortedIndex(frame, months, entities, mc, ec)
+
+    def span(self, key, entity=None):
+        code = self.months.get_indexer([key])[0]
+        if code < 0:
+            return 0, 0
+        lo = int(np.searchsorted(self.month_codes, code, side="left"))
+        hi = int(np.searchsorted(self.month_codes, code, side="right"))
+        if entity:
+            e = self.entities.get_indexer([entity])[0]
+            if e < 0:
+                return 0, 0
+            block = self.entity_codes[lo:hi]
+            lo, hi = lo + int(np.searchsorted(block, e, side="left")), lo + int(np.searchsorted(block, e, side="right"))
+        return lo, hi
+
+    def take(self, keys, entity=None):
+        spans = sorted({self.span(k, entity) for k in keys})
+        merged = []
+        for lo, hi in spans:
+            if lo == hi:
+                continue
+            if merged and merged[-1][1] == lo:
+                merged[-1][1] = hi
+            else:
+                merged.append([lo, hi])
+        if not merged:
+            return self.frame.iloc[0:0]
+        if len(merged) == 1:
+            return self.frame.iloc[merged[0][0]:merged[0][1]]
+        return self.frame.iloc[np.concatenate([np.arange(lo, hi) for lo, hi in merged])]
+
+
+MONTH_NA = np.iinfo(np.int32).min
+
+
+def month_ordinal(month):
+    # same numbering as pd.Period(month, "M").ordinal, computed without building Periods
+    try:
+        year, mon = int(str(month)[:4]), int(str(month)[5:7])
+    except ValueError:
+        return MONTH_NA
+    if not 1 <= mon <= 12:
+        return MONTH_NA
+    return (year - 1970) * 12 + mon - 1
+
+
+def ordinal_month(key):
+    year, mon = divmod(int(key), 12)
+    return f"{year + 1970:04d}-{mon + 1:02d}"
+
+
+def month_ordinals(series):
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    lookup = np.array([month_ordinal(m) for m in uniques] + [MONTH_NA], dtype=np.int32)
+    return lookup[codes]
+
+
+def shared_dtype(*series):
+    values = pd.unique(pd.concat([s.dropna().astype(str) for s in series], ignore_index=True))
+    return pd.CategoricalDtype(sorted(values))
+
+
+def compact_dtypes(actuals, budget, cash, fx):
+    # one dictionary per dimension so codes line up across frames
+    return {
+        "entity": shared_dtype(actuals["entity"], budget["entity"], cash["entity"]),
+        "account_category": shared_dtype(actuals["account_category"], budget["account_category"]),
+        "currency": shared_dtype(actuals["currency"], budget["currency"], fx["currency"]),
+    }
+
+
+def compact_frames(actuals, budget, cash, fx, dtypes=None):
+    dtypes = dtypes or compact_dtypes(actuals, budget, cash, fx)
+    floats = ["amount", "amount_usd", "cash_usd", "rate_to_usd"]
+
+    out = []
+    for df in (actuals, budget, cash, fx):
+        cols = {}
+        for col in df.columns:
+            if col == "month":
+                cols[col] = month_ordinals(df[col])
+            elif col in dtypes:
+                cols[col] = df[col].astype(dtypes[col])
+            elif col in floats:
+                cols[col] = np.ascontiguousarray(pd.to_numeric(df[col], errors="coerce"), dtype="float64")
+            else:
+                cols[col] = df[col]
+        out.append(pd.DataFrame(cols, index=df.index))
+    return out
+
+
+def category_startswith(series, prefix):
+    # on categoricals only the dictionary is scanned, then broadcast through the codes
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        hits = np.append(series.cat.categories.astype(str).str.startswith(prefix), False)
+        return pd.Series(hits[series.cat.codes.to_numpy()], index=series.index)
+    return series.astype(str).str.startswith(prefix)
+
+
+def rate_table(fx, *, month="month", currency="currency", rate="rate_to_usd"):
+    # dense month x currency matrix of rates, NaN where fx has no quote
+    months = pd.Index(pd.unique(fx[month]))
+    currencies = pd.Index(pd.unique(fx[currency]))
+    table = np.full((len(months), len(currencies)), np.nan)
+    rates = pd.to_numeric(fx[rate], errors="coerce").to_numpy(dtype="float64")
+    table[months.get_indexer(fx[month]), currencies.get_indexer(fx[currency])] = rates
+    return months, currencies, table
+
+
+def attach_usd(df, months, currencies, table, *, month="month", currency="currency", amount="amount", amount_usd="amount_usd"):
+    mi = months.get_indexer(df[month])
+    ci = currencies.get_indexer(df[currency])
+    found = (mi >= 0) & (ci >= 0)
+
+    rates = np.full(len(df), np.nan)
+    rates[found] = table[mi[found], ci[found]]
+
+    amounts = df[amount]
+    if not is_numeric_dtype(amounts):
+        amounts = pd.to_numeric(amounts, errors="coerce")
+    df[amount_usd] = amounts.to_numpy() * rates
+    return np.isnan(rates)
+
+
+def ensure_usd(df, fx):
+    # frames from load_data already carry amount_usd; ad-hoc frames fall back to the merge
+    if "amount_usd" in df.columns:
+        return df
+    return to_usd(df, fx)
+
+
+def load_with_snapshot(xlsx_path, snapshot_dir, parallel=False, timings=None):
+    # normalized frames are cached as memory-mapped columns keyed on the workbook's path/size/mtime/hash
+    t0 = time.perf_counter()
+    info = snapshot.source_info(xlsx_path)
+    frames = snapshot.read_snapshot(snapshot_dir, info)
+    if frames is not None:
+        if timings is not None:
+            timings["snapshot"] = time.perf_counter() - t0
+        return frames, info
+
+    frames = parse_workbook(xlsx_path, parallel=parallel, timings=timings)
+    try:
+        snapshot.write_snapshot(snapshot_dir, info, frames)
+    except (OSError, ValueError) as e:
+        warnings.warn(f"could not write data snapshot: {e}")
+    return frames, info
+
+
+SHEETS = ["actuals", "budget", "cash", "fx"]
+
+
+def parse_workbook(xlsx_path, parallel=False, timings=None):
+    timings = {} if timings is None else timings
+    if parallel:
+        return parse_workbook_parallel(xlsx_path, timings)
+
+    t0 = time.perf_counter()
     xl = pd.ExcelFile(xlsx_path)
-    actuals = load_actuals_budget(xl.parse("actuals"))
-    # print("acutals loaded")
-    budget = load_actuals_budget(xl.parse("budget"))
-    
-    cash = load_cash(xl.parse("cash"))
-    fx = load_fx(xl.parse("fx"))
+    timings["open"] = time.perf_counter() - t0
+    frames = {}
+    for sheet in SHEETS:
+        t0 = time.perf_counter()
+        frames[sheet] = normalize_sheet(sheet, xl.parse(sheet))
+        timings[sheet] = time.perf_counter() - t0
     # print("data laoded")
-    return DataStore(actuals=actuals, budget=budget, fx=fx, cash=cash)
+    return frames
+
+
+def normalize_sheet(sheet, df):
+    if sheet in ("actuals", "budget"):
+        return load_actuals_budget(df)
+    if sheet == "cash":
+        return load_cash(df)
+    return load_fx(df)
+
+
+def parse_workbook_parallel(xlsx_path, timings):
+    # one process per sheet; frames come back as column arrays rather than pickled rows
+    frames = {}
+    with ProcessPoolExecutor(max_workers=len(SHEETS)) as pool:
+        futures = {sheet: pool.submit(parse_sheet, xlsx_path, sheet) for sheet in SHEETS}
+        for sheet, fut in futures.items():
+            encoded, elapsed = fut.result()
+            if isinstance(encoded, pd.DataFrame):
+                frames[sheet] = encoded
+            else:
+                frames[sheet] = snapshot.frame_from_arrays(*encoded)
+            timings[sheet] = elapsed
+    return frames
+
+
+def parse_sheet(xlsx_path, sheet):
+    t0 = time.perf_counter()
+    df = normalize_sheet(sheet, pd.read_excel(xlsx_path, sheet_name=sheet))
+    try:
+        encoded = snapshot.encode_frame(df)
+    except ValueError:
+        encoded = df  # mixed-type columns travel as a plain frame
+    return encoded, time.perf_counter() - t0
 
 
 def to_usd(df, fx, *, month="month", currency="currency", amount="amount", rate= "rate_to_usd", amount_usd="amount_usd"):
@@ -81,8 +459,8 @@ def load_cash(path):
 
 def load_csv(path, required):
     df = path.copy()
-    # missing = [c for c in required if c not in df.columns]
-    # if missing:
-    #     raise ValueError(f"{os.path.basename(str(path))} missing columns: {missing}")
+    missing = [c for c in required if c not in df.columns]
+    if missing:
+        raise ValueError(f"sheet missing columns: {missing}")
 
     return df
@@ -0,0 +1,227 @@
+import datetime as dt
+import os
+import re
+
+# first month of the fiscal year (1 = calendar years); FY2025 is the fiscal year ending in 2025
+FISCAL_YEAR_START = int(os.getenv("FISCAL_YEAR_START", "1"))
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+NUMBERS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "eighteen": 18, "twenty-four": 24,
+    "a": 1, "a couple of": 2, "a few": 3,
+}
+ORDINALS = {"first": 1, "second": 2, "third": 3, "fourth": 4, "1st": 1, "2nd": 2, "3rd": 3, "4th": 4}
+
+MON = (r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+       r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)")
+YEAR = r"(?:19|20)\d{2}"
+NUM = r"(?:\d{1,3}|" + "|".join(sorted((re.escape(k) for k in NUMBERS), key=len, reverse=True)) + r")"
+# one month: 2025-06, 06/2025, "June 2025", "Jun '25", or a bare month name
+POINT = rf"(?:{YEAR}-\d{{2}}|\d{{1,2}}/{YEAR}|{MON}\.?(?:,?\s*(?:{YEAR}|'\d{{2}}))?)"
+RANGE_SEP = r"\s*(?:to|through|thru|until|till|and|-|–)\s*"
+
+# words that mean a date was asked for in a way the rules below don't cover
+CUES = re.compile(
+    r"\b(since|before|after|until|between|next|ago|weeks?|days?|yesterday|tomorrow|h[12]|half|"
+    r"semester|season|fiscal|fy|quarters?|q[1-9]|\d+\s+(?:months?|years?)|(?:19|20)\d{2})\b"
+)
+# YYYY-MM / MM/YYYY shaped tokens whose month is out of range: reported, never reinterpreted
+BAD_MONTH = re.compile(rf"(?<![\w-])(?:{YEAR}-(?!0[1-9]|1[0-2])\d{{2}}|(?!0?[1-9]/|1[0-2]/)\d{{1,2}}/{YEAR})(?![\w-])")
+
+
+def resolve_dates(text, latest=None, fiscal_start=None):
+    # months mentioned in `text`, in the order mentioned. Relative phrases ("last quarter",
+    # "YTD", "past 6 months") count back from `latest`, the newest month with data.
+    # ambiguous is set when date words remain that no rule understood; invalid lists
+    # month-shaped tokens with an impossible month (2025-13, 00/2025).
+    fiscal_start = fiscal_start or FISCAL_YEAR_START
+    anchor = to_ordinal(latest) if latest else to_ordinal(dt.date.today().strftime("%Y-%m"))
+    q = " " + text.lower() + " "
+    found = []
+    invalid = [m.group(0) for m in BAD_MONTH.finditer(q)]
+    q = BAD_MONTH.sub(lambda m: " " * len(m.group(0)), q)
+
+    def take(pattern, fn):
+        nonlocal q
+        for m in list(re.finditer(pattern, q)):
+            months = fn(m)
+            if months is None:
+                continue
+            found.append((m.start(), months, m.group(0).strip()))
+            q = q[:m.start()] + " " * (m.end() - m.start()) + q[m.end():]
+
+    # explicit ranges first so their endpoints are not read as single months
+    take(rf"\b(?:from\s+|between\s+)?({POINT}){RANGE_SEP}({POINT})(?![\w-])",
+         lambda m: point_range(m.group(1), m.group(2), anchor))
+    take(rf"\bsince\s+({POINT})(?![\w-])", lambda m: since(m.group(1), anchor))
+
+    take(r"\b(?:ytd|year[- ]to[- ]date)(?:\s+(?:for\s+)?(" + YEAR + r"))?\b",
+         lambda m: year_to_date(m.group(1), anchor, fiscal_start))
+    take(r"\b(?:qtd|quarter[- ]to[- ]date|(?:this|current) quarter)\b",
+         lambda m: span(quarter_start(anchor, fiscal_start), anchor))
+    take(r"\b(?:mtd|month[- ]to[- ]date)\b", lambda m: [anchor])
+
+    take(rf"\b(?:in\s+|for\s+)?(?:fiscal\s+quarter\s*|fq\s*|q)([1-4])\s*(?:of\s+)?(fy|fiscal(?:\s+year)?)\s*'?(\d{{2}}|{YEAR})\b",
+         lambda m: quarter(int(m.group(1)), full_year(m.group(3)), fiscal_start))
+    take(rf"\b(fy|fiscal(?:\s+year)?)\s*'?(\d{{2}}|{YEAR})\s*q([1-4])\b",
+         lambda m: quarter(int(m.group(3)), full_year(m.group(2)), fiscal_start))
+    take(rf"\bq([1-4])\s*(?:of\s+)?'?({YEAR}|\d{{2}})\b", lambda m: quarter(int(m.group(1)), full_year(m.group(2)), 1))
+    take(rf"\b({YEAR})\s*-?\s*q([1-4])\b", lambda m: quarter(int(m.group(2)), int(m.group(1)), 1))
+    take(rf"\b(first|second|third|fourth|1st|2nd|3rd|4th) quarter(?: of)?\s+({YEAR})\b",
+         lambda m: quarter(ORDINALS[m.group(1)], int(m.group(2)), 1))
+    take(r"\bq([1-4])\b", lambda m: latest_quarter(int(m.group(1)), anchor))
+    take(rf"\bh([12])\s*(?:of\s+)?(?:fy\s*)?'?({YEAR}|\d{{2}})\b|\b(first|second) half(?: of)?\s+(?:fy\s*)?({YEAR})\b",
+         lambda m: half(1 if (m.group(1) or "") == "1" or m.group(3) == "first" else 2,
+                        full_year(m.group(2) or m.group(4)), fiscal_start))
+
+    take(rf"\b(?:fy|fiscal(?:\s+year)?)\s*'?(\d{{2}}|{YEAR})\b", lambda m: fiscal_year(full_year(m.group(1)), fiscal_start))
+    take(rf"\b(?:calendar year|cy|full year|year)\s+({YEAR})\b", lambda m: span(to_ordinal(f"{m.group(1)}-01"), to_ordinal(f"{m.group(1)}-12")))
+
+    take(rf"\b(?:last|past|previous|prior|trailing|recent)\s+({NUM})\s+months?\b",
+         lambda m: span(anchor - number(m.group(1)) + 1, anchor))
+    take(r"\b(?:ttm|ltm)\b", lambda m: span(anchor - 11, anchor))
+    take(rf"\b(?:last|past|previous|prior|trailing)\s+({NUM})\s+quarters?\b",
+         lambda m: last_quarters(number(m.group(1)), anchor, fiscal_start))
+    take(r"\b(?:last|previous|prior) quarter\b", lambda m: last_quarters(1, anchor, fiscal_start))
+    take(rf"\b(?:last|past|previous|prior|trailing)\s+({NUM})\s+years?\b",
+         lambda m: span(anchor - 12 * number(m.group(1)) + 1, anchor))
+    take(r"\b(?:last|previous|prior) (?:fiscal )?year\b", lambda m: fiscal_year(fiscal_year_of(anchor, fiscal_start) - 1, fiscal_start))
+    take(r"\b(?:this|current) (?:fiscal )?year\b", lambda m: year_to_date(None, anchor, fiscal_start))
+    take(r"\b(?:last|previous|prior|this|current|latest|most recent) month\b",
+         lambda m: [anchor])
+
+    take(rf"(?<![\w-])({POINT})(?![\w-])",
+         lambda m: point(m.group(1), anchor, allow_may=bool(re.search(r"\b(?:in|for|of|during|since|from|to)\s+$", q[:m.start()]))))
+    # a bare number is only a year next to a date word: "in 2024", not "above 2000"
+    take(rf"\b(?:in|for|during|throughout|over|of)\s+(?:the\s+)?({YEAR})(?![\w-])",
+         lambda m: span(to_ordinal(f"{m.group(1)}-01"), to_ordinal(f"{m.group(1)}-12")))
+
+    months = []
+    for _, ms, _ in sorted(found, key=lambda f: f[0]):
+        for o in ms:
+            label = to_label(o)
+            if label not in months:
+                months.append(label)
+    return {
+        "months": months,
+        "ambiguous": bool(CUES.search(q)),
+        "phrases": [p for _, _, p in sorted(found, key=lambda f: f[0])],
+        "invalid": invalid,
+    }
+
+
+def to_ordinal(label):
+    year, mon = int(label[:4]), int(label[5:7])
+    return year * 12 + mon - 1
+
+
+def to_label(o):
+    year, mon = divmod(o, 12)
+    return f"{year:04d}-{mon + 1:02d}"
+
+
+def span(first, last):
+    return list(range(first, last + 1)) if first <= last else []
+
+
+def number(word):
+    word = word.strip()
+    return int(word) if word.isdigit() else NUMBERS[word]
+
+
+def full_year(y):
+    y = y.lstrip("'")
+    return int(y) if len(y) == 4 else 2000 + int(y)
+
+
+def point(text, anchor, year_hint=None, allow_may=False):
+    # a single month; a bare month name is the latest such month not after the anchor
+    text = text.strip().rstrip(".")
+    m = re.fullmatch(rf"({YEAR})-(\d{{2}})", text)
+    if m:
+        return [to_ordinal(text)] if 1 <= int(m.group(2)) <= 12 else None
+    m = re.fullmatch(rf"(\d{{1,2}})/({YEAR})", text)
+    if m:
+        return [int(m.group(2)) * 12 + int(m.group(1)) - 1] if 1 <= int(m.group(1)) <= 12 else None
+    m = re.fullmatch(rf"({MON})\.?(?:,?\s*({YEAR}|'\d{{2}}))?", text)
+    if not m:
+        return None
+    mon = MONTHS[m.group(1)[:3]]
+    if m.group(2):
+        return [full_year(m.group(2)) * 12 + mon - 1]
+    if mon == 5 and year_hint is None and not allow_may:
+        # a bare "may" is too often the verb
+        return None
+    year = year_hint if year_hint is not None else anchor // 12
+    o = year * 12 + mon - 1
+    return [o - 12 if year_hint is None and o > anchor else o]
+
+
+def point_range(a, b, anchor):
+    end = point(b, anchor, allow_may=True)
+    if end is None:
+        return None
+    # "June to August 2025": the first end borrows the year of the second
+    start = point(a, anchor, year_hint=None if re.search(r"\d", a) else end[0] // 12, allow_may=True)
+    if start is None:
+        return None
+    if start[0] > end[0] and not re.search(r"\d", a):
+        start = [start[0] - 12]
+    return span(start[0], end[0])
+
+
+def since(a, anchor):
+    start = point(a, anchor, allow_may=True)
+    return span(start[0], anchor) if start else None
+
+
+def fiscal_year_of(o, fiscal_start):
+    year, mon = divmod(o, 12)
+    return year + 1 if fiscal_start > 1 and mon + 1 >= fiscal_start else year
+
+
+def fiscal_year(fy, fiscal_start):
+    first = (fy - (1 if fiscal_start > 1 else 0)) * 12 + fiscal_start - 1
+    return span(first, first + 11)
+
+
+def quarter(n, year, fiscal_start):
+    first = fiscal_year(year, fiscal_start)[0] + 3 * (n - 1)
+    return span(first, first + 2)
+
+
+def half(n, year, fiscal_start):
+    first = fiscal_year(year, fiscal_start)[0] + 6 * (n - 1)
+    return span(first, first + 5)
+
+
+def quarter_start(o, fiscal_start):
+    return o - (o - (fiscal_start - 1)) % 3
+
+
+def latest_quarter(n, anchor):
+    # "Q2" with no year: the most recent calendar Q2 that has started by the anchor
+    year = anchor // 12
+    months = quarter(n, year, 1)
+    if months[0] > anchor:
+        months = quarter(n, year - 1, 1)
+    return [o for o in months if o <= anchor]
+
+
+def last_quarters(n, anchor, fiscal_start):
+    # the n quarters before the one the anchor is in, unless the anchor closes its quarter
+    start = quarter_start(anchor, fiscal_start)
+    end = anchor if anchor == start + 2 else start - 1
+    return span(end - 3 * n + 1, end)
+
+
+def year_to_date(year, anchor, fiscal_start):
+    if year is None:
+        fy = fiscal_year_of(anchor, fiscal_start)
+    else:
+        fy = int(year)
+    return [o for o in fiscal_year(fy, fiscal_start) if o <= anchor]
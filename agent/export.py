@@ -6,6 +6,8 @@ import textwrap
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_pdf import PdfPages
 
+from agent import trace
+
 
 def label_month(payload):
     ms = payload.get("months") or []
@@ -14,34 +16,40 @@ def label_month(payload):
     return payload.get("month") or "period"
 
 
-def build_pdf(intent, payload, question, answer, figs):
-    # print(intent)
-    # print(payload)
-    # print(question)
+def cover_page(intent, payload, question):
+    # first report page laid out up to the answer, which build_pdf writes in at (ax, y);
+    # lets the page be prepared while the answer is still being generated
+    fig = plt.figure(figsize=(8.5, 11))
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.axis("off")
+
+    ts = dt.datetime.now().strftime("%Y-%m-%d %H:%M")
+    lines = [
+        "CFO Copilot Report",
+        "",
+        f"Intent: {intent}",
+        f"Months: {label_month(payload)}",
+        f"Generated: {ts}",
+        "",
+        "Question:",
+        textwrap.fill(question or "", width=100),
+        "",
+        "Answer:",
+    ]
+    y = 0.9
+    for ln in lines:
+        ax.text(0.07, y, ln, fontsize=11, va="top")
+        y -= 0.04 if ln else 0.02
+    return fig, ax, y
+
+
+@trace.traced("build_pdf")
+def build_pdf(intent, payload, question, answer, figs, cover=None):
+    # cover is a cover_page() made earlier for the same question, if any
     buf = BytesIO()
     with PdfPages(buf) as pdf:
-        fig = plt.figure(figsize=(8.5, 11))
-        ax = fig.add_axes([0, 0, 1, 1])
-        ax.axis("off")
-
-        ts = dt.datetime.now().strftime("%Y-%m-%d %H:%M")
-        lines = [
-            "CFO Copilot Report",
-            "",
-            f"Intent: {intent}",
-            f"Months: {label_month(payload)}",
-            f"Generated: {ts}",
-            "",
-            "Question:",
-            textwrap.fill(question or "", width=100),
-            "",
-            "Answer:",
-            textwrap.fill(answer or "", width=100),
-        ]
-        y = 0.9
-        for ln in lines:
-            ax.text(0.07, y, ln, fontsize=11, va="top")
-            y -= 0.04 if ln else 0.02
+        fig, ax, y = cover or cover_page(intent, payload, question)
+        ax.text(0.07, y, textwrap.fill(answer or "", width=100), fontsize=11, va="top")
 
         pdf.savefig(fig)
         plt.close(fig)
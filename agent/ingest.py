@@ -0,0 +1,119 @@
+import hashlib
+import os
+import time
+
+import pandas as pd
+
+# sheet -> (required columns, numeric columns, key columns)
+SOURCES = {
+    "actuals": (["month", "entity", "account_category", "amount", "currency"], ["amount"], ["month", "entity", "account_category", "currency"]),
+    "budget": (["month", "entity", "account_category", "amount", "currency"], ["amount"], ["month", "entity", "account_category", "currency"]),
+    "cash": (["month", "entity", "cash_usd"], ["cash_usd"], ["month", "entity"]),
+    "fx": (["month", "currency", "rate_to_usd"], ["rate_to_usd"], ["month", "currency"]),
+}
+EXTENSIONS = [".parquet", ".csv"]
+CHUNKSIZE = int(os.getenv("INGEST_CHUNKSIZE", "500000"))
+MONTH_RE = r"\d{4}-(0[1-9]|1[0-2])(-(0[1-9]|[12]\d|3[01]))?"
+
+
+def find_sources(pth):
+    # {sheet: path} when every sheet exists as <sheet>.parquet or <sheet>.csv under pth
+    found = {}
+    for sheet in SOURCES:
+        for ext in EXTENSIONS:
+            path = os.path.join(pth, sheet + ext)
+            if os.path.exists(path):
+                found[sheet] = path
+                break
+    return found if len(found) == len(SOURCES) else None
+
+
+def sources_version(sources):
+    # size + mtime only: hashing multi-GB exports would cost as much as reading them
+    h = hashlib.sha256()
+    for sheet in sorted(sources):
+        st = os.stat(sources[sheet])
+        h.update(f"{sheet}|{os.path.abspath(sources[sheet])}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def iter_chunks(path, columns, chunksize):
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("reading parquet ledgers requires pyarrow (pip install pyarrow)") from e
+        pf = pq.ParquetFile(path)
+        missing = [c for c in columns if c not in pf.schema_arrow.names]
+        if missing:
+            raise ValueError(f"{os.path.basename(path)} missing columns: {missing}")
+        for batch in pf.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+        return
+
+    header = pd.read_csv(path, nrows=0).columns
+    missing = [c for c in columns if c not in header]
+    if missing:
+        raise ValueError(f"{os.path.basename(path)} missing columns: {missing}")
+    reader = pd.read_csv(path, usecols=columns, dtype=str, chunksize=chunksize)
+    for chunk in reader:
+        yield chunk
+
+
+def clean_chunk(df, required, numeric, keys):
+    # vectorized validation: well-formed month, non-null keys, numeric values; bad rows dropped
+    month = df["month"].astype("string").str.strip()
+    ok = month.str.fullmatch(MONTH_RE).fillna(False).to_numpy(dtype=bool)
+    out = {"month": month.str.slice(0, 7)}
+    for col in keys:
+        if col == "month":
+            continue
+        vals = df[col].astype("string").str.strip()
+        ok &= vals.notna().to_numpy(dtype=bool) & (vals != "").fillna(False).to_numpy(dtype=bool)
+        out[col] = vals
+    for col in numeric:
+        vals = pd.to_numeric(df[col], errors="coerce")
+        ok &= vals.notna().to_numpy()
+        out[col] = vals.astype("float64")
+    clean = pd.DataFrame(out)[required][ok]
+    for col in keys:
+        clean[col] = clean[col].astype(object)
+    return clean, int((~ok).sum())
+
+
+def combine(parts, sheet, keys, numeric):
+    df = pd.concat(parts, ignore_index=True)
+    if sheet == "fx":
+        # rates are not additive; the last quote for a (month, currency) wins
+        return df.drop_duplicates(subset=keys, keep="last").reset_index(drop=True)
+    return df.groupby(keys, as_index=False, sort=False)[numeric].sum()
+
+
+def stream_sheet(path, sheet, chunksize=CHUNKSIZE):
+    # aggregates chunk by chunk so memory stays bounded by the number of distinct keys
+    required, numeric, keys = SOURCES[sheet]
+    parts, pending, rejected, rows = [], 0, 0, 0
+    for chunk in iter_chunks(path, required, chunksize):
+        rows += len(chunk)
+        clean, bad = clean_chunk(chunk, required, numeric, keys)
+        rejected += bad
+        parts.append(combine([clean], sheet, keys, numeric))
+        pending += len(parts[-1])
+        if pending > chunksize:
+            parts = [combine(parts, sheet, keys, numeric)]
+            pending = len(parts[0])
+    if parts:
+        df = combine(parts, sheet, keys, numeric)
+    else:
+        df = pd.DataFrame({c: pd.Series(dtype="float64" if c in numeric else object) for c in required})
+    return df[required], {"rows": rows, "rejected": rejected}
+
+
+def stream_sources(sources, chunksize=CHUNKSIZE, timings=None):
+    frames, report = {}, {}
+    for sheet, path in sources.items():
+        t0 = time.perf_counter()
+        frames[sheet], report[sheet] = stream_sheet(path, sheet, chunksize)
+        if timings is not None:
+            timings[sheet] = time.perf_counter() - t0
+    return frames, report
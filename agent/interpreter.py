@@ -1,33 +1,52 @@
 import os
 import json
-import requests
+import hashlib
+import datetime as dt
 import re
 from typing import Dict, Any, List, Optional
 
-def interpret(question):
+from agent import llm, trace
+from agent.dates import resolve_dates
+from agent.sqlcache import SQLiteCache
 
+@trace.traced("interpret")
+def interpret(question, latest=None):
+    # latest: newest month in the DataStore, the anchor for "last quarter", "YTD", ...
+    dates = resolve_dates(question, latest)
+    if dates["invalid"]:
+        raise ValueError(f"Invalid month {dates['invalid'][0]}: months run 01-12 (YYYY-MM).")
     use_llm = os.getenv("USE_LLM") == "true"
-    if use_llm:
-        result = llm_interp(question)
+    # the LLM is only asked when the local rules can't settle the dates or the intent
+    if use_llm and (dates["ambiguous"] or get_intent(question.lower()) is None):
+        try:
+            result = llm_interp(question, latest)
+        except llm.LLMError as e:
+            # LLM down, timing out or circuit open: the local parse is still a usable answer
+            trace.annotate(llm_error=type(e).__name__)
+            result = None
         if result is not None:
+            trace.annotate(source="llm")
             return validate(result)
 
-    result = basic_interp(question)
+    trace.annotate(source="basic")
+    result = basic_interp(question, latest, dates)
     return validate(result)
 
 
 
-ALLOWED_INTENTS = {"revenue", "gross_margin", "opex_total", "ebitda", "cash_runway"}
+ALLOWED_INTENTS = {"revenue", "gross_margin", "opex_total", "ebitda", "cash_runway", "cash_runway_trend", "variance"}
 
 LLM_SYSTEM_PROMPT = """You are a planner that outputs only strict JSON with no extra text."""
 
 PROMPT = """Classify intent and extract months from the user's question. Don't forcefully choose an intent if there is none.
 
-- Allowed intents (exact strings): ["revenue", "gross_margin", "opex_total", "ebitda", "cash_runway"]
-- if no exact month(s), cash_runway should be last three months, every other intents are current month.
+- Allowed intents (exact strings): ["revenue", "gross_margin", "opex_total", "ebitda", "cash_runway", "cash_runway_trend", "variance"]
+- Use cash_runway_trend when the user asks how runway or burn has changed over time.
+- Use variance when the user wants budget vs actual across all categories (COGS, Opex, Revenue), e.g. a month-end review.
+- if no exact month(s), cash_runway should be last three months, cash_runway_trend the last twelve months, every other intents are current month.
 - "months" MUST be a JSON array of strings in YYYY-MM format, ordered as the user implies.
 - If the user uses natural language dates (e.g., "June 2025", "Q2 2025", "last three months"), convert them to explicit YYYY-MM values.
-- Optional: include filters.entity if the user specifies a single entity.
+- Optional: include filters.entity if the user specifies a single entity, or filters.entity "*" if they want every entity side by side.
 - Output JSON only. No prose.
 
 Examples:
@@ -43,45 +62,71 @@ A: {"intent":"opex_total","months":["2025-06"]}
 Q: "What is our cash runway right now?"
 A: {"intent":"cash_runway","months":["2025-07","2025-08","2025-09"]}
 
+Q: "How has our runway evolved from 2025-01 to 2025-06?"
+A: {"intent":"cash_runway_trend","months":["2025-01","2025-02","2025-03","2025-04","2025-05","2025-06"]}
+
+Q: "Full budget vs actual variance for Q2 2025."
+A: {"intent":"variance","months":["2025-04","2025-05","2025-06"]}
+
 Q: "What was June 2025 revenue vs budget in USD for ParentCo?"
 A: {"intent":"revenue","months":["2025-06"], "filters": {"entity": "ParentCo"}}
 
+Q: "Show EBITDA by entity for 2025-04 to 2025-06."
+A: {"intent":"ebitda","months":["2025-04","2025-05","2025-06"], "filters": {"entity": "*"}}
+
 """
 
-def llm_interp(question):
+# changes whenever the prompt text does, so cached interpretations of an older prompt are never served
+PROMPT_VERSION = hashlib.sha256((LLM_SYSTEM_PROMPT + PROMPT).encode("utf-8")).hexdigest()[:12]
+
+INTERP_CACHE_PATH = os.getenv("INTERP_CACHE_PATH", ".cache/interp.sqlite")
+INTERP_CACHE_TTL = float(os.getenv("INTERP_CACHE_TTL", str(7 * 24 * 3600)))
+INTERP_CACHE_SIZE = int(os.getenv("INTERP_CACHE_SIZE", "5000"))
+_interp_cache = None
+
+
+def interp_cache():
+    # None when INTERP_CACHE_PATH is set empty
+    global _interp_cache
+    if _interp_cache is None and INTERP_CACHE_PATH:
+        _interp_cache = SQLiteCache(INTERP_CACHE_PATH, "interp", ttl=INTERP_CACHE_TTL, maxsize=INTERP_CACHE_SIZE)
+    return _interp_cache
+
 
-    api_url = os.getenv("HF_API_URL")
-    api_token = os.getenv("HF_TOKEN")
-    model = os.getenv("HF_MODEL", "meta-llama/Llama-3.1-8B-Instruct")
-    # print(api_url)
-    # print(api_token)
-    # print(model)
-    if not api_token:
+def normalize_question(question):
+    return " ".join(question.lower().split()).rstrip(" ?.!")
+
+
+def interp_cache_key(question, model, latest):
+    # the anchor month is part of the key: "last quarter" asked after a new month lands is a new question
+    anchor = latest or dt.date.today().strftime("%Y-%m")
+    return SQLiteCache.make_key(normalize_question(question), model, PROMPT_VERSION, anchor)
+
+
+def llm_interp(question, latest=None):
+
+    client = llm.get_client()
+    if not client.token:
         return None
 
+    cache = interp_cache()
+    key = interp_cache_key(question, client.model, latest) if cache is not None else None
+    if key is not None:
+        hit = cache.get(key)
+        trace.annotate(interp_cache="hit" if hit is not None else "miss")
+        if hit is not None:
+            return hit
+
     messages = [
         {"role": "system", "content": LLM_SYSTEM_PROMPT},
-        {"role": "user", "content": f"{PROMPT}\nQ: {question}"},
+        {"role": "user", "content": f"{PROMPT}{anchor_note(latest)}\nQ: {question}"},
     ]
-    payload = {
-        "model": model,
-        "messages": messages,
-        "temperature": 0,
-        "max_tokens": 518,
-        "response_format": {"type": "json_object"},
-    }
-    headers = {
-        "Authorization": f"Bearer {api_token}",
-        "Content-Type": "application/json",
-    }
-
-    resp = requests.post(api_url, headers=headers, json=payload, timeout=600)
-    # print(resp)
-    resp.raise_for_status()
-    data = resp.json()
-    text = data["choices"][0]["message"]["content"]
-    obj = get_json(text)
-    # 
+    text = client.chat(messages, temperature=0, max_tokens=518, response_format={"type": "json_object"})
+    with trace.span("llm.parse"):
+        obj = validate(get_json(text))
+    # only validated interpretations are cached: a bad reply raises here and is asked again next time
+    if key is not None:
+        cache.put(key, obj)
     return obj
 
 
@@ -103,26 +148,26 @@ def get_json(text):
 
 
 
-def basic_interp(question):
+def anchor_note(latest):
+    if not latest:
+        return ""
+    return f"\nThe latest month with data is {latest}; resolve relative dates (last quarter, YTD, ...) from it.\n"
 
-    months = get_months(question)
+
+def basic_interp(question, latest=None, dates=None):
+
+    q = question.lower()
+    # print(q)
+    intent = get_intent(q) or "revenue"
+    dates = dates or resolve_dates(question, latest)
+    # a question with no period gets the intent's default; one whose dates could not be
+    # read must not silently become a different period
+    months = dates["months"] or (default_months(intent, latest) if latest and not dates["ambiguous"] else [])
     if not months:
         raise ValueError(
             "Interpreter requires explicit months in YYYY-MM (e.g., 2025-06). "
             "Enable LLM mode to parse natural-language dates."
         )
-    q = question.lower()
-    # print(q)
-    if "ebitda" in q:
-        intent = "ebitda"
-    elif "gross margin" in q or re.search(r"\bgm\b", q):
-        intent = "gross_margin"
-    elif "opex" in q or "operating expense" in q or "operating expenses" in q:
-        intent = "opex_total"
-    elif "runway" in q or "burn" in q:
-        intent = "cash_runway"
-    else:
-        intent = "revenue"
 
     entity = get_entity(q)
 
@@ -133,10 +178,33 @@ def basic_interp(question):
     return out
 
 
-def get_months(text):
-    return re.findall(r"\b\d{4}-\d{2}\b", text)
+def get_intent(q):
+    if "variance" in q or re.search(r"budget vs\.? actual|all categories", q):
+        return "variance"
+    if "ebitda" in q:
+        return "ebitda"
+    if "gross margin" in q or re.search(r"\bgm\b", q):
+        return "gross_margin"
+    if "opex" in q or "operating expense" in q or "operating expenses" in q:
+        return "opex_total"
+    if ("runway" in q or "burn" in q) and re.search(r"trend|history|evolv|over time", q):
+        return "cash_runway_trend"
+    if "runway" in q or "burn" in q:
+        return "cash_runway"
+    if "revenue" in q or "sales" in q:
+        return "revenue"
+    return None
+
+
+def default_months(intent, latest):
+    # same defaults the LLM prompt asks for when a question names no period
+    n = {"cash_runway": 3, "cash_runway_trend": 12}.get(intent, 1)
+    return resolve_dates(f"last {n} months", latest)["months"]
+
 
 def get_entity(text_lower):
+    if re.search(r"\b(by|per|each|every|all) entit(y|ies)\b|\bentity\s*[:=]\s*\*", text_lower):
+        return "*"
     m = re.search(r"entity\s*[:=]\s*([A-Za-z0-9 _\-\.&]+)", text_lower)
     if m:
         return m.group(1).strip()
@@ -159,7 +227,7 @@ def validate(d):
         # print(d)
         raise ValueError("`months` must be a non-empty list of YYYY-MM strings.")
     for m in months:
-        if not isinstance(m, str) or not re.fullmatch(r"\d{4}-\d{2}", m):
+        if not isinstance(m, str) or not re.fullmatch(r"\d{4}-(0[1-9]|1[0-2])", m):
             # print(type(m))
             raise ValueError(f"Invalid month format: {m}. Use YYYY-MM.")
 
@@ -0,0 +1,226 @@
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from agent import trace
+
+DEFAULT_URL = "https://router.huggingface.co/v1/chat/completions"
+DEFAULT_MODEL = "meta-llama/Llama-3.1-8B-Instruct"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class LLMError(RuntimeError):
+    pass
+
+
+class CircuitOpenError(LLMError):
+    pass
+
+
+class CircuitBreaker:
+    # after `threshold` consecutive failed calls the circuit opens and calls fail fast for
+    # `reset_after` seconds; then one trial call is let through (half-open) to probe recovery
+
+    def __init__(self, threshold=5, reset_after=30.0, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_after:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        with self.lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self.trial:
+                self.trial = True
+                return True
+            return False
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial or self.failures >= self.threshold:
+                self.opened_at = self.clock()
+            self.trial = False
+
+
+class LLMClient:
+    # chat-completions client over one pooled keep-alive session, with connect/read timeouts,
+    # bounded jittered retries on 429/5xx/network errors and a circuit breaker around it all
+
+    def __init__(self, api_url=None, token=None, model=None, connect_timeout=None, read_timeout=None,
+                 retries=None, backoff=None, backoff_max=None, breaker=None, pool_size=None):
+        self.api_url = api_url or os.getenv("HF_API_URL") or DEFAULT_URL
+        self.token = token if token is not None else os.getenv("HF_TOKEN")
+        self.model = model or os.getenv("HF_MODEL", DEFAULT_MODEL)
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else float(os.getenv("LLM_CONNECT_TIMEOUT", "5")),
+            read_timeout if read_timeout is not None else float(os.getenv("LLM_READ_TIMEOUT", "60")),
+        )
+        self.retries = retries if retries is not None else int(os.getenv("LLM_RETRIES", "3"))
+        self.backoff = backoff if backoff is not None else float(os.getenv("LLM_BACKOFF", "0.5"))
+        self.backoff_max = backoff_max if backoff_max is not None else float(os.getenv("LLM_BACKOFF_MAX", "8"))
+        self.breaker = breaker or CircuitBreaker(
+            threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+            reset_after=float(os.getenv("LLM_BREAKER_RESET", "30")),
+        )
+        pool_size = pool_size or int(os.getenv("LLM_POOL_SIZE", "10"))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def chat(self, messages, **params):
+        # assistant message text of one completion
+        body = self.post({"model": self.model, "messages": messages, **params})
+        with trace.span("llm.parse"):
+            try:
+                return body["choices"][0]["message"]["content"]
+            except (KeyError, IndexError, TypeError) as e:
+                raise LLMError(f"unexpected completion body: {e!r}") from e
+
+    def stream_chat(self, messages, **params):
+        # yields the completion text chunk by chunk from an SSE ("stream": true) response.
+        # Retries and the breaker only cover getting the stream open: once text has been
+        # handed out, a broken stream raises LLMError instead of starting over.
+        r = self.post({"model": self.model, "messages": messages, **params, "stream": True}, stream=True)
+        chunks = 0
+        try:
+            with trace.span("llm.stream", model=self.model) as s:
+                try:
+                    for delta in sse_deltas(r):
+                        chunks += 1
+                        yield delta
+                except (requests.RequestException, ValueError) as e:
+                    self.breaker.failure()
+                    raise LLMError(f"LLM stream broke after {chunks} chunks: {e}") from e
+                s.set(chunks=chunks)
+        finally:
+            r.close()
+
+    def post(self, payload, stream=False):
+        if not self.token:
+            raise LLMError("HF_TOKEN not set")
+        if not self.breaker.allow():
+            raise CircuitOpenError("LLM circuit open; failing fast")
+        try:
+            body = self._post_with_retries(payload, stream)
+        except BaseException:
+            # anything that escapes counts, so a failed half-open trial always reopens the circuit
+            self.breaker.failure()
+            raise
+        self.breaker.success()
+        return body
+
+    def _post_with_retries(self, payload, stream=False):
+        headers = {"Authorization": f"Bearer {self.token}", "Content-Type": "application/json"}
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            with trace.span("llm.http", model=self.model, attempt=attempt) as s:
+                try:
+                    r = self.session.post(self.api_url, headers=headers, json=payload, timeout=self.timeout, stream=stream)
+                    s.set(status=r.status_code)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    s.set(error=type(e).__name__)
+                    err = LLMError(f"LLM request failed: {e}")
+                except requests.RequestException as e:
+                    # InvalidURL, TooManyRedirects, ChunkedEncodingError...: not worth retrying
+                    s.set(error=type(e).__name__)
+                    raise LLMError(f"LLM request failed: {e}") from e
+                else:
+                    if r.status_code < 400 and stream:
+                        return r
+                    if r.status_code < 400:
+                        with trace.span("llm.parse"):
+                            try:
+                                return r.json()
+                            except ValueError as e:
+                                raise LLMError(f"LLM returned invalid JSON: {e}") from e
+                    if r.status_code not in RETRY_STATUS:
+                        raise LLMError(f"LLM request failed with HTTP {r.status_code}: {r.text[:200]}")
+                    err = LLMError(f"LLM request failed with HTTP {r.status_code}")
+                    retry_after = r.headers.get("Retry-After")
+                    r.close()
+            if attempt < self.retries:
+                time.sleep(self.delay(attempt, retry_after))
+        raise err
+
+    def delay(self, attempt, retry_after=None):
+        # full jitter, capped; a numeric Retry-After from a 429/503 is honoured up to the cap
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+
+
+def sse_deltas(r):
+    # content deltas of an OpenAI-style chat-completions event stream
+    for line in r.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        event = json.loads(data)
+        for choice in event.get("choices") or []:
+            text = (choice.get("delta") or {}).get("content")
+            if text:
+                yield text
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    # one client per process so every call shares the connection pool and the breaker
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
+
+
+def set_client(client):
+    # swap the shared client (e.g. after changing HF_* settings); returns the previous one
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+    return previous
+
+
+def chat(messages, **params):
+    return get_client().chat(messages, **params)
+
+
+def stream_chat(messages, **params):
+    return get_client().stream_chat(messages, **params)
@@ -1,20 +1,70 @@
 from typing import Optional, Dict, Any, List
+import os
+import numpy as np
 import pandas as pd
-from agent.data import DataStore, to_usd, load_data
+from dataclasses import replace
+from agent.data import DataStore, to_usd, ensure_usd, load_data, category_startswith
+from agent.cube import breakdown_cube
+from agent import trace
 # from data import DataStore, to_usd, load_data
 
+BACKENDS = ("frame", "cube")
+BACKEND = os.getenv("METRICS_BACKEND", "frame")
+
+
+def set_backend(name):
+    # "frame" scans the raw rows, "cube" reads the aggregates built by load_data
+    global BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown metrics backend: {name}. Allowed: {BACKENDS}")
+    prev, BACKEND = BACKEND, name
+    return prev
+
+
+def use_cube(ds):
+    return BACKEND == "cube" and getattr(ds, "cube", None) is not None
+
+
+# entity value that asks for every entity side by side plus the consolidated total
+BREAKDOWN = "*"
+
+
+def entity_breakdown(ds, months, fn):
+    # fn is one of the *_cube metrics; on the frame backend it runs against a cube
+    # grouped once from the requested months only
+    keys = [ds.month_key(m) for m in months]
+    if use_cube(ds):
+        view = ds
+    else:
+        cube = breakdown_cube(ds.rows("actuals", months), ds.rows("budget", months), ds.rows("cash", months))
+        view = replace(ds, cube=cube)
+
+    entities = set()
+    for k in keys:
+        entities |= view.cube.entities.get(k, set())
+        if fn is cash_runway_cube:
+            entities |= view.cube.cash_entities.get(k, set())
+    entities = sorted(entities)
+    payload = fn(view, months, None)
+    payload["entity"] = BREAKDOWN
+    payload["entities"] = entities
+    payload["breakdown"] = {e: fn(view, months, e) for e in entities}
+    return payload
+
 
 def revenue(ds, months, entity):
+    if entity == BREAKDOWN:
+        return entity_breakdown(ds, months, revenue_cube)
+    if use_cube(ds):
+        return revenue_cube(ds, months, entity)
     month = months[0]
-    a = ds.actuals[(ds.actuals["month"] == month) & (ds.actuals["account_category"] == "Revenue")]
-    b = ds.budget[(ds.budget["month"] == month) & (ds.budget["account_category"] == "Revenue")]
-
-    if entity:
-        a = a[a["entity"] == entity]
-        b = b[b["entity"] == entity]
+    a = ds.rows("actuals", [month], entity)
+    b = ds.rows("budget", [month], entity)
+    a = a[a["account_category"] == "Revenue"]
+    b = b[b["account_category"] == "Revenue"]
 
-    a_usd = to_usd(a, ds.fx)
-    b_usd = to_usd(b, ds.fx)
+    a_usd = ensure_usd(a, ds.fx)
+    b_usd = ensure_usd(b, ds.fx)
 
     actual_total = float(a_usd["amount_usd"].sum()) if not a_usd.empty else 0.0
     budget_total = float(b_usd["amount_usd"].sum()) if not b_usd.empty else 0.0
@@ -33,18 +83,22 @@ def revenue(ds, months, entity):
 
 
 def gross_margin(ds, months, entity):
+    if entity == BREAKDOWN:
+        return entity_breakdown(ds, months, gross_margin_cube)
+    if use_cube(ds):
+        return gross_margin_cube(ds, months, entity)
 
     if not months:
         # print(months)
         return {"months": [], "entity": entity or "All", "gm_usd": [], "gm_pct": []}
 
-    a = ds.actuals[(ds.actuals["month"].isin(months)) & (ds.actuals["account_category"].isin(["Revenue", "COGS"]))]
-    if entity:
-        a = a[a["entity"] == entity]
+    keys = [ds.month_key(m) for m in months]
+    a = ds.rows("actuals", months, entity)
+    a = a[a["account_category"].isin(["Revenue", "COGS"])]
 
-    a_usd = to_usd(a, ds.fx)
+    a_usd = ensure_usd(a, ds.fx)
 
-    grouped = (a_usd.groupby(["month", "account_category"], as_index=False)["amount_usd"].sum())
+    grouped = (a_usd.groupby(["month", "account_category"], as_index=False, observed=True)["amount_usd"].sum())
 
     rev_by_month = grouped[grouped["account_category"] == "Revenue"].set_index("month")["amount_usd"].to_dict()
     cogs_by_month = grouped[grouped["account_category"] == "COGS"].set_index("month")["amount_usd"].to_dict()
@@ -52,7 +106,7 @@ def gross_margin(ds, months, entity):
     gm_usd = []
     gm_pct = []
 
-    for m in months:
+    for m in keys:
         rev = float(rev_by_month.get(m, 0.0))
         cogs = float(cogs_by_month.get(m, 0.0))
         gm = rev - cogs
@@ -70,14 +124,16 @@ def gross_margin(ds, months, entity):
     }
 
 def opex_total(ds, months, entity):
+    if entity == BREAKDOWN:
+        return entity_breakdown(ds, months, opex_total_cube)
+    if use_cube(ds):
+        return opex_total_cube(ds, months, entity)
     # print(months)
     month = months[0]
-    a = ds.actuals[ds.actuals["month"] == month]
-    a = a[a["account_category"].astype(str).str.startswith("Opex")]
-    if entity:
-        a = a[a["entity"] == entity]
+    a = ds.rows("actuals", [month], entity)
+    a = a[category_startswith(a["account_category"], "Opex")]
 
-    a_usd = to_usd(a, ds.fx)
+    a_usd = ensure_usd(a, ds.fx)
 
     if a_usd.empty:
         # print()
@@ -89,9 +145,9 @@ def opex_total(ds, months, entity):
             "values_usd": [],
         }
 
-    by_cat = (a_usd.groupby("account_category", as_index=False)["amount_usd"].sum().sort_values("account_category"))
+    by_cat = (a_usd.groupby("account_category", as_index=False, observed=True)["amount_usd"].sum().sort_values("account_category"))
     # print(by_cat)
-    categories = by_cat["account_category"].tolist()
+    categories = by_cat["account_category"].astype(str).tolist()
     values = by_cat["amount_usd"].astype(float).tolist()
     total_opex = float(sum(values))
 
@@ -105,33 +161,20 @@ def opex_total(ds, months, entity):
 
 
 def ebitda(ds, months, entity):
+    if entity == BREAKDOWN:
+        return entity_breakdown(ds, months, ebitda_cube)
     if not months:
         return {"months": [], "entity": entity or "All", "ebitda_usd": [], "ebitda_margin": []}
+    return ebitda_payload(months, entity, monthly_pnl(ds, months, entity))
 
-    a = ds.actuals[ds.actuals["month"].isin(months)]
-    mask_rev_cogs = a["account_category"].isin(["Revenue", "COGS"])
-    a = a[mask_rev_cogs]
-    # print(a.head())
-    if entity:
-        a = a[a["entity"] == entity]
-    a_usd = to_usd(a, ds.fx)
 
-    grouped = (a_usd.groupby(["month", "account_category"], as_index=False)["amount_usd"].sum())
-    # print(grouped)
-    rev_by_m = grouped[grouped["account_category"] == "Revenue"].set_index("month")["amount_usd"].to_dict()
-    # print(rev_by_m)
-    cogs_by_m = grouped[grouped["account_category"] == "COGS"].set_index("month")["amount_usd"].to_dict()
-    # print(cogs_by_m)
+def ebitda_payload(months, entity, pnl):
     e_vals = []
     e_margin = []
 
-    for m in months:
-        opex_info = opex_total(ds, months=[m], entity=entity)
-        opex = float(opex_info["opex_usd"])
-
-        rev = float(rev_by_m.get(m, 0.0))
-        cogs = float(cogs_by_m.get(m, 0.0))
-        ebitda = rev - cogs - opex
+    for row in pnl:
+        rev = row["revenue"]
+        ebitda = rev - row["cogs"] - row["opex"]
         margin = (ebitda / rev) if rev not in (0, 0.0) else None
 
         e_vals.append(ebitda)
@@ -143,10 +186,48 @@ def ebitda(ds, months, entity):
         "entity": entity or "All",
         "ebitda_usd": e_vals,
         "ebitda_margin": e_margin,
+        "revenue_usd": [row["revenue"] for row in pnl],
+        "cogs_usd": [row["cogs"] for row in pnl],
+        "opex_usd": [row["opex"] for row in pnl],
+        "opex_by_category": [row["opex_by_category"] for row in pnl],
+    }
+
+
+def monthly_pnl(ds, months, entity):
+    # revenue, COGS and every Opex category for all requested months from one grouped pass
+    if use_cube(ds):
+        return monthly_pnl_cube(ds, months, entity)
+
+    keys = [ds.month_key(m) for m in months]
+    a = ds.rows("actuals", months, entity)
+    cat = a["account_category"]
+    a = a[(cat == "Revenue") | (cat == "COGS") | category_startswith(cat, "Opex")]
+    a_usd = ensure_usd(a, ds.fx)
+
+    grouped = a_usd.groupby(["month", "account_category"], observed=True)["amount_usd"].sum()
+    by_month = {}
+    for (key, c), v in grouped.items():
+        by_month.setdefault(key, {})[str(c)] = float(v)
+
+    return [pnl_row(by_month.get(key, {})) for key in keys]
+
+
+def pnl_row(by_cat):
+    # Opex is summed over the sorted categories, the same way opex_total adds it up
+    opex = {c: by_cat[c] for c in sorted(by_cat) if c.startswith("Opex")}
+    return {
+        "revenue": by_cat.get("Revenue", 0.0),
+        "cogs": by_cat.get("COGS", 0.0),
+        "opex": float(sum(opex.values())) if opex else 0.0,
+        "opex_by_category": opex,
     }
 
 
 def cash_runway(ds, months, entity):
+    if entity == BREAKDOWN:
+        return entity_breakdown(ds, months, cash_runway_cube)
+    if use_cube(ds):
+        return cash_runway_cube(ds, months, entity)
 
     if not months:
         return {
@@ -160,29 +241,26 @@ def cash_runway(ds, months, entity):
 
     last = months[-1]
 
-    cash_df = ds.cash[ds.cash["month"] == last]
-    if entity:
-        cash_df = cash_df[cash_df["entity"] == entity]
+    cash_df = ds.rows("cash", [last], entity)
     cash_usd = float(cash_df["cash_usd"].sum()) if not cash_df.empty else 0.0
 
-    a = ds.actuals[ds.actuals["month"].isin(months)]
-    if entity:
-        a = a[a["entity"] == entity]
+    keys = [ds.month_key(m) for m in months]
+    a = ds.rows("actuals", months, entity)
 
     mask_rev = a["account_category"] == "Revenue"
     mask_cogs = a["account_category"] == "COGS"
-    mask_opex = a["account_category"].astype(str).str.startswith("Opex")
+    mask_opex = category_startswith(a["account_category"], "Opex")
     a = a[mask_rev | mask_cogs | mask_opex]
 
-    grouped = a.groupby(["month", "account_category"], as_index=False)["amount"].sum()
+    grouped = a.groupby(["month", "account_category"], as_index=False, observed=True)["amount"].sum()
     # print(grouped)
     rev_by_m = grouped[grouped["account_category"] == "Revenue"].set_index("month")["amount"].to_dict()
     cogs_by_m = grouped[grouped["account_category"] == "COGS"].set_index("month")["amount"].to_dict()
-    opex_rows = grouped[grouped["account_category"].astype(str).str.startswith("Opex")]
+    opex_rows = grouped[category_startswith(grouped["account_category"], "Opex")]
     opex_by_m = opex_rows.groupby("month")["amount"].sum().to_dict()
 
     burns = []
-    for m in months:
+    for m in keys:
         rev = float(rev_by_m.get(m, 0.0))
         cogs = float(cogs_by_m.get(m, 0.0))
         opex = float(opex_by_m.get(m, 0.0))
@@ -204,6 +282,215 @@ def cash_runway(ds, months, entity):
     }
 
 
+def variance(ds, months, entity):
+    # actual vs budget for every (month, account_category[, entity]) cell in the range,
+    # from one aligned join of the two grouped frames
+    keys = [ds.month_key(m) for m in months]
+    by = ["month", "account_category"]
+    if entity == BREAKDOWN:
+        by = ["month", "entity", "account_category"]
+    a = ds.rows("actuals", months, None if entity == BREAKDOWN else entity)
+    b = ds.rows("budget", months, None if entity == BREAKDOWN else entity)
+
+    actual = ensure_usd(a, ds.fx).groupby(by, observed=True)["amount_usd"].sum().rename("actual_usd")
+    budget = ensure_usd(b, ds.fx).groupby(by, observed=True)["amount_usd"].sum().rename("budget_usd")
+    m = pd.concat([actual, budget], axis=1, join="outer").fillna(0.0)
+    m["delta_usd"] = m["actual_usd"] - m["budget_usd"]
+    m["pct_to_budget"] = (m["actual_usd"] / m["budget_usd"]).where(m["budget_usd"] != 0)
+
+    order = {k: i for i, k in enumerate(keys)}
+    m = m.reset_index()
+    m["_order"] = m["month"].map(order)
+    m = m.sort_values(["_order"] + by[1:], kind="stable")
+
+    rows = []
+    for rec in m.to_dict("records"):
+        row = {"month": ds.month_label(rec["month"])}
+        if entity == BREAKDOWN:
+            row["entity"] = str(rec["entity"])
+        row["account_category"] = str(rec["account_category"])
+        row["actual_usd"] = float(rec["actual_usd"])
+        row["budget_usd"] = float(rec["budget_usd"])
+        row["delta_usd"] = float(rec["delta_usd"])
+        row["pct_to_budget"] = none_if_nan(rec["pct_to_budget"])
+        rows.append(row)
+
+    return {
+        "months": months,
+        "entity": entity or "All",
+        "categories": sorted({r["account_category"] for r in rows}),
+        "rows": rows,
+    }
+
+
+RUNWAY_WINDOW = int(os.getenv("RUNWAY_WINDOW", "3"))
+TOTAL = "__total__"
+
+
+def runway_series(ds, months, entity, window=RUNWAY_WINDOW):
+    # cash, rolling average burn and runway for every month in the data at once;
+    # months, when given, only picks which rows of the full history are returned
+    a = ds.actuals
+    trace.count("rows_scanned", len(a) + len(ds.cash))
+    if entity and entity != BREAKDOWN:
+        a = a[a["entity"] == entity]
+    cat = a["account_category"]
+    is_burn = ((cat == "COGS") | category_startswith(cat, "Opex")).to_numpy()
+    is_rev = (cat == "Revenue").to_numpy()
+    sign = np.where(is_burn, 1.0, np.where(is_rev, -1.0, 0.0))
+    net = pd.DataFrame({"month": a["month"], "entity": a["entity"], "net": a["amount"].to_numpy() * sign})
+
+    c = ds.cash
+    if entity and entity != BREAKDOWN:
+        c = c[c["entity"] == entity]
+
+    axis = sorted(set(pd.unique(net["month"])) | set(pd.unique(c["month"])))
+    burn = pd.DataFrame({TOTAL: net.groupby("month", observed=True)["net"].sum()}).reindex(axis)
+    cash = pd.DataFrame({TOTAL: c.groupby("month", observed=True)["cash_usd"].sum()}).reindex(axis)
+    if entity == BREAKDOWN:
+        by_ent = net.groupby(["month", "entity"], observed=True)["net"].sum().unstack("entity")
+        cash_ent = c.groupby(["month", "entity"], observed=True)["cash_usd"].sum().unstack("entity")
+        burn = burn.join(by_ent.reindex(axis))
+        cash = cash.join(cash_ent.reindex(axis))
+    burn, cash = burn.align(cash, join="outer", axis=1)
+    burn = burn.fillna(0.0).clip(lower=0.0)
+    cash = cash.fillna(0.0)
+
+    avg = burn.rolling(window, min_periods=window).mean()
+    runway = (cash / avg).where(avg > 0)
+
+    labels = [ds.month_label(k) for k in axis]
+    rows = list(range(len(axis)))
+    if months:
+        pos = {lbl: i for i, lbl in enumerate(labels)}
+        rows = [pos[m] for m in months if m in pos]
+        labels = [labels[i] for i in rows]
+
+    def series(col):
+        return {
+            "months": labels,
+            "entity": entity or "All" if col == TOTAL else str(col),
+            "window": window,
+            "cash_usd": [float(v) for v in cash[col].to_numpy()[rows]],
+            "burn_usd": [float(v) for v in burn[col].to_numpy()[rows]],
+            "avg_burn_usd": [none_if_nan(v) for v in avg[col].to_numpy()[rows]],
+            "runway_months": [none_if_nan(v) for v in runway[col].to_numpy()[rows]],
+        }
+
+    payload = series(TOTAL)
+    if entity == BREAKDOWN:
+        entities = sorted(str(e) for e in burn.columns if e != TOTAL)
+        payload["entities"] = entities
+        payload["breakdown"] = {e: series(e) for e in entities}
+    return payload
+
+
+def none_if_nan(v):
+    return None if pd.isna(v) else float(v)
+
+
+def revenue_cube(ds, months, entity):
+    month = months[0]
+    key, ent = ds.month_key(month), entity or None
+    actual_total = ds.cube.actual_usd.get((key, ent, "Revenue"), 0.0)
+    budget_total = ds.cube.budget_usd.get((key, ent, "Revenue"), 0.0)
+
+    delta_usd = actual_total - budget_total
+    pct_to_budget = (actual_total / budget_total) if budget_total not in (0, 0.0) else None
+
+    return {
+        "month": month,
+        "entity": entity or "All",
+        "actual_usd": actual_total,
+        "budget_usd": budget_total,
+        "delta_usd": delta_usd,
+        "pct_to_budget": pct_to_budget,
+    }
+
+
+def gross_margin_cube(ds, months, entity):
+    if not months:
+        return {"months": [], "entity": entity or "All", "gm_usd": [], "gm_pct": []}
+
+    ent = entity or None
+    gm_usd = []
+    gm_pct = []
+    for m in months:
+        key = ds.month_key(m)
+        rev = ds.cube.actual_usd.get((key, ent, "Revenue"), 0.0)
+        cogs = ds.cube.actual_usd.get((key, ent, "COGS"), 0.0)
+        gm = rev - cogs
+        gm_usd.append(gm)
+        gm_pct.append((gm / rev) if rev not in (0, 0.0) else None)
+
+    return {
+        "months": months,
+        "entity": entity or "All",
+        "gm_usd": gm_usd,
+        "gm_pct": gm_pct,
+    }
+
+
+def opex_total_cube(ds, months, entity):
+    month = months[0]
+    key, ent = ds.month_key(month), entity or None
+    categories = list(ds.cube.opex_categories.get((key, ent), []))
+    values = [ds.cube.actual_usd[(key, ent, c)] for c in categories]
+
+    return {
+        "month": month,
+        "entity": entity or "All",
+        "opex_usd": float(sum(values)) if values else 0.0,
+        "categories": categories,
+        "values_usd": values,
+    }
+
+
+def ebitda_cube(ds, months, entity):
+    if not months:
+        return {"months": [], "entity": entity or "All", "ebitda_usd": [], "ebitda_margin": []}
+    return ebitda_payload(months, entity, monthly_pnl_cube(ds, months, entity))
+
+
+def monthly_pnl_cube(ds, months, entity):
+    ent = entity or None
+    rows = []
+    for m in months:
+        key = ds.month_key(m)
+        cats = ["Revenue", "COGS"] + ds.cube.opex_categories.get((key, ent), [])
+        by_cat = {c: ds.cube.actual_usd[(key, ent, c)] for c in cats if (key, ent, c) in ds.cube.actual_usd}
+        rows.append(pnl_row(by_cat))
+    return rows
+
+
+def cash_runway_cube(ds, months, entity):
+    if not months:
+        return cash_runway(ds, months, entity)
+
+    ent = entity or None
+    last = months[-1]
+    cash_usd = ds.cube.cash.get((ds.month_key(last), ent), 0.0)
+
+    burns = []
+    for m in months:
+        key = ds.month_key(m)
+        rev = ds.cube.actual_amount.get((key, ent, "Revenue"), 0.0)
+        cogs = ds.cube.actual_amount.get((key, ent, "COGS"), 0.0)
+        opex = ds.cube.opex_amount.get((key, ent), 0.0)
+        burn = (cogs + opex) - rev
+        burns.append(burn if burn > 0 else 0.0)
+    avg_burn = float(pd.Series(burns).mean()) if burns else 0.0
+    runway = (cash_usd / avg_burn) if avg_burn > 0 else None
+
+    return {
+        "month": last,
+        "months": months,
+        "entity": entity or "All",
+        "cash_usd": cash_usd,
+        "avg_burn_usd": avg_burn,
+        "runway_months": runway,
+    }
+
 # actuals = pd.DataFrame([
 #         {"month": "2025-06", "entity": "A", "account_category": "Opex:Marketing", "amount": 100.0, "currency": "EUR"},
 #         {"month": "2025-06", "entity": "A", "account_category": "Opex:R&D", "amount":  50.0, "currency": "USD"},
@@ -0,0 +1,256 @@
+import datetime as dt
+
+from agent import trace
+
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+STYLES = ["concise", "detail"]
+
+
+@trace.traced("narrate")
+def narrate(intent, payload, style="concise"):
+    # deterministic answer for any routed intent, built only from the payload
+    fn = NARRATORS.get(intent)
+    if fn is None:
+        return f"No narrative available for {intent}."
+    detail = style != "concise"
+    text = fn(payload, detail)
+    if payload.get("breakdown"):
+        text += " " + breakdown_sentence(intent, payload, detail)
+    return text
+
+
+def usd(v, signed=False):
+    # $1.01M / $57.8k / $950; signed adds an explicit +/-
+    if v is None:
+        return "n/a"
+    sign = "-" if v < 0 else ("+" if signed and v > 0 else "")
+    a = abs(v)
+    if 999.5 <= a < 1e12:
+        # round to the 3 significant digits shown before picking the unit: $999.6k is $1M
+        a = float(f"{a:.3g}")
+    for unit, scale in (("B", 1e9), ("M", 1e6), ("k", 1e3)):
+        if a >= scale:
+            return f"{sign}${a / scale:.3g}{unit}" if a / scale < 100 else f"{sign}${a / scale:.0f}{unit}"
+    return f"{sign}${a:,.0f}"
+
+
+def pct(v, signed=False):
+    if v is None:
+        return "n/a"
+    return f"{v * 100:+.1f}%" if signed else f"{v * 100:.1f}%"
+
+
+def month(label):
+    if not label:
+        return "the latest month"
+    try:
+        d = dt.date(int(label[:4]), int(label[5:7]), 1)
+    except ValueError:
+        return str(label)
+    return f"{MONTH_NAMES[d.month - 1]} {d.year}"
+
+
+def month_range(months):
+    # "Jun 2025", "Apr–Jun 2025", "Nov 2024–Feb 2025", or a list when the months skip
+    months = [m for m in months or [] if m]
+    if not months:
+        return "the selected period"
+    if len(months) == 1:
+        return month(months[0])
+    ords = [int(m[:4]) * 12 + int(m[5:7]) for m in months]
+    if ords == list(range(ords[0], ords[0] + len(ords))):
+        first, last = months[0], months[-1]
+        if first[:4] == last[:4]:
+            return f"{MONTH_NAMES[int(first[5:7]) - 1]}–{month(last)}"
+        return f"{month(first)}–{month(last)}"
+    names = [month(m) for m in months]
+    return ", ".join(names[:-1]) + " and " + names[-1]
+
+
+def subject(name, payload):
+    # "Revenue" for the consolidated view, "EMEA revenue" for one entity
+    entity = payload.get("entity")
+    if not entity or entity in ("All", "*"):
+        return name
+    return f"{entity} {name if name.isupper() else name.lower()}"
+
+
+def versus(delta, budget):
+    if not budget:
+        return "with no budget to compare"
+    direction = "above" if delta >= 0 else "below"
+    return f"{usd(abs(delta))} ({pct(abs(delta) / abs(budget))}) {direction} budget of {usd(budget)}"
+
+
+def change(first, last, fmt, since):
+    # compared at display precision so "up from 84.8%" never follows 84.8%
+    if first is None or last is None or fmt(first) == fmt(last):
+        return f"unchanged since {since}"
+    return f"{'up' if last > first else 'down'} from {fmt(first)} in {since}"
+
+
+def revenue_text(p, detail):
+    text = f"{subject('Revenue', p)} for {month(p.get('month'))} was {usd(p.get('actual_usd'))}, {versus(p.get('delta_usd') or 0.0, p.get('budget_usd'))}."
+    if detail and p.get("pct_to_budget") is not None:
+        text += f" That is {pct(p['pct_to_budget'])} of plan."
+    return text
+
+
+def gross_margin_text(p, detail):
+    months, pcts, usds = p.get("months") or [], p.get("gm_pct") or [], p.get("gm_usd") or []
+    if not months:
+        return "No gross margin data for the selected period."
+    text = f"{subject('Gross margin', p)} was {pct(pcts[-1])} ({usd(usds[-1])}) in {month(months[-1])}"
+    if len(months) > 1:
+        text += f", {change(pcts[0], pcts[-1], pct, month(months[0]))}"
+    text += "."
+    if detail and len(months) > 1:
+        valid = [v for v in pcts if v is not None]
+        if valid:
+            text += f" Over {month_range(months)} it ranged {pct(min(valid))}–{pct(max(valid))}, totalling {usd(sum(usds))}."
+    return text
+
+
+def opex_total_text(p, detail):
+    total, cats, vals = p.get("opex_usd") or 0.0, p.get("categories") or [], p.get("values_usd") or []
+    text = f"{subject('Opex', p)} for {month(p.get('month'))} was {usd(total)}"
+    if cats:
+        i = max(range(len(vals)), key=lambda k: vals[k])
+        share = vals[i] / total if total else None
+        text += f"; the largest category was {label(cats[i])} at {usd(vals[i])} ({pct(share)})"
+    text += "."
+    if detail and cats:
+        parts = [f"{label(c)} {usd(v)}" for c, v in sorted(zip(cats, vals), key=lambda cv: -cv[1])]
+        text += " By category: " + ", ".join(parts) + "."
+    return text
+
+
+def ebitda_text(p, detail):
+    months, vals, margins = p.get("months") or [], p.get("ebitda_usd") or [], p.get("ebitda_margin") or []
+    if not months:
+        return "No EBITDA data for the selected period."
+    if len(months) == 1:
+        text = f"{subject('EBITDA', p)} for {month(months[0])} was {usd(vals[0])}, a {pct(margins[0])} margin."
+    else:
+        revenue = sum(p.get("revenue_usd") or [])
+        margin = sum(vals) / revenue if revenue else None
+        text = (f"{subject('EBITDA', p)} for {month_range(months)} totalled {usd(sum(vals))} at a {pct(margin)} margin; "
+                f"{month(months[-1])} was {usd(vals[-1])} ({pct(margins[-1])}).")
+    if detail and p.get("revenue_usd"):
+        text += (f" Revenue {usd(sum(p['revenue_usd']))}, COGS {usd(sum(p.get('cogs_usd') or []))}"
+                 f" and Opex {usd(sum(p.get('opex_usd') or []))} over the period.")
+    return text
+
+
+def cash_runway_text(p, detail):
+    cash, burn, runway = p.get("cash_usd") or 0.0, p.get("avg_burn_usd") or 0.0, p.get("runway_months")
+    period = month_range(p.get("months"))
+    text = f"{subject('Cash', p)} was {usd(cash)} at {month(p.get('month'))}"
+    if runway is None or burn <= 0:
+        text += f" with no net burn over {period}, so runway is not constrained."
+    else:
+        text += f"; at an average burn of {usd(burn)}/month over {period}, runway is {runway:.1f} months."
+    return text
+
+
+def cash_runway_trend_text(p, detail):
+    months, runway, cash = p.get("months") or [], p.get("runway_months") or [], p.get("cash_usd") or []
+    if not months:
+        return "No cash data for the selected period."
+    period = month_range(months)
+    known = [(m, r) for m, r in zip(months, runway) if r is not None]
+    cash_move = f"cash {usd(cash[0])} → {usd(cash[-1])}" if len(cash) > 1 else f"cash {usd(cash[-1])}"
+    if not known:
+        text = f"{subject('Cash', p)} shows no sustained net burn over {period}, so runway is not constrained ({cash_move})."
+    elif len(known) == 1 or known[0][1] == known[-1][1]:
+        text = f"{subject('Runway', p)} was {known[-1][1]:.1f} months in {month(known[-1][0])} ({cash_move} over {period})."
+    else:
+        text = (f"{subject('Runway', p)} moved from {known[0][1]:.1f} months in {month(known[0][0])} to "
+                f"{known[-1][1]:.1f} months in {month(known[-1][0])} ({cash_move}).")
+    if detail:
+        text += f" Burn is averaged over a trailing {p.get('window', 3)}-month window."
+    return text
+
+
+def variance_text(p, detail):
+    rows = p.get("rows") or []
+    if not rows:
+        return f"No budget or actuals for {month_range(p.get('months'))}."
+    by_cat = {}
+    for r in rows:
+        c = by_cat.setdefault(r["account_category"], [0.0, 0.0])
+        c[0] += r.get("actual_usd") or 0.0
+        c[1] += r.get("budget_usd") or 0.0
+    ranked = sorted(by_cat.items(), key=lambda kv: -abs(kv[1][0] - kv[1][1]))
+    text = f"{subject('Budget vs actual', p)} for {month_range(p.get('months'))}: "
+    shown = ranked[: (len(ranked) if detail else 2)]
+    parts = []
+    for cat, (actual, budget) in shown:
+        delta = actual - budget
+        parts.append(f"{label(cat)} {usd(actual)} vs {usd(budget)} ({usd(delta, signed=True)}, {favour(cat, delta)})")
+    text += "; ".join(parts) + "."
+    if p.get("entity") == "*":
+        # breakdown rows carry their entity: name each entity's largest variance
+        worst = {}
+        for r in rows:
+            key = (r.get("entity"), r["account_category"])
+            worst[key] = worst.get(key, 0.0) + (r.get("actual_usd") or 0.0) - (r.get("budget_usd") or 0.0)
+        by_entity = {}
+        for (entity, cat), delta in worst.items():
+            if entity not in by_entity or abs(delta) > abs(by_entity[entity][1]):
+                by_entity[entity] = (cat, delta)
+        text += " By entity: " + ", ".join(
+            f"{e} {label(c)} {usd(d, signed=True)}" for e, (c, d) in sorted(by_entity.items(), key=lambda kv: -abs(kv[1][1]))
+        ) + "."
+    return text
+
+
+def favour(category, delta):
+    if abs(delta) < 0.5:
+        return "on budget"
+    good = delta > 0 if category == "Revenue" else delta < 0
+    return "favourable" if good else "unfavourable"
+
+
+def label(category):
+    return category.split(":", 1)[1] if category.startswith("Opex:") else category
+
+
+def breakdown_sentence(intent, p, detail):
+    # one clause per entity, ordered by the figure the intent is about
+    figure = BREAKDOWN_FIGURES.get(intent)
+    rows = p.get("breakdown") or {}
+    if figure is None or not rows:
+        return ""
+    values = [(e, figure(sub)) for e, sub in rows.items()]
+    values = [(e, v) for e, v in values if v[0] is not None]
+    values.sort(key=lambda ev: -ev[1][0])
+    shown = values if detail else values[:3]
+    more = "" if len(shown) == len(values) else f" and {len(values) - len(shown)} more"
+    return "By entity: " + ", ".join(f"{e} {text}" for e, (_, text) in shown) + more + "."
+
+
+def last(values):
+    return values[-1] if values else None
+
+
+BREAKDOWN_FIGURES = {
+    "revenue": lambda s: (s.get("actual_usd"), f"{usd(s.get('actual_usd'))} ({usd(s.get('delta_usd'), signed=True)} vs budget)"),
+    "gross_margin": lambda s: (last(s.get("gm_pct")), pct(last(s.get("gm_pct")))),
+    "opex_total": lambda s: (s.get("opex_usd"), usd(s.get("opex_usd"))),
+    "ebitda": lambda s: (sum(s.get("ebitda_usd") or []), usd(sum(s.get("ebitda_usd") or []))),
+    "cash_runway": lambda s: (s.get("cash_usd"), f"{usd(s.get('cash_usd'))} cash"
+                              + (f", {s['runway_months']:.1f} months runway" if s.get("runway_months") is not None else "")),
+    "cash_runway_trend": lambda s: (last(s.get("cash_usd")), f"{usd(last(s.get('cash_usd')))} cash"
+                                    + (f", {last(s['runway_months']):.1f} months runway" if last(s.get("runway_months")) is not None else "")),
+}
+
+NARRATORS = {
+    "revenue": revenue_text,
+    "gross_margin": gross_margin_text,
+    "opex_total": opex_total_text,
+    "ebitda": ebitda_text,
+    "cash_runway": cash_runway_text,
+    "cash_runway_trend": cash_runway_trend_text,
+    "variance": variance_text,
+}
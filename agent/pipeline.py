@@ -0,0 +1,103 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from io import BytesIO
+
+import matplotlib.pyplot as plt
+
+from agent import trace
+from agent.charts import render_charts
+from agent.export import build_pdf, cover_page
+
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))
+_executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline")
+# pyplot keeps process-wide figure state; every stage that draws takes this lock
+PLOT_LOCK = threading.Lock()
+
+
+class QuestionRun:
+    # the stages of one question that only need the routed payload (charts, their PNGs for
+    # the page, the PDF cover) run on a worker as soon as the route is known, overlapping
+    # the LLM answer; finish(answer) joins them and assembles the PDF. cancel() abandons
+    # the run when the user moves on to another question.
+
+    def __init__(self, key, intent, payload, question, executor=None):
+        self.key = key
+        self.intent = intent
+        self.payload = payload
+        self.question = question
+        self._cancel = threading.Event()
+        self._finished = None
+        self._lock = threading.Lock()
+        # copy the caller's context so the worker's spans join the request's trace
+        ctx = contextvars.copy_context()
+        self.future = (executor or _executor).submit(ctx.run, self._prepare)
+
+    def _prepare(self):
+        with trace.span("prepare", intent=self.intent):
+            self._check()
+            with PLOT_LOCK:
+                figs = render_charts(self.intent, self.payload)
+            try:
+                pngs = []
+                for fig in figs:
+                    self._check()
+                    buf = BytesIO()
+                    with PLOT_LOCK:
+                        fig.savefig(buf, format="png", bbox_inches="tight")
+                    pngs.append(buf.getvalue())
+                self._check()
+                with PLOT_LOCK:
+                    cover = cover_page(self.intent, self.payload, self.question)
+            except BaseException:
+                close(figs)
+                raise
+            return figs, pngs, cover
+
+    def _check(self):
+        if self._cancel.is_set():
+            raise CancelledError()
+
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def finish(self, answer, timeout=None):
+        # {"pngs", "pdf", "file_name"}; repeat calls with the same answer reuse the result
+        with self._lock:
+            if self._finished is not None and self._finished[0] == answer:
+                return self._finished[1]
+            with trace.span("join", intent=self.intent) as s:
+                s.set(waited=not self.future.done())
+                figs, pngs, cover = self.future.result(timeout)
+                if self._finished is not None:
+                    # a different answer for the same run: the old cover is spent
+                    cover = None
+                with PLOT_LOCK:
+                    pdf, file_name = build_pdf(self.intent, self.payload, self.question, answer, figs, cover=cover)
+            result = {"pngs": pngs, "pdf": pdf, "file_name": file_name}
+            self._finished = (answer, result)
+            return result
+
+    def cancel(self):
+        # stops between stages; figures drawn before the stop are closed once the worker returns
+        self._cancel.set()
+        if not self.future.cancel():
+            self.future.add_done_callback(release)
+
+
+def release(future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    figs, _, (cover, _, _) = future.result()
+    close(figs + [cover])
+
+
+def close(figs):
+    with PLOT_LOCK:
+        for fig in figs:
+            plt.close(fig)
+
+
+def start_run(key, intent, payload, question, executor=None):
+    return QuestionRun(key, intent, payload, question, executor)
@@ -0,0 +1,153 @@
+import json
+import os
+import re
+
+# rough upper bound on the payload part of an answer prompt, in tokens
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "800"))
+# series longer than this are sent as summary statistics plus their key points
+SERIES_POINTS = 6
+# bump when the compaction rules change; part of the answer cache's prompt version
+COMPACTION_VERSION = 2
+
+# fields each intent's answer actually uses; anything else is dropped before prompting
+FIELDS = {
+    "revenue": ["month", "entity", "actual_usd", "budget_usd", "delta_usd", "pct_to_budget"],
+    "gross_margin": ["months", "entity", "gm_usd", "gm_pct"],
+    "opex_total": ["month", "entity", "opex_usd", "categories", "values_usd"],
+    "ebitda": ["months", "entity", "ebitda_usd", "ebitda_margin", "revenue_usd", "opex_usd"],
+    "cash_runway": ["month", "months", "entity", "cash_usd", "avg_burn_usd", "runway_months"],
+    "cash_runway_trend": ["months", "entity", "window", "cash_usd", "avg_burn_usd", "runway_months"],
+    "variance": ["months", "entity", "rows"],
+}
+VARIANCE_FIELDS = ["month", "entity", "account_category", "actual_usd", "budget_usd", "delta_usd"]
+
+TOKEN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+
+
+def count_tokens(text):
+    # BPE-like estimate without a tokenizer: words, 3-digit number chunks and punctuation
+    return len(TOKEN.findall(text))
+
+
+def to_json(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def compact_payload(intent, payload, budget=None):
+    # smallest faithful payload for the prompt: only the intent's fields, display precision,
+    # long series summarized; then coarser steps until it fits the token budget
+    budget = budget or PROMPT_TOKEN_BUDGET
+    steps = [
+        dict(usd_digits=None, points=SERIES_POINTS, entities=None, rows=None),
+        dict(usd_digits=3, points=SERIES_POINTS, entities=None, rows=None),
+        dict(usd_digits=3, points=3, entities=8, rows=12),
+        dict(usd_digits=2, points=1, entities=4, rows=6),
+    ]
+    for step in steps:
+        out = shrink(intent, payload, **step)
+        if fits(out, budget):
+            return out
+    # still over: series down to their statistics, then fewer entities and variance rows
+    entities = len(payload.get("entities") or payload.get("breakdown") or [])
+    for keep in range(min(entities, 4), -1, -1):
+        for rows in (6, 3, 1):
+            out = shrink(intent, payload, usd_digits=2, points=0, entities=keep, rows=rows)
+            if fits(out, budget):
+                out["truncated"] = True
+                return out
+    # last resort: drop the largest remaining fields (lists and objects first) until it holds
+    out["truncated"] = True
+    while not fits(out, budget):
+        fields = [k for k in out if k not in ("entity", "truncated")]
+        if not fields:
+            break
+        del out[max(fields, key=lambda k: (isinstance(out[k], (list, dict)), count_tokens(to_json(out[k]))))]
+    return out
+
+
+def fits(payload, budget):
+    return count_tokens(to_json(payload)) <= budget
+
+
+def shrink(intent, payload, usd_digits, points, entities, rows):
+    fields = FIELDS.get(intent)
+    out = {k: v for k, v in payload.items() if fields is None or k in fields}
+    if intent == "variance" and out.get("rows"):
+        out["rows"] = variance_rows(out["rows"], rows)
+    out = {k: round_value(k, v, usd_digits) for k, v in out.items()}
+    if out.get("months") and len(out["months"]) > points:
+        out = summarize_series(out, points)
+    if payload.get("breakdown"):
+        names = payload.get("entities") or list(payload["breakdown"])
+        kept = names if entities is None else names[:entities]
+        out["breakdown"] = {e: shrink(intent, payload["breakdown"][e], usd_digits, points, entities, rows) for e in kept}
+        if len(kept) < len(names):
+            out["more_entities"] = len(names) - len(kept)
+    return out
+
+
+def variance_rows(rows, limit):
+    # largest variances first; past the limit the rest is folded into one "other" line
+    rows = sorted(rows, key=lambda r: -abs(r.get("delta_usd") or 0.0))
+    kept = [{k: r[k] for k in VARIANCE_FIELDS if k in r} for r in (rows if limit is None else rows[:limit])]
+    rest = [] if limit is None else rows[limit:]
+    if rest:
+        kept.append({
+            "account_category": f"other ({len(rest)} rows)",
+            "actual_usd": sum(r.get("actual_usd") or 0.0 for r in rest),
+            "budget_usd": sum(r.get("budget_usd") or 0.0 for r in rest),
+            "delta_usd": sum(r.get("delta_usd") or 0.0 for r in rest),
+        })
+    return kept
+
+
+def round_value(key, value, usd_digits):
+    if isinstance(value, list):
+        return [round_value(key, v, usd_digits) for v in value]
+    if isinstance(value, dict):
+        return {k: round_value(k, v, usd_digits) for k, v in value.items()}
+    if not isinstance(value, float):
+        return value
+    if key.endswith("_usd"):
+        return significant(value, usd_digits) if usd_digits else round(value)
+    if key == "runway_months":
+        return round(value, 1)
+    # ratios (margins, pct_to_budget) keep 0.1% precision
+    return round(value, 4)
+
+
+def significant(value, digits):
+    if abs(value) < 1:
+        return round(value, 2)
+    places = digits - len(str(int(abs(value))))
+    return round(value, places) if places > 0 else int(round(value, places))
+
+
+def summarize_series(payload, points):
+    # each monthly series becomes mean/min/max plus its first, last, min, max and a few evenly
+    # spaced points (the narrative turns on those); the months in between are only counted.
+    # points=0 keeps only the statistics and the first/last values
+    months = payload["months"]
+    out = {k: v for k, v in payload.items() if not (isinstance(v, list) and len(v) == len(months))}
+    out["months"] = {"from": months[0], "to": months[-1], "count": len(months)}
+    for key, series in payload.items():
+        if key == "months" or not (isinstance(series, list) and len(series) == len(months)):
+            continue
+        pairs = [(m, v) for m, v in zip(months, series) if isinstance(v, (int, float))]
+        if not pairs:
+            out[key] = None
+            continue
+        values = [v for _, v in pairs]
+        picks = {0, len(pairs) - 1, values.index(min(values)), values.index(max(values))}
+        step = max(1, len(pairs) // max(points, 1))
+        picks |= set(range(0, len(pairs), step)) if points > 1 else set()
+        out[key] = {
+            "mean": round_value(key, sum(values) / len(values), None),
+            "min": min(values),
+            "max": max(values),
+        }
+        if points:
+            out[key]["points"] = {pairs[i][0]: pairs[i][1] for i in sorted(picks)}
+        else:
+            out[key].update(first=values[0], last=values[-1])
+    return out
@@ -0,0 +1,198 @@
+import threading
+import time
+import warnings
+from dataclasses import fields, replace
+
+import pandas as pd
+
+from agent.cube import Cube, build_cube
+from agent.data import (
+    SortedIndex, attach_usd, compact_frames, month_fingerprints, rate_table, read_sources,
+    source_signature,
+)
+
+FRAMES = ["actuals", "budget", "cash", "fx"]
+# columns whose categorical dictionaries are shared across frames in compact mode
+SHARED = {
+    "entity": ["actuals", "budget", "cash"],
+    "account_category": ["actuals", "budget"],
+    "currency": ["actuals", "budget", "fx"],
+}
+
+
+def refresh_datastore(ds, force=False):
+    # re-read ds's source and return (new DataStore, changed months); only rows of months whose
+    # fingerprint changed in any frame are re-derived, the rest of every frame, index and cube
+    # cell is carried over. ds itself is never mutated, so readers holding it are unaffected.
+    src = ds.source
+    if not src:
+        raise ValueError("DataStore was not built by load_data; nothing to refresh")
+    timings = {}
+    t0 = time.perf_counter()
+    frames, version, report = read_sources(src["pth"], src.get("snapshot_dir"), src.get("parallel", False),
+                                           src.get("chunksize"), timings)
+    if version == ds.version and not force:
+        return ds, []
+
+    t1 = time.perf_counter()
+    fingerprints = {name: month_fingerprints(frames[name]) for name in FRAMES}
+    dirty = changed_months(ds.fingerprints or {}, fingerprints)
+
+    new = {name: frames[name][frames[name]["month"].isin(dirty)].copy() for name in FRAMES}
+    # fx quotes of a dirty month can only change rows of that same month
+    months, currencies, table = rate_table(frames["fx"])
+    missing_a = attach_usd(new["actuals"], months, currencies, table)
+    missing_b = attach_usd(new["budget"], months, currencies, table)
+    missing = pd.concat(
+        [
+            kept_rows(ds.missing_fx, dirty),
+            new["actuals"].loc[missing_a].assign(source="actuals"),
+            new["budget"].loc[missing_b].assign(source="budget"),
+        ],
+        ignore_index=True,
+    )
+
+    old = {name: getattr(ds, name) for name in FRAMES}
+    if ds.compact:
+        old, new = compact_delta(old, new)
+    keys = [ds.month_key(m) for m in dirty]
+
+    index = dict(ds.index or {})
+    out = {}
+    for name in ["actuals", "budget", "cash"]:
+        idx = index.get(name)
+        if idx is None or idx.frame is not getattr(ds, name):
+            out[name], index[name] = SortedIndex.build(pd.concat([kept_rows(old[name], keys), new[name]], ignore_index=True))
+            continue
+        if old[name] is not idx.frame:
+            # re-coded to a grown dictionary; row order, and so the index codes, are unchanged
+            idx = SortedIndex(old[name], idx.months, idx.entities, idx.month_codes, idx.entity_codes)
+        out[name], index[name] = idx.splice(keys, new[name])
+    out["fx"] = pd.concat([kept_rows(old["fx"], keys), new["fx"]], ignore_index=True)
+
+    cube = merge_cube(ds.cube, build_cube(new["actuals"], new["budget"], new["cash"]), set(keys))
+    timings["build"] = time.perf_counter() - t1
+    timings["total"] = time.perf_counter() - t0
+
+    fresh = replace(
+        ds, **out, missing_fx=missing, cube=cube, version=version, index=index,
+        load_timings=timings, ingest_report=report, fingerprints=fingerprints,
+    )
+    return fresh, dirty
+
+
+def changed_months(before, after):
+    # months added, removed or edited in any frame, as sorted labels
+    dirty = set()
+    for name in FRAMES:
+        old, cur = before.get(name, {}), after.get(name, {})
+        dirty.update(m for m in old.keys() | cur.keys() if old.get(m) != cur.get(m))
+    return sorted(dirty)
+
+
+def kept_rows(df, keys):
+    if df is None:
+        return None
+    if not keys:
+        return df
+    return df[~df["month"].isin(keys)]
+
+
+def compact_delta(old, new):
+    # grow the shared dictionaries only when the new rows bring values they lack; kept rows are
+    # re-coded in that case so every frame keeps one dtype per dimension
+    dtypes = {}
+    for col, names in SHARED.items():
+        dtype = old[names[0]][col].dtype
+        values = set()
+        for name in names:
+            values.update(new[name][col].dropna().astype(str))
+        extra = values - set(dtype.categories)
+        dtypes[col] = pd.CategoricalDtype(sorted(set(dtype.categories) | extra)) if extra else dtype
+    grown = dict(old)
+    for col, names in SHARED.items():
+        for name in names:
+            if grown[name][col].dtype != dtypes[col]:
+                grown[name] = grown[name].assign(**{col: grown[name][col].astype(dtypes[col])})
+    new = dict(zip(FRAMES, compact_frames(*(new[name] for name in FRAMES), dtypes=dtypes)))
+    return grown, new
+
+
+def merge_cube(old, delta, keys):
+    # every cube field is keyed by month first, so dirty months are swapped out cell by cell
+    if old is None:
+        return delta
+    merged = Cube()
+    for f in fields(Cube):
+        cells = {k: v for k, v in getattr(old, f.name).items() if cube_month(k) not in keys}
+        cells.update(getattr(delta, f.name))
+        setattr(merged, f.name, cells)
+    return merged
+
+
+def cube_month(key):
+    return key[0] if isinstance(key, tuple) else key
+
+
+class LiveDataStore:
+    # holds the current DataStore; refreshes build a new one off to the side and swap the
+    # reference in one assignment, so readers see either the old or the new store, never a mix
+
+    def __init__(self, ds):
+        self._ds = ds
+        self._lock = threading.Lock()
+        self._signature = self._stat(ds)
+        # signature of source files whose refresh failed; not retried until they change again
+        self._failed = None
+        self.last_refresh = {"version": ds.version, "months": []}
+
+    def current(self):
+        return self._ds
+
+    def refresh(self, force=False):
+        with self._lock:
+            return self._refresh(force)
+
+    def refresh_if_changed(self):
+        # only stats the source files unless they changed since the last refresh. A refresh
+        # that fails (say, a workbook still being written at month-end) warns and keeps
+        # serving the current store, which is still valid
+        if self._changed() is None:
+            return self._ds
+        with self._lock:
+            # sessions that saw the same change queue here; only the first one re-reads
+            signature = self._changed()
+            if signature is None:
+                return self._ds
+            try:
+                return self._refresh()
+            except Exception as e:
+                self._failed = signature
+                warnings.warn(f"could not refresh data, still serving version {self._ds.version}: {e}")
+                return self._ds
+
+    def _changed(self):
+        # the new source signature, or None when there is nothing (new) to refresh from
+        try:
+            signature = self._stat(self._ds)
+        except OSError:
+            # a source file is mid-replace; look again on the next call
+            return None
+        return None if signature in (self._signature, self._failed) else signature
+
+    def _refresh(self, force=False):
+        # caller holds self._lock
+        ds = self._ds
+        signature = self._stat(ds)
+        fresh, dirty = refresh_datastore(ds, force=force)
+        if fresh is not ds:
+            from agent import router
+            router.migrate_cache(ds.version, fresh.version, dirty)
+            self._ds = fresh
+            self.last_refresh = {"version": fresh.version, "months": dirty}
+        self._signature = signature
+        return fresh
+
+    @staticmethod
+    def _stat(ds):
+        return source_signature(ds.source["pth"]) if ds.source else None
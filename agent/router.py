@@ -1,6 +1,10 @@
 from typing import Dict, Any
+import copy
+import os
 
 from agent.data import DataStore, load_data
+from agent.lru import LRUCache
+from agent import trace
 # from agent import metrics
 # from data import DataStore, load_data
 import agent.metrics as metrics
@@ -11,10 +15,20 @@ ROUTES = {
     "opex_total": metrics.opex_total,
     "ebitda": metrics.ebitda,
     "cash_runway": metrics.cash_runway,
+    "cash_runway_trend": metrics.runway_series,
+    "variance": metrics.variance,
 }
 
 
-def route(interp, ds):
+# keys carry the DataStore version, so several live stores share the cache and stale
+# versions simply fall out of the LRU
+CACHE = LRUCache(maxsize=int(os.getenv("ROUTE_CACHE_SIZE", "256")))
+# payloads that read months outside the requested ones (rolling windows over the full history)
+HISTORY_INTENTS = {"cash_runway_trend"}
+
+
+@trace.traced("route")
+def route(interp, ds, use_cache=True):
 
     intent = interp.get("intent")
     months = interp.get("months") or []
@@ -29,14 +43,57 @@ def route(interp, ds):
             "entity": entity,
         }
 
-    payload = fn(ds, months, entity)
+    key = None
+    if use_cache:
+        key = cache_key(intent, months, entity, ds)
+        hit = CACHE.get(key)
+        trace.annotate(intent=intent, cache="hit" if hit is not None else "miss")
+        if hit is not None:
+            return copy.deepcopy(hit)
+
+    with trace.span("metric", fn=fn.__name__, months=len(months)):
+        payload = fn(ds, months, entity)
 
-    return {
+    routed = {
         "intent": intent,
         "used_months": months,
         "entity": entity if entity is not None else payload.get("entity", "All"),
         "payload": payload,
     }
+    if key is not None:
+        # keep a private copy so callers mutating their result can't poison the cache
+        CACHE.put(key, copy.deepcopy(routed))
+    return routed
+
+
+def cache_key(intent, months, entity, ds):
+    version = getattr(ds, "version", None) or id(ds)
+    norm_months = tuple(str(m).strip() for m in months)
+    return (intent, norm_months, entity, metrics.BACKEND, version)
+
+
+def migrate_cache(old_version, new_version, dirty_months):
+    # after an incremental refresh, results that only read unchanged months stay valid:
+    # re-key them to the new version instead of recomputing them; the refresh retires
+    # old_version, so its remaining entries go
+    dirty = {str(m) for m in dirty_months}
+    moved = 0
+    for key, value in CACHE.items():
+        intent, months, entity, backend, version = key
+        if version != old_version or not months or intent in HISTORY_INTENTS or dirty.intersection(months):
+            continue
+        CACHE.put((intent, months, entity, backend, new_version), value)
+        moved += 1
+    CACHE.discard_if(lambda k: k[-1] == old_version)
+    return moved
+
+
+def route_cache_stats():
+    return CACHE.stats()
+
+
+def clear_route_cache():
+    CACHE.clear()
 
 
 # ds = load_data("fixtures/")
@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+import dataclasses
+
+import numpy as np
+import pandas as pd
+
+from agent import snapshot
+from agent.cube import Cube
+from agent.data import DataStore, SortedIndex, load_data
+from agent.refresh import LiveDataStore
+
+# bump when the published layout changes
+SHARED_FORMAT = 2
+FRAMES = ["actuals", "budget", "cash", "fx"]
+MANIFEST = "manifest.json"
+# name of the version stamp file: the folder name of the store workers should attach to
+CURRENT = "CURRENT"
+
+
+def default_root():
+    # /dev/shm is RAM-backed on Linux, so mapped pages there are shared memory proper
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.getenv("SHARED_DATASTORE_DIR", os.path.join(base, "mini_cfo_datastore"))
+
+
+def publish(ds, root=None, keep=2):
+    # write every column of ds as a .npy file under root/<version>/, then point CURRENT at it.
+    # The folder is complete before the stamp moves, so attachers never see a partial store.
+    root = root or default_root()
+    os.makedirs(root, exist_ok=True)
+    final = os.path.join(root, ds.version)
+    if not os.path.exists(os.path.join(final, MANIFEST)):
+        tmp = os.path.join(root, f".{ds.version}.{uuid.uuid4().hex}.tmp")
+        os.makedirs(tmp)
+        try:
+            write_store(tmp, ds)
+            try:
+                os.rename(tmp, final)
+            except OSError:
+                # another loader published the same version first
+                shutil.rmtree(tmp, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+    stamp = os.path.join(root, f".{CURRENT}.{uuid.uuid4().hex}")
+    with open(stamp, "w") as f:
+        f.write(ds.version)
+    os.replace(stamp, os.path.join(root, CURRENT))
+    prune(root, ds.version, keep)
+    return final
+
+
+def write_store(folder, ds):
+    manifest = {"format": SHARED_FORMAT, "version": ds.version, "compact": ds.compact, "frames": {}, "index": {}}
+    for name in FRAMES:
+        manifest["frames"][name] = write_frame(folder, name, getattr(ds, name))
+    for name, idx in (ds.index or {}).items():
+        np.save(os.path.join(folder, name, "month_codes.npy"), idx.month_codes, allow_pickle=False)
+        np.save(os.path.join(folder, name, "entity_codes.npy"), idx.entity_codes, allow_pickle=False)
+        manifest["index"][name] = {"months": idx.months.tolist(), "entities": [str(e) for e in idx.entities]}
+    if ds.missing_fx is not None:
+        manifest["missing_fx"] = write_frame(folder, "missing_fx", ds.missing_fx)
+    # the cube and fingerprints are small aggregates, kept as plain JSON: nothing read back
+    # from the (world-writable) shared root is ever unpickled
+    with open(os.path.join(folder, "extras.json"), "w") as f:
+        json.dump({"cube": encode_cube(ds.cube), "fingerprints": ds.fingerprints}, f)
+    with open(os.path.join(folder, MANIFEST), "w") as f:
+        json.dump(manifest, f)
+
+
+def write_frame(folder, name, df):
+    sub = os.path.join(folder, name)
+    os.makedirs(sub)
+    arrays, columns = snapshot.encode_frame(df)
+    for fname, arr in arrays.items():
+        np.save(os.path.join(sub, fname), arr, allow_pickle=False)
+    for c in columns:
+        c["file"] = os.path.join(name, c["file"])
+    return columns
+
+
+def encode_cube(cube):
+    # {field: [[key parts, value], ...]}; tuple keys become lists and sets sorted lists
+    if cube is None:
+        return None
+    out = {}
+    for f in dataclasses.fields(Cube):
+        cells = []
+        for k, v in getattr(cube, f.name).items():
+            key = list(k) if isinstance(k, tuple) else k
+            cells.append([key, sorted(v) if isinstance(v, set) else v])
+        out[f.name] = cells
+    return out
+
+
+def decode_cube(data):
+    if data is None:
+        return None
+    cube = Cube()
+    for f in dataclasses.fields(Cube):
+        cells = {}
+        for k, v in data[f.name]:
+            key = tuple(k) if isinstance(k, list) else k
+            cells[key] = set(v) if f.name in ("entities", "cash_entities") else v
+        setattr(cube, f.name, cells)
+    return cube
+
+
+def prune(root, current, keep):
+    # keep the newest `keep` versions; workers still mapping an older one keep their pages
+    # until they re-attach, since unlinking a mapped file does not unmap it
+    stores = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name, MANIFEST)
+        if name != current and not name.startswith(".") and os.path.exists(path):
+            stores.append((os.path.getmtime(path), name))
+    for _, name in sorted(stores, reverse=True)[max(keep - 1, 0):]:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def current_version(root=None):
+    try:
+        with open(os.path.join(root or default_root(), CURRENT)) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def attach(root=None, version=None):
+    # DataStore whose columns are read-only views of the published .npy files; numeric and
+    # categorical columns are zero-copy, plain string columns are decoded into object arrays
+    root = root or default_root()
+    version = version or current_version(root)
+    if version is None:
+        raise FileNotFoundError(f"no DataStore published under {root}")
+    folder = os.path.join(root, version)
+    with open(os.path.join(folder, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SHARED_FORMAT:
+        raise ValueError(f"published DataStore format {manifest.get('format')} != {SHARED_FORMAT}")
+    frames = {name: snapshot.decode_frame(folder, manifest["frames"][name]) for name in FRAMES}
+
+    index = {}
+    for name, meta in manifest["index"].items():
+        codes = [np.load(os.path.join(folder, name, f), mmap_mode="r").view(np.ndarray)
+                 for f in ("month_codes.npy", "entity_codes.npy")]
+        index[name] = SortedIndex(frames[name], pd.Index(meta["months"]), pd.Index(meta["entities"]), *codes)
+    missing_fx = snapshot.decode_frame(folder, manifest["missing_fx"]) if "missing_fx" in manifest else None
+    with open(os.path.join(folder, "extras.json")) as f:
+        extras = json.load(f)
+    return DataStore(
+        **frames, missing_fx=missing_fx, compact=manifest["compact"], cube=decode_cube(extras["cube"]),
+        version=manifest["version"], index=index or None, fingerprints=extras["fingerprints"],
+    )
+
+
+class SharedDataStore:
+    # worker-side handle: current() re-attaches when the loader has published a new version
+
+    def __init__(self, root=None):
+        self.root = root or default_root()
+        self._lock = threading.Lock()
+        self._ds = attach(self.root)
+
+    def current(self):
+        version = current_version(self.root)
+        ds = self._ds
+        if version is None or version == ds.version:
+            return ds
+        with self._lock:
+            if self._ds.version != version:
+                self._ds = attach(self.root, version)
+            return self._ds
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load a DataStore once and publish it for workers to attach to.")
+    ap.add_argument("path", nargs="?", default="fixtures")
+    ap.add_argument("--root", default=None)
+    ap.add_argument("--compact", action="store_true", help="categorical columns, so every column maps zero-copy")
+    ap.add_argument("--watch", type=float, default=0, help="poll the sources every N seconds and republish on change")
+    args = ap.parse_args()
+    live = LiveDataStore(load_data(args.path, compact=args.compact))
+    print(publish(live.current(), args.root))
+    while args.watch:
+        time.sleep(args.watch)
+        ds = live.refresh_if_changed()
+        if ds.version != current_version(args.root):
+            print(publish(ds, args.root))
+
+
+if __name__ == "__main__":
+    main()
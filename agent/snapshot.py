@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype, is_bool_dtype
+
+# bump when the on-disk layout or the normalization in agent.data changes
+SNAPSHOT_FORMAT = 1
+FRAMES = ["actuals", "budget", "cash", "fx"]
+MANIFEST = "manifest.json"
+
+
+def file_digest(path, chunk=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def source_info(path):
+    st = os.stat(path)
+    return {
+        "path": os.path.abspath(path),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": file_digest(path),
+    }
+
+
+def snapshot_key(info):
+    raw = f"{SNAPSHOT_FORMAT}|{info['path']}|{info['size']}|{info['mtime_ns']}|{info['sha256']}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def encode_frame(df):
+    # numeric columns stay as raw arrays, string columns become int32 codes + a dictionary
+    arrays = {}
+    columns = []
+    for i, col in enumerate(df.columns):
+        s = df[col]
+        fname = f"c{i}.npy"
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            # compact frames: keep the codes as-is so they can be mapped back without a copy
+            arrays[fname] = np.ascontiguousarray(s.cat.codes.to_numpy())
+            columns.append({"name": col, "kind": "cat", "file": fname, "categories": [str(c) for c in s.cat.categories]})
+            continue
+        if is_numeric_dtype(s) and not is_bool_dtype(s):
+            arrays[fname] = np.ascontiguousarray(s.to_numpy())
+            columns.append({"name": col, "kind": "num", "file": fname})
+            continue
+        codes, uniques = pd.factorize(s, use_na_sentinel=True)
+        cats = list(uniques)
+        if not all(isinstance(c, str) for c in cats):
+            raise ValueError(f"column {col!r} holds non-string values, cannot snapshot")
+        arrays[fname] = codes.astype(np.int32)
+        columns.append({"name": col, "kind": "str", "file": fname, "categories": cats})
+    return arrays, columns
+
+
+def decode_frame(folder, columns, mmap_mode="r"):
+    arrays = {}
+    for c in columns:
+        arr = np.load(os.path.join(folder, c["file"]), mmap_mode=mmap_mode)
+        arrays[c["file"]] = arr.view(np.ndarray) if isinstance(arr, np.memmap) else arr
+    return frame_from_arrays(arrays, columns)
+
+
+def frame_from_arrays(arrays, columns):
+    data = {}
+    for c in columns:
+        arr = arrays[c["file"]]
+        if c["kind"] == "num":
+            data[c["name"]] = arr
+        elif c["kind"] == "cat":
+            dtype = pd.CategoricalDtype(c["categories"])
+            data[c["name"]] = pd.Categorical.from_codes(arr, dtype=dtype, validate=False)
+        else:
+            lookup = np.array(c["categories"] + [np.nan], dtype=object)
+            data[c["name"]] = lookup[arr]  # code -1 picks the trailing NaN
+    return pd.DataFrame(data, copy=False)
+
+
+def read_snapshot(cache_dir, info):
+    folder = os.path.join(cache_dir, snapshot_key(info))
+    manifest_path = os.path.join(folder, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("format") != SNAPSHOT_FORMAT or manifest.get("source") != info:
+            return None
+        return {name: decode_frame(folder, manifest["frames"][name]) for name in FRAMES}
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def write_snapshot(cache_dir, info, frames):
+    os.makedirs(cache_dir, exist_ok=True)
+    key = snapshot_key(info)
+    final = os.path.join(cache_dir, key)
+    tmp = os.path.join(cache_dir, f".{key}.{uuid.uuid4().hex}.tmp")
+    os.makedirs(tmp)
+    try:
+        manifest = {"format": SNAPSHOT_FORMAT, "source": info, "frames": {}}
+        for name in FRAMES:
+            sub = os.path.join(tmp, name)
+            os.makedirs(sub)
+            arrays, columns = encode_frame(frames[name])
+            for fname, arr in arrays.items():
+                np.save(os.path.join(sub, fname), arr, allow_pickle=False)
+            for c in columns:
+                c["file"] = os.path.join(name, c["file"])
+            manifest["frames"][name] = columns
+        with open(os.path.join(tmp, MANIFEST), "w") as f:
+            json.dump(manifest, f)
+        try:
+            os.rename(tmp, final)
+        except OSError:
+            # another worker published the same snapshot first
+            shutil.rmtree(tmp, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    prune_snapshots(cache_dir, info["path"], keep=key)
+    return final
+
+
+def prune_snapshots(cache_dir, source_path, keep):
+    # drop snapshots of older versions of the same workbook
+    for name in os.listdir(cache_dir):
+        if name == keep or name.startswith("."):
+            continue
+        manifest_path = os.path.join(cache_dir, name, MANIFEST)
+        try:
+            with open(manifest_path) as f:
+                src = json.load(f).get("source", {})
+        except (OSError, ValueError):
+            continue
+        if src.get("path") == source_path:
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+
+class SQLiteCache:
+    # persistent key/value cache shared by every process pointing at the same file. Entries
+    # expire after `ttl` seconds and the least recently read ones are evicted past `maxsize`.
+    # Hit/miss counters live in the database too, so stats() covers all processes.
+
+    def __init__(self, path, name="cache", ttl=None, maxsize=None, clock=time.time):
+        self.path = path
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        db = self._connect()
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                f"CREATE TABLE IF NOT EXISTS {name} (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            db.execute(f"CREATE INDEX IF NOT EXISTS {name}_accessed ON {name} (accessed)")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS cache_stats (name TEXT PRIMARY KEY, hits INTEGER NOT NULL, "
+                "misses INTEGER NOT NULL, evictions INTEGER NOT NULL)"
+            )
+            db.execute("INSERT OR IGNORE INTO cache_stats VALUES (?, 0, 0, 0)", (name,))
+        finally:
+            db.close()
+
+    def _connect(self):
+        # one short-lived connection per call: safe across threads and processes, and
+        # writers wait on each other instead of failing with "database is locked"
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    @staticmethod
+    def make_key(*parts):
+        raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key, default=None):
+        now = self.clock()
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(f"SELECT value, created FROM {self.name} WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                db.execute(f"DELETE FROM {self.name} WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                db.execute("UPDATE cache_stats SET misses = misses + 1 WHERE name = ?", (self.name,))
+            else:
+                db.execute(f"UPDATE {self.name} SET accessed = ? WHERE key = ?", (now, key))
+                db.execute("UPDATE cache_stats SET hits = hits + 1 WHERE name = ?", (self.name,))
+            db.execute("COMMIT")
+        finally:
+            db.close()
+        return default if row is None else json.loads(row[0])
+
+    def put(self, key, value):
+        now = self.clock()
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute(
+                f"INSERT OR REPLACE INTO {self.name} (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            if self.maxsize is not None:
+                (size,) = db.execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()
+                extra = size - self.maxsize
+                if extra > 0:
+                    db.execute(
+                        f"DELETE FROM {self.name} WHERE key IN "
+                        f"(SELECT key FROM {self.name} ORDER BY accessed ASC LIMIT ?)",
+                        (extra,),
+                    )
+                    db.execute("UPDATE cache_stats SET evictions = evictions + ? WHERE name = ?", (extra, self.name))
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    def purge_expired(self):
+        if self.ttl is None:
+            return 0
+        db = self._connect()
+        try:
+            cur = db.execute(f"DELETE FROM {self.name} WHERE created < ?", (self.clock() - self.ttl,))
+            return cur.rowcount
+        finally:
+            db.close()
+
+    def clear(self):
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute(f"DELETE FROM {self.name}")
+            db.execute("UPDATE cache_stats SET hits = 0, misses = 0, evictions = 0 WHERE name = ?", (self.name,))
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    def stats(self):
+        db = self._connect()
+        try:
+            (size,) = db.execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()
+            hits, misses, evictions = db.execute(
+                "SELECT hits, misses, evictions FROM cache_stats WHERE name = ?", (self.name,)
+            ).fetchone()
+        finally:
+            db.close()
+        total = hits + misses
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+            "hit_rate": (hits / total) if total else None,
+        }
+
+    def __len__(self):
+        return self.stats()["size"]
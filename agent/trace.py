@@ -0,0 +1,159 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+
+# off unless TRACE is set; when off, span() hands back one shared no-op object and count()
+# returns after a single flag check, so instrumented code pays next to nothing
+ENABLED = os.getenv("TRACE", "").lower() in ("1", "true", "yes")
+TRACE_FILE = os.getenv("TRACE_FILE", "traces/trace.jsonl")
+
+_current = contextvars.ContextVar("trace_span", default=None)
+_lock = threading.Lock()
+
+
+class Span:
+    # one timed stage; spans opened while another is active become its children, and the
+    # outermost one writes the whole tree to TRACE_FILE as one JSON line per span when it closes
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.parent = None
+        self.records = None
+        self.span_id = uuid.uuid4().hex[:16]
+        self.trace_id = None
+        self.started_at = None
+        self.t0 = None
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def add(self, key, n):
+        self.attrs[key] = self.attrs.get(key, 0) + n
+        return self
+
+    def __enter__(self):
+        self.parent = _current.get()
+        if self.parent is None:
+            self.trace_id = uuid.uuid4().hex[:16]
+            self.records = []
+            self.started_at = time.time()
+        else:
+            self.trace_id = self.parent.trace_id
+            self.records = self.parent.records
+            self.started_at = self.parent.started_at
+        self._token = _current.set(self)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.t0
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        root_t0 = self.t0 if self.parent is None else root_of(self).t0
+        self.records.append({
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "start_ms": round((self.t0 - root_t0) * 1000, 3),
+            "duration_ms": round(elapsed * 1000, 3),
+            **self.attrs,
+        })
+        if self.parent is None:
+            self.records.sort(key=lambda r: r["start_ms"])
+            write(self.records, self.started_at)
+        return False
+
+
+class NoopSpan:
+    records = []
+
+    def set(self, **attrs):
+        return self
+
+    def add(self, key, n):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP = NoopSpan()
+
+
+def span(name, **attrs):
+    if not ENABLED:
+        return NOOP
+    return Span(name, attrs)
+
+
+def count(key, n):
+    # add n to a counter (e.g. rows_scanned) on the innermost active span
+    if not ENABLED:
+        return
+    s = _current.get()
+    if s is not None:
+        s.add(key, n)
+
+
+def annotate(**attrs):
+    # set attributes on the innermost active span
+    if not ENABLED:
+        return
+    s = _current.get()
+    if s is not None:
+        s.set(**attrs)
+
+
+def traced(name):
+    # run the decorated function inside span(name)
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with Span(name, {}):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def root_of(s):
+    while s.parent is not None:
+        s = s.parent
+    return s
+
+
+def write(records, started_at):
+    if not TRACE_FILE:
+        return
+    lines = "".join(json.dumps({"ts": round(started_at, 3), **r}, default=str) + "\n" for r in records)
+    folder = os.path.dirname(TRACE_FILE)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    # one append per trace keeps lines from concurrent sessions whole
+    with _lock, open(TRACE_FILE, "a") as f:
+        f.write(lines)
+
+
+def enable(path=None):
+    global ENABLED, TRACE_FILE
+    ENABLED = True
+    if path is not None:
+        TRACE_FILE = path
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
@@ -2,21 +2,32 @@ import streamlit as st
 from dotenv import load_dotenv
 
 from agent.data import load_data
+from agent.refresh import LiveDataStore
 from agent.interpreter import interpret
 from agent.router import route
-from agent.answer import answer_text
-from agent.charts import render_charts
-from agent.export import build_pdf
+from agent.answer import ANSWER_POLICY, polish_async, stream_answer
+from agent.narrate import narrate
+from agent.pipeline import start_run
 from agent.rlhf import log_feedback
+from agent import trace
 
 load_dotenv(override=False)
 st.set_page_config(page_title="CFO Copilot", layout="wide")
 
 FIXTURES_DIR = "fixtures"
+SNAPSHOT_DIR = ".snapshots"
+STYLE = "concise"
+
+def drop_run():
+    # the question changed or has nothing to render: stop its chart/PDF work
+    run = st.session_state.pop("run", None)
+    if run is not None:
+        run.cancel()
 
 @st.cache_resource(show_spinner=False)
 def get_datastore():
-    return load_data(FIXTURES_DIR)
+    # one LiveDataStore shared by every session; refreshes swap in a new DataStore atomically
+    return LiveDataStore(load_data(FIXTURES_DIR, snapshot_dir=SNAPSHOT_DIR))
 
 st.title("Mini CFO Copilot (https://github.com/cyzhang39/mini_CFO_copilot.git)")
 st.caption("Type a question. Sample questions:")
@@ -26,7 +37,8 @@ st.caption("Break down Opex by category for June.")
 st.caption("What is our cash runway right now?")
 
 try:
-    ds = get_datastore()
+    # re-reads only when the source files changed, and then only the changed months
+    ds = get_datastore().refresh_if_changed()
 except Exception as e:
     st.error(f"Failed to load data: {e}")
     st.stop()
@@ -35,43 +47,73 @@ question = st.text_input("Your question")
 
 if question.strip():
     # print(question.strip())
+    request = trace.span("request", question=question)
     try:
-        interp = interpret(question)    
-        routed = route(interp, ds)      
+        with request:
+            interp = interpret(question, ds.latest_month())
+            routed = route(interp, ds)      
 
-        if "error" in routed:
-            st.error(f"Router error: {routed['error']} (intent={routed.get('intent')})")
-        else:
-            intent = routed["intent"]
-            payload = routed["payload"]
-            answer = answer_text(intent, payload, question)
-            st.subheader("Answer")
-            st.text(answer)
-            # print(intent)
-            # print(payload)
+            if "error" in routed:
+                drop_run()
+                st.error(f"Router error: {routed['error']} (intent={routed.get('intent')})")
+            else:
+                intent = routed["intent"]
+                payload = routed["payload"]
+                st.subheader("Answer")
+                # feedback clicks rerun the script; reuse the finished answer instead of asking again
+                answer_key = (question, intent, tuple(routed["used_months"]), routed["entity"], ds.version)
+                # charts and the PDF cover render on a worker while the answer is generated
+                run = st.session_state.get("run")
+                if run is None or run.key != answer_key:
+                    if run is not None:
+                        run.cancel()
+                    run = start_run(answer_key, intent, payload, question)
+                    st.session_state["run"] = run
+                done = st.session_state.get("answer")
+                if done is not None and done[0] == answer_key:
+                    answer = done[1]
+                    st.text(answer)
+                elif ANSWER_POLICY == "template_first":
+                    # the narrator's answer shows immediately; the LLM polish replaces it when it lands
+                    draft = narrate(intent, payload, STYLE)
+                    slot = st.empty()
+                    slot.text(draft)
+                    answer = polish_async(intent, payload, question, STYLE, draft, ds.version).result()
+                    slot.text(answer)
+                    st.session_state["answer"] = (answer_key, answer)
+                else:
+                    answer = st.write_stream(stream_answer(intent, payload, question, style=STYLE, version=ds.version))
+                    st.session_state["answer"] = (answer_key, answer)
+                # print(intent)
+                # print(payload)
             
-            c1, c2 = st.columns(2)
-            with c1:
-                good = st.button("Helpful")
-            with c2:
-                bad = st.button("Not helpful")
-            if good:
-                log_feedback(1)
-            if bad:
-                log_feedback(-1)
-            charts = render_charts(intent, payload)
+                c1, c2 = st.columns(2)
+                with c1:
+                    good = st.button("Helpful")
+                with c2:
+                    bad = st.button("Not helpful")
+                if good:
+                    log_feedback(1, question, routed, STYLE, answer)
+                if bad:
+                    log_feedback(-1, question, routed, STYLE, answer)
+                report = run.finish(answer)
 
-            pdf_bytes, file_name = build_pdf(intent, payload, question, answer, charts)
-            st.download_button(
-                "Export PDF",
-                data=pdf_bytes,
-                file_name=file_name,
-                mime="application/pdf",
-            )
-            if charts:
-                st.subheader("Chart")
-                for fig in charts:
-                    st.pyplot(fig, clear_figure=True)
+                st.download_button(
+                    "Export PDF",
+                    data=report["pdf"],
+                    file_name=report["file_name"],
+                    mime="application/pdf",
+                )
+                if report["pngs"]:
+                    st.subheader("Chart")
+                    for png in report["pngs"]:
+                        st.image(png)
 
     except Exception as e:
         st.error(f"Error: {e}")
+    if request.records:
+        # TRACE=1: per-stage timings, LLM round trips and rows scanned for this question
+        with st.expander("Debug: trace"):
+            st.dataframe(request.records, use_container_width=True)
+else:
+    drop_run()
@@ -0,0 +1,73 @@
+# Batched EBITDA vs the old per-month opex_total loop as the trend grows from 3 to 120 months.
+# usage: python -m benchmarks.bench_ebitda [fixtures_dir] [--repeat N]
+import argparse
+import statistics
+import time
+import warnings
+
+import pandas as pd
+
+from agent.data import build_datastore, load_data, ordinal_month, month_ordinal
+from agent.metrics import ebitda, opex_total, ensure_usd
+
+MONTH_COUNTS = [3, 6, 12, 24, 48, 120]
+
+
+def tile_history(ds, n_months):
+    # repeat the fixture ledger forward in time until it covers n_months
+    span = ds.actuals["month"].nunique()
+    copies = -(-n_months // span)
+    frames = {"actuals": [], "budget": [], "cash": [], "fx": []}
+    for k in range(copies):
+        shift = k * span
+        for name in frames:
+            df = getattr(ds, name).drop(columns=["amount_usd"], errors="ignore").copy()
+            df["month"] = [ordinal_month(month_ordinal(m) + shift) for m in df["month"]]
+            frames[name].append(df)
+    first = month_ordinal(ds.actuals["month"].min())
+    keep = {ordinal_month(first + i) for i in range(n_months)}
+    frames = {name: pd.concat(parts, ignore_index=True) for name, parts in frames.items()}
+    return build_datastore(**{name: df[df["month"].isin(keep)].reset_index(drop=True) for name, df in frames.items()})
+
+
+def legacy_ebitda(ds, months, entity):
+    # the pre-batching shape: one grouped pass for revenue/COGS plus one opex_total per month
+    a = ds.actuals[ds.actuals["month"].isin(months)]
+    a = a[a["account_category"].isin(["Revenue", "COGS"])]
+    grouped = ensure_usd(a, ds.fx).groupby(["month", "account_category"])["amount_usd"].sum()
+    out = []
+    for m in months:
+        opex = opex_total(ds, [m], entity)["opex_usd"]
+        out.append(grouped.get((m, "Revenue"), 0.0) - grouped.get((m, "COGS"), 0.0) - opex)
+    return out
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("pth", nargs="?", default="fixtures")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    warnings.simplefilter("ignore")
+    ds = tile_history(load_data(args.pth), max(MONTH_COUNTS))
+    all_months = sorted(ds.actuals["month"].unique())
+
+    print(f"{'months':>6} {'legacy ms':>10} {'batched ms':>11} {'speedup':>8}")
+    for n in MONTH_COUNTS:
+        months = all_months[-n:]
+        old = timed(lambda: legacy_ebitda(ds, months, None), args.repeat)
+        new = timed(lambda: ebitda(ds, months, None), args.repeat)
+        print(f"{n:>6} {old * 1000:>10.2f} {new * 1000:>11.2f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
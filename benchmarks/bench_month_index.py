@@ -0,0 +1,63 @@
+# Single-month question latency as history grows, with and without the sorted month index.
+# usage: python -m benchmarks.bench_month_index [fixtures_dir] [--repeat N]
+import argparse
+import statistics
+import time
+import warnings
+from dataclasses import replace
+
+import pandas as pd
+
+from agent.data import load_data, build_datastore
+from agent.metrics import revenue, opex_total
+from benchmarks.bench_ebitda import tile_history
+
+YEARS = [1, 2, 5, 10]
+
+
+def widen(ds, copies):
+    # clone every entity so each month holds more rows
+    frames = {}
+    for name in ["actuals", "budget", "cash", "fx"]:
+        df = getattr(ds, name).drop(columns=["amount_usd"], errors="ignore")
+        if "entity" in df.columns:
+            df = pd.concat([df.assign(entity=df["entity"] + f"-{k}") for k in range(copies)], ignore_index=True)
+        frames[name] = df
+    return build_datastore(**frames)
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("pth", nargs="?", default="fixtures")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--copies", type=int, default=200, help="entity clones per fixture entity")
+    args = ap.parse_args()
+
+    warnings.simplefilter("ignore")
+    base = widen(load_data(args.pth), args.copies)
+
+    print(f"{'years':>5} {'rows':>8} {'mask ms':>8} {'index ms':>9}")
+    for years in YEARS:
+        ds = tile_history(base, years * 12)
+        month = [sorted(ds.actuals["month"].unique())[-1]]
+        scan = replace(ds, index=None)
+
+        def question(store):
+            revenue(store, month, None)
+            opex_total(store, month, "EMEA-0")
+
+        print(f"{years:>5} {len(ds.actuals):>8} {timed(lambda: question(scan), args.repeat) * 1000:>8.2f} "
+              f"{timed(lambda: question(ds), args.repeat) * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
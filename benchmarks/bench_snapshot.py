@@ -0,0 +1,57 @@
+# Cold XLSX parse (sequential and one process per sheet) vs warm snapshot load.
+# usage: python -m benchmarks.bench_snapshot [fixtures_dir] [--repeat N]
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+
+from agent.data import load_data
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("pth", nargs="?", default="fixtures")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    snap_dir = tempfile.mkdtemp(prefix="cfo_snap_")
+    try:
+        cold = timed(lambda: load_data(args.pth), args.repeat)
+        cold_par = timed(lambda: load_data(args.pth, parallel=True), args.repeat)
+        sheets = {
+            "sequential": load_data(args.pth).load_timings,
+            "parallel": load_data(args.pth, parallel=True).load_timings,
+        }
+
+        t0 = time.perf_counter()
+        load_data(args.pth, snapshot_dir=snap_dir)
+        first = time.perf_counter() - t0
+
+        warm = timed(lambda: load_data(args.pth, snapshot_dir=snap_dir), args.repeat)
+    finally:
+        shutil.rmtree(snap_dir, ignore_errors=True)
+
+    cold_med = statistics.median(cold)
+    warm_med = statistics.median(warm)
+    print(f"cold xlsx parse     : {cold_med * 1000:9.2f} ms (median of {args.repeat})")
+    print(f"cold parallel parse : {statistics.median(cold_par) * 1000:9.2f} ms (median of {args.repeat})")
+    print(f"first load + write  : {first * 1000:9.2f} ms")
+    print(f"warm snapshot load  : {warm_med * 1000:9.2f} ms (median of {args.repeat})")
+    print(f"speedup             : {cold_med / warm_med:9.1f}x")
+    for mode, t in sheets.items():
+        parts = ", ".join(f"{k}={v * 1000:.1f}ms" for k, v in t.items())
+        print(f"{mode:<20}: {parts}")
+
+
+if __name__ == "__main__":
+    main()
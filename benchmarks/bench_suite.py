@@ -0,0 +1,136 @@
+# End-to-end stage timings on synthetic ledgers from 10k to 10M actuals rows, as JSON.
+# usage: python -m benchmarks.bench_suite [--tiers 10000 100000 ...] [--repeat N] [--out results.json]
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+import warnings
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from agent import metrics, router
+from agent.charts import render_charts
+from agent.data import load_data, to_usd
+from agent.export import build_pdf
+from benchmarks.synthetic import XLSX_MAX_ROWS, generate, write_ledger
+
+TIERS = [10_000, 100_000, 1_000_000, 10_000_000]
+# openpyxl writes/reads ~10k rows/s, so workbook loads are only timed on the small tiers
+XLSX_TIERS_MAX = 100_000
+
+
+def timed(fn, repeat):
+    times, out = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return {"median_s": statistics.median(times), "min_s": min(times), "runs": repeat}, out
+
+
+def bench_tier(rows, args, workdir):
+    frames = generate(rows, months=args.months, currencies=args.currencies, opex=args.opex, seed=args.seed)
+    folder = f"{workdir}/{rows}"
+    write_ledger(frames, f"{folder}/csv", "csv")
+    out = {"rows": {name: len(df) for name, df in frames.items()}, "timings": {}}
+    t = out["timings"]
+
+    t["load_data.csv"], ds = timed(lambda: load_data(f"{folder}/csv"), args.repeat)
+    if rows <= min(args.xlsx_max, XLSX_MAX_ROWS):
+        write_ledger(frames, f"{folder}/xlsx", "xlsx")
+        t["load_data.xlsx"], _ = timed(lambda: load_data(f"{folder}/xlsx"), args.repeat)
+    raw = frames["actuals"]
+    t["to_usd"], _ = timed(lambda: to_usd(raw, frames["fx"]), args.repeat)
+    del frames, raw
+
+    labels = sorted(pd.unique(ds.actuals["month"]))
+    months = [ds.month_label(m) for m in labels[-3:]]
+    routed = {}
+    for backend in metrics.BACKENDS:
+        previous = metrics.set_backend(backend)
+        try:
+            for intent, fn in router.ROUTES.items():
+                t[f"metric.{backend}.{intent}"], _ = timed(lambda: fn(ds, months, None), args.repeat)
+        finally:
+            metrics.set_backend(previous)
+
+    for intent in router.ROUTES:
+        interp = {"intent": intent, "months": months}
+        t[f"route.{intent}"], routed[intent] = timed(lambda: router.route(interp, ds, use_cache=False), args.repeat)
+    router.clear_route_cache()
+    router.route({"intent": "revenue", "months": months}, ds)
+    t["route.cached"], _ = timed(lambda: router.route({"intent": "revenue", "months": months}, ds), args.repeat)
+
+    for intent, r in routed.items():
+        def charts():
+            figs = render_charts(intent, r["payload"])
+            for fig in figs:
+                plt.close(fig)
+            return figs
+        t[f"render_charts.{intent}"], _ = timed(charts, args.repeat)
+
+        def pdf():
+            figs = render_charts(intent, r["payload"])
+            t0 = time.perf_counter()
+            build_pdf(intent, r["payload"], "benchmark question", "benchmark answer", figs)
+            elapsed = time.perf_counter() - t0
+            for fig in figs:
+                plt.close(fig)
+            return elapsed
+        runs = [pdf() for _ in range(args.repeat)]
+        t[f"build_pdf.{intent}"] = {"median_s": statistics.median(runs), "min_s": min(runs), "runs": args.repeat}
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tiers", type=int, nargs="+", default=TIERS, help="approximate actuals rows per tier")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--months", type=int, default=36)
+    ap.add_argument("--currencies", type=int, default=3)
+    ap.add_argument("--opex", type=int, default=4)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--xlsx-max", type=int, default=XLSX_TIERS_MAX, help="largest tier also timed as a workbook")
+    ap.add_argument("--out", default=None, help="write JSON here instead of stdout")
+    args = ap.parse_args()
+
+    warnings.simplefilter("ignore")
+    workdir = tempfile.mkdtemp(prefix="cfo_bench_")
+    result = {
+        "meta": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+            "months": args.months,
+            "currencies": args.currencies,
+            "opex": args.opex,
+            "seed": args.seed,
+        },
+        "tiers": [],
+    }
+    try:
+        for rows in args.tiers:
+            tier = bench_tier(rows, args, workdir)
+            tier["tier"] = rows
+            result["tiers"].append(tier)
+            shutil.rmtree(f"{workdir}/{rows}", ignore_errors=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Prompt size per intent before and after payload compaction, in estimated tokens.
+# usage: python -m benchmarks.prompt_tokens [--data fixtures] [--months 1 3 12] [--budget N] [--out tokens.json]
+import argparse
+import json
+import warnings
+
+from agent import interpreter
+from agent.answer import build_messages
+from agent.data import load_data
+from agent.prompt_payload import count_tokens
+from agent.router import ROUTES
+
+
+def prompt_tokens(messages):
+    return sum(count_tokens(m["content"]) for m in messages)
+
+
+def raw_messages(intent, payload, question, style):
+    # the pre-compaction prompt: full float precision, every field, indent-free default json
+    messages = build_messages(intent, {}, question, style)
+    messages[1]["content"] = messages[1]["content"].replace("payload: {}", f"payload: {json.dumps(payload, ensure_ascii=False)}")
+    return messages
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--data", default="fixtures")
+    ap.add_argument("--months", type=int, nargs="+", default=[1, 3, 12])
+    ap.add_argument("--budget", type=int, default=None)
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args()
+
+    warnings.simplefilter("ignore")
+    ds = load_data(args.data)
+    latest = ds.latest_month()
+    y, m = int(latest[:4]), int(latest[5:7])
+    rows = []
+    for n in args.months:
+        months = [f"{(y * 12 + m - 1 - k) // 12:04d}-{(y * 12 + m - 1 - k) % 12 + 1:02d}" for k in reversed(range(n))]
+        for intent, fn in ROUTES.items():
+            for entity in (None, "*"):
+                payload = fn(ds, months, entity)
+                question = f"{intent.replace('_', ' ')} for the last {n} months"
+                before = prompt_tokens(raw_messages(intent, payload, question, "concise"))
+                after = prompt_tokens(build_messages(intent, payload, question, "concise", budget=args.budget))
+                rows.append({"intent": intent, "months": n, "breakdown": entity == "*",
+                             "before": before, "after": after, "saved_pct": round(100 * (1 - after / before), 1)})
+
+    interp = prompt_tokens([{"content": interpreter.LLM_SYSTEM_PROMPT},
+                            {"content": f"{interpreter.PROMPT}{interpreter.anchor_note(latest)}\nQ: revenue last quarter"}])
+    print(f"{'intent':<18} {'months':>6} {'split':>5} {'before':>7} {'after':>6} {'saved':>6}")
+    for r in rows:
+        print(f"{r['intent']:<18} {r['months']:>6} {'*' if r['breakdown'] else '':>5} {r['before']:>7} {r['after']:>6} {r['saved_pct']:>5}%")
+    print(f"interpret prompt: {interp} tokens (sent only when the local parser cannot resolve the question)")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"answer_prompts": rows, "interpret_prompt": interp}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
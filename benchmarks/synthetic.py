@@ -0,0 +1,117 @@
+# Deterministic synthetic ledger in the fixture layout, for benchmarks at any size.
+# usage: python -m benchmarks.synthetic out_dir --rows 1000000 [--format csv|xlsx|parquet]
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from agent.data import ordinal_month, month_ordinal
+
+CURRENCIES = ["USD", "EUR", "GBP", "JPY", "CAD", "AUD", "CHF", "SGD"]
+BASE_RATES = {"USD": 1.0, "EUR": 1.08, "GBP": 1.27, "JPY": 0.0068, "CAD": 0.74, "AUD": 0.66, "CHF": 1.12, "SGD": 0.74}
+OPEX = ["Marketing", "Sales", "R&D", "Admin", "Facilities", "IT", "Legal", "Travel"]
+# one sheet holds at most 2**20 rows; larger ledgers are only written as CSV/Parquet
+XLSX_MAX_ROWS = 1_048_575
+
+
+def generate(rows=10_000, entities=None, currencies=3, months=36, opex=4, start="2023-01", seed=0):
+    # actuals/budget hold one row per (month, entity, category), so `rows` is met by scaling the
+    # entity count unless entities is given; the same arguments always give the same frames
+    rng = np.random.default_rng(seed)
+    categories = ["Revenue", "COGS"] + [f"Opex:{OPEX[i % len(OPEX)]}" + (f"{i // len(OPEX)}" if i >= len(OPEX) else "")
+                                        for i in range(opex)]
+    if entities is None:
+        entities = max(1, round(rows / (months * len(categories))))
+    ccy = [CURRENCIES[i % len(CURRENCIES)] for i in range(max(1, currencies))]
+    names = np.array([f"E{i:05d}" for i in range(entities)])
+    ent_ccy = np.array([ccy[i % len(ccy)] for i in range(entities)])
+    first = month_ordinal(start)
+    labels = np.array([ordinal_month(first + i) for i in range(months)])
+
+    # per-entity revenue scale, monthly growth and seasonality, in the entity's own currency
+    scale = rng.lognormal(mean=13.0, sigma=0.6, size=entities) / np.array([BASE_RATES[c] for c in ent_ccy])
+    growth = rng.normal(0.01, 0.01, size=entities)
+    t = np.arange(months)
+    season = 1 + 0.08 * np.sin(2 * np.pi * t / 12)
+    revenue = scale[None, :] * (1 + growth[None, :]) ** t[:, None] * season[:, None]
+    revenue *= rng.normal(1.0, 0.03, size=revenue.shape)
+    shares = np.concatenate([[0.4], rng.dirichlet(np.ones(opex)) * 0.45]) if opex else np.array([0.4])
+    amounts = revenue[:, :, None] * np.concatenate([[1.0], shares])[None, None, :]
+    amounts *= rng.normal(1.0, 0.02, size=amounts.shape)
+
+    m_idx, e_idx, c_idx = np.meshgrid(np.arange(months), np.arange(entities), np.arange(len(categories)), indexing="ij")
+    m_idx, e_idx, c_idx = m_idx.ravel(), e_idx.ravel(), c_idx.ravel()
+    actuals = pd.DataFrame({
+        "month": labels[m_idx],
+        "entity": names[e_idx],
+        "account_category": np.array(categories)[c_idx],
+        "amount": np.round(amounts.ravel(), 2),
+        "currency": ent_ccy[e_idx],
+    })
+    budget = actuals.assign(amount=np.round(actuals["amount"].to_numpy() * rng.normal(1.0, 0.05, size=len(actuals)), 2))
+
+    drift = np.cumsum(rng.normal(0, 0.01, size=(months, len(ccy))), axis=0)
+    rates = np.array([BASE_RATES[c] for c in ccy])[None, :] * np.exp(drift)
+    rates[:, [i for i, c in enumerate(ccy) if c == "USD"]] = 1.0
+    fx = pd.DataFrame({
+        "month": np.repeat(labels, len(ccy)),
+        "currency": np.tile(ccy, months),
+        "rate_to_usd": np.round(rates.ravel(), 6),
+    })
+
+    # cash: a starting balance per entity drawn down by a noisy monthly burn
+    opening = scale * np.array([BASE_RATES[c] for c in ent_ccy]) * rng.uniform(6, 24, size=entities)
+    burn = scale * np.array([BASE_RATES[c] for c in ent_ccy]) * rng.normal(0.05, 0.03, size=(months, entities))
+    balance = np.maximum(opening[None, :] - np.cumsum(burn, axis=0), 0)
+    cash = pd.DataFrame({
+        "month": np.repeat(labels, entities),
+        "entity": np.tile(names, months),
+        "cash_usd": np.round(balance.ravel(), 2),
+    })
+    return {"actuals": actuals, "budget": budget, "cash": cash, "fx": fx}
+
+
+def write_ledger(frames, folder, fmt="csv"):
+    # csv/parquet: one file per sheet, as agent.ingest reads them; xlsx: a single data.xlsx
+    os.makedirs(folder, exist_ok=True)
+    if fmt == "xlsx":
+        too_big = [name for name, df in frames.items() if len(df) > XLSX_MAX_ROWS]
+        if too_big:
+            raise ValueError(f"{too_big} exceed the {XLSX_MAX_ROWS} row sheet limit; write csv or parquet")
+        path = os.path.join(folder, "data.xlsx")
+        with pd.ExcelWriter(path) as xl:
+            for name, df in frames.items():
+                df.to_excel(xl, sheet_name=name, index=False)
+        return [path]
+    paths = []
+    for name, df in frames.items():
+        path = os.path.join(folder, f"{name}.{fmt}")
+        if fmt == "parquet":
+            df.to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("out")
+    ap.add_argument("--rows", type=int, default=10_000, help="approximate actuals rows")
+    ap.add_argument("--entities", type=int, default=None)
+    ap.add_argument("--currencies", type=int, default=3)
+    ap.add_argument("--months", type=int, default=36)
+    ap.add_argument("--opex", type=int, default=4, help="number of Opex:* categories")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--format", choices=["csv", "xlsx", "parquet"], default="csv")
+    args = ap.parse_args()
+
+    frames = generate(args.rows, args.entities, args.currencies, args.months, args.opex, seed=args.seed)
+    for path in write_ledger(frames, args.out, args.format):
+        print(path)
+    print({name: len(df) for name, df in frames.items()})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import json
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from agent import answer, llm
+
+
+class StubLLM:
+    # local stand-in for the chat-completions endpoint: queued steps decide status, delay and
+    # reply of each request; once the queue is empty every request gets `reply` with HTTP 200
+
+    def __init__(self):
+        self.steps = deque()
+        self.reply = "{}"
+        self.chunk_delay = 0.0
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests.append({"body": body, "client_port": self.client_address[1]})
+                status, delay, content, headers = stub.steps.popleft() if stub.steps else (200, 0, stub.reply, {})
+                time.sleep(delay)
+                if status == 200 and body.get("stream"):
+                    return self.stream(content)
+                if status == 200:
+                    raw = json.dumps({"choices": [{"message": {"role": "assistant", "content": content}}]})
+                else:
+                    raw = json.dumps({"error": content or "stub error"})
+                data = raw.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def stream(self, content):
+                # one SSE event per word, then [DONE]; read until the connection closes
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                for piece in re.findall(r"\S+\s*", content):
+                    event = {"choices": [{"index": 0, "delta": {"content": piece}}]}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    time.sleep(stub.chunk_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/chat/completions"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def queue(self, status=200, delay=0.0, content=None, headers=None):
+        self.steps.append((status, delay, content if content is not None else self.reply, headers or {}))
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def llm_server(tmp_path, monkeypatch):
+    # a StubLLM with the shared agent.llm client pointed at it (fast backoff, short timeouts)
+    # and a per-test answer cache, so no answer leaks between tests
+    monkeypatch.setattr(answer, "ANSWER_CACHE_PATH", str(tmp_path / "answers.sqlite"))
+    monkeypatch.setattr(answer, "_answer_cache", None)
+    stub = StubLLM()
+    client = llm.LLMClient(api_url=stub.url, token="test", model="stub-model", connect_timeout=1,
+                           read_timeout=0.5, retries=2, backoff=0.01, backoff_max=0.05)
+    previous = llm.set_client(client)
+    yield stub
+    llm.set_client(previous)
+    client.session.close()
+    stub.close()
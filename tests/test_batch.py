@@ -0,0 +1,84 @@
+import json
+import threading
+
+from agent import batch
+from agent.batch import BatchRunner, read_questions
+from agent.data import load_data
+
+FIXTURES_DIR = "fixtures"
+
+DS = load_data(FIXTURES_DIR)
+
+
+def test_runs_in_order_and_routes_each_interpretation_once(tmp_path, monkeypatch):
+    monkeypatch.delenv("USE_LLM", raising=False)
+    path = tmp_path / "questions.jsonl"
+    path.write_text("\n".join([
+        json.dumps({"id": "q1", "question": "What was June 2025 revenue vs budget in USD?"}),
+        json.dumps("What was June 2025 revenue vs budget?"),
+        json.dumps({"question": "Break down Opex by category for June.", "style": "detail"}),
+        "",
+    ]))
+    runner = BatchRunner(DS, workers=4, policy="template")
+    results = list(runner.run(read_questions(str(path))))
+
+    assert [r["id"] for r in results] == ["q1", 2, 3]
+    assert len(runner.route_once) == 2 and sorted(r["route_shared"] for r in results) == [False, False, True]
+    assert results[0]["answer"] == results[1]["answer"] and results[0]["answer"].startswith("Revenue for Jun 2025")
+    assert "By category:" in results[2]["answer"]
+    assert {"interpret", "route", "answer_text", "total"} <= set(results[0]["timings_ms"])
+    # nothing here calls the LLM, so no stage waited for a slot
+    assert not any(k.endswith("_queued") for r in results for k in r["timings_ms"])
+
+
+def test_llm_stages_are_bounded(llm_server, monkeypatch):
+    monkeypatch.delenv("USE_LLM", raising=False)
+    llm_server.reply = "ok"
+    for _ in range(6):
+        llm_server.queue(200, delay=0.1, content="ok")
+    live, peak, lock = [0], [0], threading.Lock()
+    real = batch.answer_text
+
+    def counting(*args):
+        with lock:
+            live[0] += 1
+            peak[0] = max(peak[0], live[0])
+        try:
+            return real(*args)
+        finally:
+            with lock:
+                live[0] -= 1
+
+    monkeypatch.setattr(batch, "answer_text", counting)
+    items = [{"id": m, "question": f"revenue for 2025-{m:02d}"} for m in range(1, 7)]
+    results = list(BatchRunner(DS, workers=6, llm_concurrency=2, policy="llm").run(items))
+
+    assert [r["answer"] for r in results] == ["ok"] * 6
+    assert peak[0] == 2
+    assert all("answer_text_queued" in r["timings_ms"] and "interpret_queued" not in r["timings_ms"] for r in results)
+
+
+def test_template_first_polishes_inside_the_llm_slot(llm_server, monkeypatch):
+    monkeypatch.delenv("USE_LLM", raising=False)
+    llm_server.reply = "polished"
+    for _ in range(4):
+        llm_server.queue(200, delay=0.1, content="polished")
+    live, peak, lock = [0], [0], threading.Lock()
+    real = batch.polish
+
+    def counting(*args):
+        with lock:
+            live[0] += 1
+            peak[0] = max(peak[0], live[0])
+        try:
+            return real(*args)
+        finally:
+            with lock:
+                live[0] -= 1
+
+    monkeypatch.setattr(batch, "polish", counting)
+    items = [{"id": m, "question": f"revenue for 2025-{m:02d}"} for m in range(1, 5)]
+    results = list(BatchRunner(DS, workers=4, llm_concurrency=1, policy="template_first").run(items))
+
+    assert [r["answer"] for r in results] == ["polished"] * 4
+    assert peak[0] == 1 and len(llm_server.requests) == 4
@@ -2,7 +2,7 @@ import os
 import pandas as pd
 import pytest
 
-from agent.data import load_data, to_usd
+from agent.data import load_data, to_usd, build_datastore
 
 FIXTURES_DIR = "fixtures"
 
@@ -63,3 +63,85 @@ def test_to_usd_empty_df():
     out = to_usd(empty_actuals, ds.fx)
     assert "amount_usd" in out.columns
     assert len(out) == 0
+
+
+def test_amount_usd_precomputed_matches_to_usd():
+    ds = load_data(FIXTURES_DIR)
+
+    raw = ds.actuals.drop(columns=["amount_usd"])
+    expected = to_usd(raw, ds.fx)["amount_usd"]
+
+    assert ds.actuals["amount_usd"].tolist() == expected.tolist()
+    assert ds.missing_fx is not None and ds.missing_fx.empty
+
+
+def test_missing_fx_rows_reported():
+    fx = pd.DataFrame([{"month": "2025-06", "currency": "USD", "rate_to_usd": 1.0}])
+    rows = pd.DataFrame(
+        [
+            {"month": "2025-06", "entity": "A", "account_category": "Revenue", "amount": 10.0, "currency": "USD"},
+            {"month": "2025-06", "entity": "A", "account_category": "Revenue", "amount": 20.0, "currency": "EUR"},
+        ]
+    )
+    cash = pd.DataFrame(columns=list(EXPECTED_CASH_COLS))
+
+    with pytest.warns(UserWarning):
+        ds = build_datastore(actuals=rows.copy(), budget=rows.copy(), cash=cash, fx=fx)
+
+    assert ds.actuals["amount_usd"].iloc[0] == 10.0
+    assert pd.isna(ds.actuals["amount_usd"].iloc[1])
+    assert len(ds.missing_fx) == 2
+    assert set(ds.missing_fx["source"]) == {"actuals", "budget"}
+    assert set(ds.missing_fx["currency"]) == {"EUR"}
+
+
+def test_compact_mode_matches_and_shrinks():
+    from agent.metrics import revenue, opex_total, cash_runway
+
+    ds = load_data(FIXTURES_DIR)
+    small = load_data(FIXTURES_DIR, compact=True)
+
+    assert small.actuals["month"].dtype == "int32"
+    assert isinstance(small.actuals["entity"].dtype, pd.CategoricalDtype)
+    assert list(small.actuals["entity"].cat.categories) == list(small.cash["entity"].cat.categories)
+    assert small.month_label(small.month_key("2023-02")) == "2023-02"
+
+    months = ["2023-01", "2023-02", "2023-03"]
+    assert revenue(small, months, "EMEA") == revenue(ds, months, "EMEA")
+    assert opex_total(small, months, None) == opex_total(ds, months, None)
+    assert cash_runway(small, months, None) == cash_runway(ds, months, None)
+
+    big = ds.memory_report().groupby("frame")["bytes"].sum()
+    compact = small.memory_report().groupby("frame")["bytes"].sum()
+    assert (compact < big).all()
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_sorted_index_rows_match_mask(compact):
+    ds = load_data(FIXTURES_DIR, compact=compact)
+    cases = [
+        (["2023-01"], None),
+        (["2023-03", "2023-01", "2023-02"], "EMEA"),
+        (["2023-01", "2024-06", "2023-01"], "ParentCo"),
+        (["2099-01"], None),
+        (["2023-01"], "Nope"),
+    ]
+    for name in ["actuals", "budget", "cash"]:
+        df = getattr(ds, name)
+        assert df["month"].is_monotonic_increasing
+        for months, entity in cases:
+            keys = [ds.month_key(m) for m in months]
+            expected = df[df["month"].isin(keys)]
+            if entity:
+                expected = expected[expected["entity"] == entity]
+            pd.testing.assert_frame_equal(ds.rows(name, months, entity), expected)
+
+
+def test_parallel_load_matches_sequential():
+    seq = load_data(FIXTURES_DIR)
+    par = load_data(FIXTURES_DIR, parallel=True)
+
+    for name in ["actuals", "budget", "cash", "fx"]:
+        pd.testing.assert_frame_equal(getattr(par, name), getattr(seq, name))
+        assert par.load_timings[name] >= 0
+    assert par.version == seq.version
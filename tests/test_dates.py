@@ -0,0 +1,93 @@
+import pytest
+
+from agent import interpreter
+from agent.dates import resolve_dates
+
+LATEST = "2025-09"
+
+
+def months(first, last):
+    y0, m0 = map(int, first.split("-"))
+    y1, m1 = map(int, last.split("-"))
+    return [f"{o // 12:04d}-{o % 12 + 1:02d}" for o in range(y0 * 12 + m0 - 1, y1 * 12 + m1)]
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("What was June 2025 revenue vs budget in USD?", ["2025-06"]),
+    ("Break down Opex by category for June.", ["2025-06"]),
+    ("Opex for December", ["2024-12"]),
+    ("revenue in May", ["2025-05"]),
+    ("revenue 06/2025 and Jul '25", ["2025-06", "2025-07"]),
+    ("How has our runway evolved from 2025-01 to 2025-06?", months("2025-01", "2025-06")),
+    ("revenue June to August 2025", months("2025-06", "2025-08")),
+    ("revenue Nov - Feb 2025", months("2024-11", "2025-02")),
+    ("revenue since March", months("2025-03", "2025-09")),
+    ("Full budget vs actual variance for Q2 2025.", months("2025-04", "2025-06")),
+    ("2024 Q4 ebitda", months("2024-10", "2024-12")),
+    ("third quarter of 2024", months("2024-07", "2024-09")),
+    ("Q3 revenue", months("2025-07", "2025-09")),
+    ("Q4 revenue", months("2024-10", "2024-12")),
+    ("H1 2025 revenue", months("2025-01", "2025-06")),
+    ("revenue for FY2024", months("2024-01", "2024-12")),
+    ("revenue in 2023", months("2023-01", "2023-12")),
+    ("Show Gross Margin % trend for the last 3 months.", months("2025-07", "2025-09")),
+    ("revenue for the past six months", months("2025-04", "2025-09")),
+    ("revenue TTM", months("2024-10", "2025-09")),
+    ("last quarter opex", months("2025-07", "2025-09")),
+    ("last two quarters revenue", months("2025-04", "2025-09")),
+    ("last year ebitda", months("2024-01", "2024-12")),
+    ("EBITDA YTD", months("2025-01", "2025-09")),
+    ("revenue for last month", ["2025-09"]),
+    ("may I see revenue", []),
+])
+def test_resolve_dates(question, expected):
+    out = resolve_dates(question, LATEST)
+    assert out["months"] == expected and not out["ambiguous"]
+
+
+def test_fiscal_years_shift_with_the_start_month():
+    assert resolve_dates("FY2025", LATEST, fiscal_start=7)["months"] == months("2024-07", "2025-06")
+    assert resolve_dates("Q1 FY26", LATEST, fiscal_start=7)["months"] == months("2025-07", "2025-09")
+    assert resolve_dates("YTD", LATEST, fiscal_start=7)["months"] == months("2025-07", "2025-09")
+    assert resolve_dates("last quarter", "2025-08", fiscal_start=2)["months"] == months("2025-05", "2025-07")
+
+
+@pytest.mark.parametrize("question", ["revenue next month", "revenue two weeks ago", "opex before the acquisition"])
+def test_unresolved_date_words_are_ambiguous(question):
+    assert resolve_dates(question, LATEST)["ambiguous"]
+
+
+def test_llm_only_consulted_when_ambiguous(monkeypatch):
+    calls = []
+    monkeypatch.setenv("USE_LLM", "true")
+    monkeypatch.setattr(interpreter, "llm_interp", lambda q, latest=None: calls.append((q, latest)) or
+                        {"intent": "revenue", "months": ["2025-10"]})
+
+    out = interpreter.interpret("What is our cash runway right now?", LATEST)
+    assert out == {"intent": "cash_runway", "months": months("2025-07", "2025-09")} and calls == []
+
+    out = interpreter.interpret("revenue next month", LATEST)
+    assert out["months"] == ["2025-10"] and calls == [("revenue next month", LATEST)]
+
+
+def test_numbers_are_not_years_without_a_date_word():
+    assert resolve_dates("Was opex above 2000 in June 2025?", LATEST)["months"] == ["2025-06"]
+    assert resolve_dates("revenue during 2024", LATEST)["months"] == months("2024-01", "2024-12")
+
+
+@pytest.mark.parametrize("question", ["revenue for 2025-13", "revenue 2025-00", "revenue 13/2025"])
+def test_impossible_months_are_rejected(question):
+    out = resolve_dates(question, LATEST)
+    assert out["months"] == [] and out["invalid"]
+    with pytest.raises(ValueError, match="Invalid month"):
+        interpreter.interpret(question, LATEST)
+
+
+@pytest.mark.parametrize("question", [
+    "revenue since 2020", "revenue next month", "opex before the acquisition",
+    "ebitda for the first half", "revenue 2025-6",
+])
+def test_unreadable_dates_are_not_replaced_by_the_default_period(question, monkeypatch):
+    monkeypatch.delenv("USE_LLM", raising=False)
+    with pytest.raises(ValueError, match="explicit months"):
+        interpreter.interpret(question, LATEST)
@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+from agent.data import load_data
+from agent.metrics import revenue, opex_total, cash_runway
+
+FIXTURES_DIR = "fixtures"
+MONTHS = ["2023-01", "2023-02", "2023-03"]
+
+
+@pytest.fixture(scope="module")
+def xlsx_ds():
+    return load_data(FIXTURES_DIR)
+
+
+@pytest.fixture
+def csv_dir(tmp_path, xlsx_ds):
+    for name in ["actuals", "budget", "cash", "fx"]:
+        df = getattr(xlsx_ds, name).drop(columns=["amount_usd"], errors="ignore")
+        df.to_csv(tmp_path / f"{name}.csv", index=False)
+    return tmp_path
+
+
+def test_stream_csv_matches_xlsx(csv_dir, xlsx_ds):
+    ds = load_data(str(csv_dir), chunksize=50)
+
+    assert ds.ingest_report["actuals"] == {"rows": len(xlsx_ds.actuals), "rejected": 0}
+    for fn in [revenue, opex_total, cash_runway]:
+        got, expected = fn(ds, MONTHS, None), fn(xlsx_ds, MONTHS, None)
+        for k, v in expected.items():
+            assert got[k] == (pytest.approx(v) if isinstance(v, (float, list)) else v)
+
+
+def test_stream_csv_rejects_bad_rows(csv_dir, xlsx_ds):
+    bad = pd.DataFrame(
+        [
+            {"month": "June", "entity": "EMEA", "account_category": "Revenue", "amount": "1", "currency": "EUR"},
+            {"month": "2023-01", "entity": "EMEA", "account_category": "Revenue", "amount": "n/a", "currency": "EUR"},
+            {"month": "2023-01", "entity": None, "account_category": "Revenue", "amount": "5", "currency": "EUR"},
+            {"month": "2023-13", "entity": "EMEA", "account_category": "Revenue", "amount": "5", "currency": "EUR"},
+            {"month": "2023-01-32", "entity": "EMEA", "account_category": "Revenue", "amount": "5", "currency": "EUR"},
+        ]
+    )
+    bad.to_csv(csv_dir / "actuals.csv", mode="a", header=False, index=False)
+
+    ds = load_data(str(csv_dir), chunksize=64)
+
+    assert ds.ingest_report["actuals"]["rejected"] == 5
+    assert revenue(ds, ["2023-01"], None)["actual_usd"] == pytest.approx(revenue(xlsx_ds, ["2023-01"], None)["actual_usd"])
+
+
+def test_stream_csv_missing_columns(csv_dir):
+    pd.DataFrame({"month": ["2023-01"], "entity": ["A"]}).to_csv(csv_dir / "cash.csv", index=False)
+
+    with pytest.raises(ValueError, match="missing columns"):
+        load_data(str(csv_dir))
@@ -0,0 +1,162 @@
+import time
+
+import pytest
+import requests
+
+from agent import interpreter, llm
+from agent.answer import answer_text, polish_async, stream_answer
+
+PAYLOAD = {"month": "2025-06", "months": ["2025-06"], "entity": "All",
+           "actual_usd": 1200000.0, "budget_usd": 1000000.0, "delta_usd": 200000.0}
+
+
+def test_reuses_one_pooled_connection(llm_server):
+    llm_server.reply = "ok"
+    client = llm.get_client()
+    assert [client.chat([{"role": "user", "content": "hi"}]) for _ in range(3)] == ["ok"] * 3
+    assert len({r["client_port"] for r in llm_server.requests}) == 1
+
+
+def test_retries_429_and_5xx_then_succeeds(llm_server):
+    llm_server.queue(429, headers={"Retry-After": "0"})
+    llm_server.queue(503)
+    llm_server.queue(200, content="recovered")
+    assert llm.chat([{"role": "user", "content": "hi"}]) == "recovered"
+    assert len(llm_server.requests) == 3
+
+
+def test_read_timeout_is_retried_then_raised(llm_server):
+    for _ in range(3):
+        llm_server.queue(200, delay=0.8)
+    with pytest.raises(llm.LLMError):
+        llm.chat([{"role": "user", "content": "hi"}])
+    assert len(llm_server.requests) == 3
+
+
+def test_client_errors_are_not_retried(llm_server):
+    llm_server.queue(400, content="bad request")
+    with pytest.raises(llm.LLMError, match="HTTP 400"):
+        llm.chat([{"role": "user", "content": "hi"}])
+    assert len(llm_server.requests) == 1
+
+
+def test_delay_is_jittered_and_capped():
+    client = llm.LLMClient(token="t", backoff=1.0, backoff_max=4.0)
+    delays = [client.delay(5) for _ in range(50)]
+    assert all(0 <= d <= 4.0 for d in delays) and len(set(delays)) > 1
+    assert client.delay(0, retry_after="2") == 2.0 and client.delay(0, retry_after="60") == 4.0
+
+
+def test_breaker_opens_then_half_opens():
+    now = [0.0]
+    breaker = llm.CircuitBreaker(threshold=2, reset_after=10, clock=lambda: now[0])
+    breaker.failure()
+    assert breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] = 10
+    assert breaker.allow() and not breaker.allow()  # one trial call only
+    breaker.failure()
+    assert breaker.state == "open"
+    now[0] = 20
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed"
+
+
+def test_open_circuit_falls_back_without_calling_out(llm_server, monkeypatch):
+    client = llm.get_client()
+    client.breaker = llm.CircuitBreaker(threshold=1, reset_after=60)
+    for _ in range(3):
+        llm_server.queue(500)
+    assert "$1.2M" in answer_text("revenue", PAYLOAD, "June revenue?")
+    calls = len(llm_server.requests)
+
+    # circuit is open now: both stages answer locally and nothing reaches the server
+    assert answer_text("revenue", PAYLOAD, "June revenue?").startswith("Revenue for Jun 2025 was $1.2M")
+    monkeypatch.setenv("USE_LLM", "true")
+    monkeypatch.setattr(interpreter, "INTERP_CACHE_PATH", "")
+    monkeypatch.setattr(interpreter, "_interp_cache", None)
+    assert interpreter.interpret("How did June 2025 look?", "2025-09") == {"intent": "revenue", "months": ["2025-06"]}
+    assert len(llm_server.requests) == calls
+
+
+def test_answer_text_uses_shared_client(llm_server):
+    llm_server.reply = "```Revenue beat budget by $200k in June 2025.```"
+    assert answer_text("revenue", PAYLOAD, "June revenue?") == "Revenue beat budget by $200k in June 2025."
+    body = llm_server.requests[0]["body"]
+    assert body["model"] == "stub-model" and body["temperature"] == 0
+
+
+def test_stream_answer_yields_chunks_of_the_final_text(llm_server):
+    llm_server.reply = "```Revenue beat budget by $200k in June 2025.```"
+    chunks = list(stream_answer("revenue", PAYLOAD, "June revenue?"))
+
+    assert len(chunks) > 3
+    assert "".join(chunks) == "Revenue beat budget by $200k in June 2025."
+    assert llm_server.requests[0]["body"]["stream"] is True
+
+
+def test_stream_answer_falls_back_before_first_chunk(llm_server):
+    for _ in range(3):
+        llm_server.queue(503)
+    assert "".join(stream_answer("revenue", PAYLOAD, "June revenue?")).startswith("Revenue for Jun 2025 was $1.2M")
+
+
+def test_template_policy_never_calls_out(llm_server):
+    assert answer_text("revenue", PAYLOAD, "June revenue?", policy="template").startswith("Revenue for Jun 2025")
+    assert "".join(stream_answer("revenue", PAYLOAD, "June revenue?", policy="template_first")).startswith("Revenue for Jun 2025")
+    assert llm_server.requests == []
+
+
+def test_polish_rewrites_draft_and_keeps_it_on_failure(llm_server):
+    draft = "Revenue for Jun 2025 was $1.2M, $200k (20.0%) above budget of $1M."
+    llm_server.reply = "June 2025 revenue of $1.2M beat the $1M budget by $200k (20.0%)."
+    assert polish_async("revenue", PAYLOAD, "June revenue?", "concise", draft).result(timeout=5) == llm_server.reply
+    assert f"draft: {draft}" in llm_server.requests[0]["body"]["messages"][1]["content"]
+
+    for _ in range(3):
+        llm_server.queue(503)
+    assert polish_async("revenue", PAYLOAD, "Revenue in June?", "concise", draft).result(timeout=5) == draft
+
+
+def test_template_first_answers_with_the_draft_and_polishes_in_the_background(llm_server):
+    llm_server.reply = "June 2025 revenue of $1.2M beat the $1M budget by $200k (20.0%)."
+    llm_server.queue(200, delay=0.3, content=llm_server.reply)
+    t0 = time.perf_counter()
+    assert answer_text("revenue", PAYLOAD, "June revenue?", policy="template_first").startswith("Revenue for Jun 2025")
+    assert time.perf_counter() - t0 < 0.3
+    deadline = time.perf_counter() + 5
+    while answer_text("revenue", PAYLOAD, "June revenue?", policy="template_first") != llm_server.reply:
+        assert time.perf_counter() < deadline
+        time.sleep(0.05)
+    assert len(llm_server.requests) == 1
+
+
+def test_other_request_errors_fail_the_half_open_trial(llm_server, monkeypatch):
+    clock = [0.0]
+    client = llm.get_client()
+    client.breaker = llm.CircuitBreaker(threshold=1, reset_after=10, clock=lambda: clock[0])
+    client.breaker.failure()
+    clock[0] = 10.0
+    real_post, broken = client.session.post, [True]
+
+    def post(*args, **kwargs):
+        if broken[0]:
+            raise requests.exceptions.ChunkedEncodingError("broken body")
+        return real_post(*args, **kwargs)
+
+    monkeypatch.setattr(client.session, "post", post)
+
+    with pytest.raises(llm.LLMError, match="broken body"):
+        client.chat([{"role": "user", "content": "hi"}])
+    assert client.breaker.state == "open"
+    assert answer_text("revenue", PAYLOAD, "June revenue?").startswith("Revenue for Jun 2025")
+
+    # the failed trial must not wedge the breaker: the next window lets a trial through again
+    clock[0] = 30.0
+    broken[0] = False
+    llm_server.reply = "recovered"
+    assert client.chat([{"role": "user", "content": "hi"}]) == "recovered"
+    assert client.breaker.state == "closed"
@@ -2,8 +2,8 @@ import os
 import pytest
 import pandas as pd
 
-from agent.data import load_data, to_usd
-from agent.metrics import revenue, gross_margin, opex_total, ebitda, cash_runway
+from agent.data import load_data, to_usd, build_datastore
+from agent.metrics import revenue, gross_margin, opex_total, ebitda, cash_runway, set_backend, BACKENDS, runway_series, variance
 
 FIXTURES_DIR = "fixtures"
 
@@ -12,6 +12,14 @@ TEST_MONTHS3 = ["2023-01", "2023-02", "2023-03"]
 
 DS = load_data(FIXTURES_DIR)
 
+
+@pytest.fixture(autouse=True, params=BACKENDS)
+def backend(request):
+    prev = set_backend(request.param)
+    yield request.param
+    set_backend(prev)
+
+
 def test_revenue():
     res = revenue(DS, months=[TEST_MONTH], entity=None)
 
@@ -125,4 +133,90 @@ def test_cash_runway():
     if expected_avg_burn > 0:
         assert res["runway_months"] == cash_usd / expected_avg_burn
     else:
-        assert res["runway_months"] is None
\ No newline at end of file
+        assert res["runway_months"] is None
+
+@pytest.mark.parametrize("entity", [None, "ParentCo", "EMEA", "Unknown"])
+def test_cube_matches_frame(entity):
+    months = sorted(DS.actuals["month"].unique())
+    windows = [months[i:i + 3] for i in range(len(months))]
+    fns = [revenue, gross_margin, opex_total, ebitda, cash_runway]
+
+    prev = set_backend("frame")
+    expected = [fn(DS, w, entity) for w in windows for fn in fns]
+    set_backend("cube")
+    got = [fn(DS, w, entity) for w in windows for fn in fns]
+    set_backend(prev)
+
+    assert got == expected
+
+
+def test_ebitda_opex_breakdown():
+    res = ebitda(DS, months=TEST_MONTHS3, entity="EMEA")
+
+    assert len(res["opex_by_category"]) == len(TEST_MONTHS3)
+    for m, opex, cats, rev, cogs, e in zip(
+        TEST_MONTHS3, res["opex_usd"], res["opex_by_category"], res["revenue_usd"], res["cogs_usd"], res["ebitda_usd"]
+    ):
+        single = opex_total(DS, months=[m], entity="EMEA")
+        assert list(cats) == single["categories"]
+        assert list(cats.values()) == single["values_usd"]
+        assert opex == single["opex_usd"]
+        assert e == rev - cogs - opex
+
+
+@pytest.mark.parametrize("fn", [revenue, gross_margin, opex_total, ebitda, cash_runway])
+def test_entity_breakdown(fn):
+    res = fn(DS, months=TEST_MONTHS3, entity="*")
+    total = fn(DS, months=TEST_MONTHS3, entity=None)
+
+    assert res["entity"] == "*"
+    assert {"ParentCo", "EMEA"} <= set(res["entities"])
+    for e in res["entities"]:
+        assert res["breakdown"][e] == fn(DS, months=TEST_MONTHS3, entity=e)
+    for k, v in total.items():
+        if k != "entity":
+            assert res[k] == pytest.approx(v)
+
+
+def test_runway_series_matches_cash_runway():
+    # scale revenue down so the fixture ledger actually burns cash
+    a = DS.actuals.drop(columns=["amount_usd"]).copy()
+    a.loc[a["account_category"] == "Revenue", "amount"] *= 0.3
+    burning = build_datastore(a, DS.budget.drop(columns=["amount_usd"]), DS.cash, DS.fx)
+
+    res = runway_series(burning, [], None, window=3)
+    months = res["months"]
+    assert res["avg_burn_usd"][:2] == [None, None]
+
+    for i in range(2, len(months)):
+        single = cash_runway(burning, months[i - 2:i + 1], None)
+        assert res["cash_usd"][i] == single["cash_usd"]
+        assert res["avg_burn_usd"][i] == pytest.approx(single["avg_burn_usd"])
+        if single["runway_months"] is None:
+            assert res["runway_months"][i] is None
+        else:
+            assert res["runway_months"][i] == pytest.approx(single["runway_months"])
+
+    picked = runway_series(burning, months[5:8], "*", window=3)
+    assert picked["months"] == months[5:8]
+    assert picked["runway_months"] == res["runway_months"][5:8]
+    assert set(picked["breakdown"]) == set(picked["entities"])
+
+
+def test_variance_matrix():
+    res = variance(DS, months=TEST_MONTHS3, entity=None)
+    cats = set(DS.actuals["account_category"]) | set(DS.budget["account_category"])
+
+    assert len(res["rows"]) == len(TEST_MONTHS3) * len(cats)
+    assert [r["month"] for r in res["rows"]][::len(cats)] == TEST_MONTHS3
+    for r in res["rows"]:
+        assert r["delta_usd"] == r["actual_usd"] - r["budget_usd"]
+        if r["account_category"] == "Revenue":
+            rev = revenue(DS, months=[r["month"]], entity=None)
+            assert r["actual_usd"] == pytest.approx(rev["actual_usd"])
+            assert r["budget_usd"] == pytest.approx(rev["budget_usd"])
+
+    per_entity = variance(DS, months=TEST_MONTHS3, entity="*")
+    emea = variance(DS, months=TEST_MONTHS3, entity="EMEA")
+    picked = [{k: v for k, v in r.items() if k != "entity"} for r in per_entity["rows"] if r["entity"] == "EMEA"]
+    assert picked == emea["rows"]
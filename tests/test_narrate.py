@@ -0,0 +1,92 @@
+import pytest
+
+from agent.data import load_data
+from agent.narrate import month_range, narrate, pct, usd
+from agent.router import ROUTES
+
+FIXTURES_DIR = "fixtures"
+
+DS = load_data(FIXTURES_DIR)
+MONTHS = ["2025-04", "2025-05", "2025-06"]
+
+
+@pytest.mark.parametrize("intent", sorted(ROUTES))
+@pytest.mark.parametrize("entity", [None, "EMEA", "*"])
+def test_every_intent_narrates_in_both_styles(intent, entity):
+    payload = ROUTES[intent](DS, MONTHS, entity)
+    concise = narrate(intent, payload, "concise")
+    detail = narrate(intent, payload, "detail")
+
+    assert concise and "n/a" not in concise and "{" not in concise
+    assert detail.startswith(concise.split(" By entity:")[0].rstrip("."))
+    assert len(detail) >= len(concise)
+    if entity == "EMEA":
+        assert "EMEA" in concise
+    if entity == "*":
+        assert "By entity:" in concise
+
+
+def test_revenue_figures_match_payload():
+    payload = ROUTES["revenue"](DS, ["2025-06"], None)
+    text = narrate("revenue", payload, "detail")
+
+    assert text.startswith(f"Revenue for Jun 2025 was {usd(payload['actual_usd'])}")
+    assert "below budget" in text and f"{pct(payload['pct_to_budget'])} of plan" in text
+
+
+@pytest.mark.parametrize("value, expected", [
+    (0, "$0"),
+    (950.4, "$950"),
+    (57_812.0, "$57.8k"),
+    (-18_790.0, "-$18.8k"),
+    (235_000.0, "$235k"),
+    (1_014_896.0, "$1.01M"),
+    (2_500_000_000.0, "$2.5B"),
+    (999.6, "$1k"),
+    (999_600.0, "$1M"),
+    (-999_600.0, "-$1M"),
+    (999_999_999.0, "$1B"),
+    (99_960.0, "$100k"),
+])
+def test_usd(value, expected):
+    assert usd(value) == expected
+
+
+def test_pct_and_signs():
+    assert pct(0.8478) == "84.8%"
+    assert pct(-0.054, signed=True) == "-5.4%"
+    assert usd(24_200.0, signed=True) == "+$24.2k"
+    assert pct(None) == "n/a"
+
+
+@pytest.mark.parametrize("months, expected", [
+    (["2025-06"], "Jun 2025"),
+    (["2025-04", "2025-05", "2025-06"], "Apr–Jun 2025"),
+    (["2024-11", "2024-12", "2025-01", "2025-02"], "Nov 2024–Feb 2025"),
+    (["2025-01", "2025-03"], "Jan 2025 and Mar 2025"),
+    ([], "the selected period"),
+])
+def test_month_range(months, expected):
+    assert month_range(months) == expected
+
+
+def test_runway_without_burn_and_with_burn():
+    flat = {"month": "2025-06", "months": MONTHS, "entity": "All",
+            "cash_usd": 4_330_000.0, "avg_burn_usd": 0.0, "runway_months": None}
+    burning = dict(flat, avg_burn_usd=250_000.0, runway_months=17.32)
+
+    assert "runway is not constrained" in narrate("cash_runway", flat)
+    assert narrate("cash_runway", burning) == (
+        "Cash was $4.33M at Jun 2025; at an average burn of $250k/month over Apr–Jun 2025, runway is 17.3 months."
+    )
+
+
+def test_variance_marks_cost_overruns_unfavourable():
+    payload = {"months": ["2025-06"], "entity": "All", "rows": [
+        {"month": "2025-06", "account_category": "Revenue", "actual_usd": 90.0e3, "budget_usd": 100.0e3},
+        {"month": "2025-06", "account_category": "Opex:Marketing", "actual_usd": 60.0e3, "budget_usd": 50.0e3},
+    ]}
+    text = narrate("variance", payload)
+
+    assert "Revenue $90k vs $100k (-$10k, unfavourable)" in text
+    assert "Marketing $60k vs $50k (+$10k, unfavourable)" in text
@@ -0,0 +1,57 @@
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import pytest
+
+from agent.data import load_data
+from agent.pipeline import start_run
+from agent.router import ROUTES
+
+FIXTURES_DIR = "fixtures"
+
+DS = load_data(FIXTURES_DIR)
+MONTHS = ["2025-04", "2025-05", "2025-06"]
+
+
+def test_charts_render_while_the_answer_is_pending():
+    payload = ROUTES["gross_margin"](DS, MONTHS, None)
+    run = start_run("k", "gross_margin", payload, "GM trend?")
+    deadline = time.time() + 10
+    while not run.future.done() and time.time() < deadline:
+        time.sleep(0.01)
+    assert run.future.done()
+
+    report = run.finish("Gross margin held at 84.8%.")
+    assert report["pdf"].startswith(b"%PDF") and report["file_name"] == "report_gross_margin_2025-04_2025-06.pdf"
+    assert len(report["pngs"]) == 1 and report["pngs"][0].startswith(b"\x89PNG")
+    assert run.finish("Gross margin held at 84.8%.") is report
+    run.cancel()
+
+
+def test_cancel_before_start_skips_the_work():
+    gate = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=1)
+    pool.submit(gate.wait)
+    figs_before = set(plt.get_fignums())
+
+    run = start_run("k", "revenue", ROUTES["revenue"](DS, ["2025-06"], None), "June revenue?", executor=pool)
+    run.cancel()
+    gate.set()
+    pool.shutdown(wait=True)
+
+    assert run.cancelled() and run.future.cancelled()
+    with pytest.raises(CancelledError):
+        run.finish("too late")
+    assert set(plt.get_fignums()) == figs_before
+
+
+def test_cancel_after_prepare_releases_figures():
+    figs_before = set(plt.get_fignums())
+    run = start_run("k", "ebitda", ROUTES["ebitda"](DS, MONTHS, None), "EBITDA?")
+    run.future.result(timeout=10)
+    run.cancel()
+    assert set(plt.get_fignums()) == figs_before
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from agent.answer import build_messages
+from agent.data import load_data
+from agent.prompt_payload import compact_payload, count_tokens, to_json
+from agent.router import ROUTES
+
+FIXTURES_DIR = "fixtures"
+
+DS = load_data(FIXTURES_DIR)
+YEAR = [f"2024-{m:02d}" for m in range(7, 13)] + [f"2025-{m:02d}" for m in range(1, 7)]
+
+
+def test_drops_unused_fields_and_rounds_to_display_precision():
+    payload = ROUTES["ebitda"](DS, YEAR[-3:], None)
+    out = compact_payload("ebitda", payload)
+
+    assert "opex_by_category" not in out and "cogs_usd" not in out
+    assert all(isinstance(v, int) for v in out["ebitda_usd"])
+    assert out["ebitda_margin"] == [round(v, 4) for v in payload["ebitda_margin"]]
+
+
+def test_long_series_keep_their_key_points():
+    payload = ROUTES["gross_margin"](DS, YEAR, None)
+    gm = compact_payload("gross_margin", payload)["gm_usd"]
+    values = [round(v) for v in payload["gm_usd"]]
+
+    assert gm["min"] == min(values) and gm["max"] == max(values)
+    assert gm["points"]["2024-07"] == values[0] and gm["points"]["2025-06"] == values[-1]
+    assert len(gm["points"]) < len(values)
+
+
+@pytest.mark.parametrize("intent", sorted(ROUTES))
+def test_token_budget_is_enforced(intent):
+    payload = ROUTES[intent](DS, YEAR, "*")
+    out = compact_payload(intent, payload, budget=700)
+
+    assert count_tokens(to_json(out)) <= 700
+    assert count_tokens(to_json(out)) < count_tokens(json.dumps(payload))
+
+
+def test_variance_keeps_the_largest_rows():
+    payload = ROUTES["variance"](DS, YEAR, "*")
+    rows = compact_payload("variance", payload, budget=400)["rows"]
+    largest = max(payload["rows"], key=lambda r: abs(r["delta_usd"]))
+
+    assert rows[0]["account_category"] == largest["account_category"] and rows[0]["month"] == largest["month"]
+    assert rows[-1]["account_category"].startswith("other (")
+
+
+def test_build_messages_is_quiet(capsys):
+    build_messages("revenue", ROUTES["revenue"](DS, ["2025-06"], None), "June revenue?")
+    assert capsys.readouterr().out == ""
+
+
+@pytest.mark.parametrize("intent", sorted(ROUTES))
+@pytest.mark.parametrize("budget", [150, 40])
+def test_budget_holds_even_when_every_shrink_step_is_too_big(intent, budget):
+    out = compact_payload(intent, ROUTES[intent](DS, YEAR, "*"), budget=budget)
+
+    assert count_tokens(to_json(out)) <= budget
+    assert out["truncated"] is True and out["entity"] == "*"
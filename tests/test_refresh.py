@@ -0,0 +1,135 @@
+import threading
+import time
+from dataclasses import fields
+
+import pandas as pd
+import pytest
+
+from agent import refresh, router
+from agent.cube import Cube
+from agent.data import load_data
+from agent.metrics import revenue, ebitda, cash_runway
+from agent.refresh import LiveDataStore, refresh_datastore
+
+FIXTURES_DIR = "fixtures"
+FRAMES = ["actuals", "budget", "cash", "fx"]
+
+
+@pytest.fixture(scope="module")
+def base():
+    return {name: getattr(load_data(FIXTURES_DIR), name).drop(columns=["amount_usd"], errors="ignore")
+            for name in FRAMES}
+
+
+def write_sources(folder, frames):
+    for name, df in frames.items():
+        df.to_csv(folder / f"{name}.csv", index=False)
+
+
+def edited(base, last):
+    # everything up to `last`, with 2024-03 revenue restated and a new entity booked in 2024-03
+    out = {name: df[df["month"] <= last].copy() for name, df in base.items()}
+    a = out["actuals"]
+    a.loc[(a["month"] == "2024-03") & (a["account_category"] == "Revenue"), "amount"] *= 1.1
+    extra = pd.DataFrame([{"month": "2024-03", "entity": "LatAm", "account_category": "Revenue",
+                           "amount": 1000.0, "currency": "USD"}])
+    out["actuals"] = pd.concat([a, extra], ignore_index=True)
+    return out
+
+
+def sort_frame(df):
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_refresh_matches_full_reload(tmp_path, base, compact):
+    write_sources(tmp_path, {name: df[df["month"] <= "2024-06"] for name, df in base.items()})
+    ds = load_data(str(tmp_path), compact=compact)
+    before = ds.actuals
+
+    write_sources(tmp_path, edited(base, "2024-09"))
+    fresh, dirty = refresh_datastore(ds)
+    full = load_data(str(tmp_path), compact=compact)
+
+    assert dirty == ["2024-03", "2024-07", "2024-08", "2024-09"]
+    assert ds.actuals is before and fresh.version != ds.version
+    for name in FRAMES:
+        got, expected = getattr(fresh, name), getattr(full, name)
+        if name != "fx":
+            # the spliced frame keeps the (month, entity) order of a full build
+            assert list(got[["month", "entity"]].astype(str).itertuples(index=False)) == \
+                list(expected[["month", "entity"]].astype(str).itertuples(index=False))
+        pd.testing.assert_frame_equal(sort_frame(got.astype(str)), sort_frame(expected.astype(str)))
+    for f in fields(Cube):
+        assert getattr(fresh.cube, f.name) == getattr(full.cube, f.name)
+
+    months = ["2024-02", "2024-03", "2024-08"]
+    for fn in [revenue, ebitda, cash_runway]:
+        for entity in [None, "LatAm", "*"]:
+            assert fn(fresh, months, entity) == fn(full, months, entity)
+
+
+def test_refresh_without_changes_is_a_no_op(tmp_path, base):
+    write_sources(tmp_path, base)
+    ds = load_data(str(tmp_path))
+    assert refresh_datastore(ds) == (ds, [])
+
+
+def test_live_store_swaps_and_migrates_route_cache(tmp_path, base):
+    router.clear_route_cache()
+    write_sources(tmp_path, {name: df[df["month"] <= "2024-06"] for name, df in base.items()})
+    live = LiveDataStore(load_data(str(tmp_path)))
+    old = live.current()
+    assert live.refresh_if_changed() is old
+
+    clean = {"intent": "revenue", "months": ["2024-01"]}
+    stale = {"intent": "revenue", "months": ["2024-03"]}
+    router.route(clean, old)
+    router.route(stale, old)
+
+    write_sources(tmp_path, edited(base, "2024-09"))
+    fresh = live.refresh_if_changed()
+    assert fresh is live.current() and fresh is not old
+    assert live.last_refresh["months"] == ["2024-03", "2024-07", "2024-08", "2024-09"]
+
+    hits = router.route_cache_stats()["hits"]
+    assert router.route(clean, fresh) == router.route(clean, fresh, use_cache=False)
+    assert router.route_cache_stats()["hits"] == hits + 1
+    assert router.route(stale, fresh)["payload"] != router.route(stale, old, use_cache=False)["payload"]
+    router.clear_route_cache()
+
+
+def test_sessions_waiting_on_one_change_refresh_once(tmp_path, base, monkeypatch):
+    write_sources(tmp_path, {name: df[df["month"] <= "2024-06"] for name, df in base.items()})
+    live = LiveDataStore(load_data(str(tmp_path)))
+    calls = []
+    real = refresh.refresh_datastore
+    monkeypatch.setattr(refresh, "refresh_datastore", lambda ds, force=False: calls.append(ds) or real(ds, force))
+
+    write_sources(tmp_path, edited(base, "2024-09"))
+    results = []
+    with live._lock:
+        # every session sees the change before the first refresh finishes
+        threads = [threading.Thread(target=lambda: results.append(live.refresh_if_changed())) for _ in range(4)]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and all(ds is live.current() for ds in results)
+
+
+def test_failed_refresh_keeps_serving_the_current_store(tmp_path, base):
+    write_sources(tmp_path, {name: df[df["month"] <= "2024-06"] for name, df in base.items()})
+    live = LiveDataStore(load_data(str(tmp_path)))
+    old = live.current()
+
+    # a half-written file: the refresh fails, sessions keep the last good store
+    (tmp_path / "actuals.csv").write_text("month,entity\n2024-07")
+    with pytest.warns(UserWarning, match="could not refresh data"):
+        assert live.refresh_if_changed() is old
+    assert live.refresh_if_changed() is old
+
+    write_sources(tmp_path, edited(base, "2024-09"))
+    fresh = live.refresh_if_changed()
+    assert fresh is not old and fresh is live.current()
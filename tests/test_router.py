@@ -0,0 +1,56 @@
+from dataclasses import replace
+
+import pytest
+
+from agent.data import load_data
+from agent.lru import LRUCache
+from agent import router
+
+FIXTURES_DIR = "fixtures"
+
+DS = load_data(FIXTURES_DIR)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    router.clear_route_cache()
+    yield
+    router.clear_route_cache()
+
+
+def test_route_cache_hits_and_copies():
+    interp = {"intent": "gross_margin", "months": ["2023-01", "2023-02"]}
+    first = router.route(interp, DS)
+    first["payload"]["gm_usd"][0] = -1.0
+
+    second = router.route(interp, DS)
+    stats = router.route_cache_stats()
+
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert second["payload"]["gm_usd"][0] != -1.0
+    assert second == router.route(interp, DS, use_cache=False)
+
+
+def test_route_cache_keyed_by_version():
+    interp = {"intent": "revenue", "months": ["2023-01"]}
+    router.route(interp, DS)
+    reloaded = replace(DS, version="reloaded")
+    router.route(interp, reloaded)
+    # both stores stay live: neither evicts the other's entries
+    router.route(interp, DS)
+    router.route(interp, reloaded)
+
+    stats = router.route_cache_stats()
+    assert stats["misses"] == 2 and stats["hits"] == 2 and stats["size"] == 2
+
+
+def test_lru_evicts_least_recent():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from agent import shared
+from agent.data import load_data
+from agent.refresh import LiveDataStore
+from agent.router import ROUTES
+
+FIXTURES_DIR = "fixtures"
+MONTHS = ["2023-01", "2023-02", "2023-03"]
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_attached_store_matches_loader(tmp_path, compact):
+    ds = load_data(FIXTURES_DIR, compact=compact)
+    shared.publish(ds, str(tmp_path))
+    attached = shared.attach(str(tmp_path))
+
+    assert attached.version == ds.version and shared.current_version(str(tmp_path)) == ds.version
+    # numeric columns are read-only views of the published files, not copies
+    assert not attached.actuals["amount_usd"].to_numpy().flags.writeable
+    if compact:
+        assert not attached.actuals["entity"].cat.codes.to_numpy().flags.writeable
+    for intent, fn in ROUTES.items():
+        for entity in [None, "EMEA", "*"]:
+            assert fn(attached, MONTHS, entity) == fn(ds, MONTHS, entity), intent
+    # aggregates travel as JSON, never as pickles a local user could plant in the shared root
+    assert attached.cube == ds.cube and attached.fingerprints == ds.fingerprints
+    assert list(attached.missing_fx.columns) == list(ds.missing_fx.columns)
+    assert not list(tmp_path.rglob("*.pkl"))
+
+
+def test_workers_reattach_after_refresh(tmp_path):
+    src, root = tmp_path / "src", str(tmp_path / "shm")
+    src.mkdir()
+    base = load_data(FIXTURES_DIR)
+    for name in ["actuals", "budget", "cash", "fx"]:
+        df = getattr(base, name).drop(columns=["amount_usd"], errors="ignore")
+        df[df["month"] <= "2024-06"].to_csv(src / f"{name}.csv", index=False)
+        df.to_csv(tmp_path / f"{name}.full.csv", index=False)
+
+    live = LiveDataStore(load_data(str(src)))
+    shared.publish(live.current(), root)
+    worker = shared.SharedDataStore(root)
+    old = worker.current()
+    assert worker.current() is old
+
+    for name in ["actuals", "budget", "cash", "fx"]:
+        (src / f"{name}.csv").write_text((tmp_path / f"{name}.full.csv").read_text())
+    shared.publish(live.refresh_if_changed(), root)
+
+    fresh = worker.current()
+    assert fresh.version == live.current().version != old.version
+    assert fresh.cube.actual_usd == live.current().cube.actual_usd
+    # the store a worker attached before the refresh keeps answering from its own version
+    assert np.isfinite(ROUTES["revenue"](old, MONTHS, None)["actual_usd"])
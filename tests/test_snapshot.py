@@ -0,0 +1,48 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from agent.data import load_data
+
+FIXTURES_DIR = "fixtures"
+
+
+@pytest.fixture
+def workdir(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    shutil.copy(os.path.join(FIXTURES_DIR, "data.xlsx"), src / "data.xlsx")
+    return src, tmp_path / "snap"
+
+
+def test_snapshot_roundtrip_matches_xlsx(workdir):
+    src, snap = workdir
+    plain = load_data(str(src))
+    first = load_data(str(src), snapshot_dir=str(snap))
+    warm = load_data(str(src), snapshot_dir=str(snap))
+
+    assert len([d for d in os.listdir(snap) if not d.startswith(".")]) == 1
+    for name in ["actuals", "budget", "cash", "fx"]:
+        pd.testing.assert_frame_equal(getattr(first, name), getattr(plain, name))
+        pd.testing.assert_frame_equal(getattr(warm, name), getattr(plain, name))
+
+
+def test_snapshot_invalidated_when_source_changes(workdir):
+    src, snap = workdir
+    load_data(str(src), snapshot_dir=str(snap))
+    before = set(os.listdir(snap))
+
+    xlsx = src / "data.xlsx"
+    sheets = pd.read_excel(xlsx, sheet_name=None)
+    sheets["cash"]["cash_usd"] = sheets["cash"]["cash_usd"] + 1
+    with pd.ExcelWriter(xlsx) as w:
+        for name, df in sheets.items():
+            df.to_excel(w, sheet_name=name, index=False)
+
+    ds = load_data(str(src), snapshot_dir=str(snap))
+    after = set(os.listdir(snap))
+
+    assert len(after) == 1 and after != before
+    pd.testing.assert_frame_equal(ds.cash, load_data(str(src)).cash)
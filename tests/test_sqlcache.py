@@ -0,0 +1,111 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from agent import answer, interpreter
+from agent.sqlcache import SQLiteCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_and_lru_eviction(tmp_path):
+    clock = Clock()
+    cache = SQLiteCache(str(tmp_path / "c.sqlite"), ttl=60, maxsize=2, clock=clock)
+    cache.put("a", {"v": 1})
+    clock.now += 1
+    cache.put("b", [2])
+    clock.now += 1
+    assert cache.get("a") == {"v": 1}
+    clock.now += 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None and cache.get("a") == {"v": 1}
+    clock.now += 61
+    assert cache.get("c") is None
+    assert cache.stats() == {"size": 1, "maxsize": 2, "hits": 2, "misses": 2, "evictions": 1, "hit_rate": 0.5}
+
+
+def hammer(path, worker):
+    cache = SQLiteCache(path, ttl=3600, maxsize=1000)
+    for i in range(50):
+        key = f"k{i % 10}"
+        if cache.get(key) is None:
+            cache.put(key, {"worker": worker, "i": i})
+    return True
+
+
+def test_shared_across_processes(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    SQLiteCache(path)
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        assert all(pool.map(hammer, [path] * 4, range(4)))
+
+    stats = SQLiteCache(path).stats()
+    assert stats["size"] == 10 and stats["hits"] + stats["misses"] == 200 and stats["hits"] >= 150
+
+
+@pytest.fixture
+def llm(llm_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(interpreter, "INTERP_CACHE_PATH", str(tmp_path / "interp.sqlite"))
+    monkeypatch.setattr(interpreter, "_interp_cache", None)
+    llm_server.reply = '{"intent": "revenue", "months": ["2025-07", "2025-08", "2025-09"]}'
+    return llm_server
+
+
+def test_llm_interp_is_cached_per_anchor_month(llm):
+    first = interpreter.llm_interp("Revenue last quarter?", "2025-09")
+    again = interpreter.llm_interp("  revenue   LAST quarter ", "2025-09")
+    assert first == again and len(llm.requests) == 1
+
+    # a new month of data moves "last quarter", so the cached answer must not be reused
+    interpreter.llm_interp("Revenue last quarter?", "2025-10")
+    assert len(llm.requests) == 2 and "2025-10" in llm.requests[-1]["body"]["messages"][-1]["content"]
+    assert interpreter.interp_cache().stats()["hits"] == 1
+
+
+def test_invalid_llm_interpretation_is_not_cached(llm):
+    llm.queue(200, content='{"intent": "forecast", "months": ["2025-10"]}')
+    with pytest.raises(ValueError, match="Invalid intent"):
+        interpreter.llm_interp("Revenue last quarter?", "2025-09")
+    assert len(interpreter.interp_cache()) == 0
+
+    # the next ask goes back to the LLM instead of replaying the bad reply
+    assert interpreter.llm_interp("Revenue last quarter?", "2025-09")["intent"] == "revenue"
+    assert len(llm.requests) == 2
+
+
+def test_answers_are_cached_per_payload_and_datastore_version(llm_server):
+    payload = {"month": "2025-06", "entity": "All", "actual_usd": 1.2e6, "budget_usd": 1.0e6}
+    llm_server.reply = "Revenue beat budget."
+    assert answer.answer_text("revenue", payload, "June revenue?", version="v1") == "Revenue beat budget."
+    assert answer.answer_text("revenue", dict(payload), " june REVENUE ", version="v1") == "Revenue beat budget."
+    assert "".join(answer.stream_answer("revenue", payload, "June revenue?", version="v1")) == "Revenue beat budget."
+    assert len(llm_server.requests) == 1
+
+    # a different style or payload is a different answer
+    answer.answer_text("revenue", payload, "June revenue?", style="detail", version="v1")
+    answer.answer_text("revenue", dict(payload, actual_usd=1.1e6), "June revenue?", version="v1")
+    assert len(llm_server.requests) == 3
+
+    # a new DataStore version misses, without wiping the answers another worker on v1 still serves
+    answer.answer_text("revenue", payload, "June revenue?", version="v2")
+    assert len(llm_server.requests) == 4
+    assert answer.answer_text("revenue", payload, "June revenue?", version="v1") == "Revenue beat budget."
+    assert len(llm_server.requests) == 4
+    stats = answer.answer_cache_stats()
+    assert stats["size"] == 4 and stats["hits"] == 3 and stats["misses"] == 4
+
+
+def test_fallback_answers_are_not_cached(llm_server):
+    payload = {"month": "2025-06", "entity": "All", "actual_usd": 1.2e6, "budget_usd": 1.0e6, "delta_usd": 2.0e5}
+    for _ in range(3):
+        llm_server.queue(503)
+    assert answer.answer_text("revenue", payload, "June revenue?").startswith("Revenue for Jun 2025")
+    llm_server.reply = "Revenue beat budget."
+    assert answer.answer_text("revenue", payload, "June revenue?") == "Revenue beat budget."
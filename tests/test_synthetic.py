@@ -0,0 +1,28 @@
+import pandas as pd
+
+from agent.data import load_data
+from agent.metrics import revenue
+from benchmarks.synthetic import generate, write_ledger
+
+
+def test_generate_is_deterministic_and_sized():
+    first = generate(rows=5000, currencies=4, months=12, opex=3, seed=7)
+    second = generate(rows=5000, currencies=4, months=12, opex=3, seed=7)
+    for name, df in first.items():
+        pd.testing.assert_frame_equal(df, second[name])
+
+    a = first["actuals"]
+    assert abs(len(a) - 5000) <= 12 * 5
+    assert a["month"].nunique() == 12 and first["fx"]["currency"].nunique() == 4
+    assert set(a["account_category"]) == {"Revenue", "COGS", "Opex:Marketing", "Opex:Sales", "Opex:R&D"}
+    assert not generate(rows=5000, months=12, seed=8)["actuals"]["amount"].equals(a["amount"])
+
+
+def test_synthetic_ledger_loads(tmp_path):
+    frames = generate(rows=2000, months=6, seed=1)
+    write_ledger(frames, str(tmp_path), "csv")
+    ds = load_data(str(tmp_path))
+
+    assert len(ds.actuals) == len(frames["actuals"]) and ds.missing_fx.empty
+    out = revenue(ds, ["2023-06"], None)
+    assert out["actual_usd"] > 0 and out["budget_usd"] > 0
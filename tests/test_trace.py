@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from agent import router, trace
+from agent.data import load_data
+from agent.interpreter import interpret
+
+DS = load_data("fixtures")
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    path = tmp_path / "trace.jsonl"
+    monkeypatch.setattr(trace, "ENABLED", True)
+    monkeypatch.setattr(trace, "TRACE_FILE", str(path))
+    router.clear_route_cache()
+    yield path
+    router.clear_route_cache()
+
+
+def test_spans_nest_and_count_rows(trace_file):
+    with trace.span("request", question="q") as request:
+        interp = interpret("Show EBITDA for 2023-01 to 2023-03")
+        router.route(interp, DS)
+        router.route(interp, DS)
+
+    lines = [json.loads(line) for line in trace_file.read_text().splitlines()]
+    assert lines == [{"ts": lines[0]["ts"], **r} for r in request.records]
+    by_name = {}
+    for r in lines:
+        by_name.setdefault(r["name"], []).append(r)
+
+    root = by_name["request"][0]
+    assert root["parent_id"] is None and {r["trace_id"] for r in lines} == {root["trace_id"]}
+    assert by_name["interpret"][0]["source"] == "basic"
+    miss, hit = by_name["route"]
+    assert miss["cache"] == "miss" and hit["cache"] == "hit"
+    metric = by_name["metric"][0]
+    assert metric["parent_id"] == miss["span_id"] and metric["rows_scanned"] > 0
+    assert all(r["duration_ms"] >= 0 for r in lines)
+
+
+def test_disabled_tracing_is_a_no_op(tmp_path, monkeypatch):
+    path = tmp_path / "trace.jsonl"
+    monkeypatch.setattr(trace, "ENABLED", False)
+    monkeypatch.setattr(trace, "TRACE_FILE", str(path))
+
+    with trace.span("request") as request:
+        trace.count("rows_scanned", 10)
+        router.route({"intent": "revenue", "months": ["2023-01"]}, DS, use_cache=False)
+
+    assert request is trace.NOOP and request.records == []
+    assert not path.exists()